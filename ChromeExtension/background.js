@@ -24,6 +24,28 @@ const MSG_GET_POPUP_DATA = 'get_popup_data';
 let isConnected = true;
 let isClosingTabs = false;
 
+// Packets from all tabs are coalesced for a short window and uploaded together
+const PACKET_BATCH_WINDOW = 1000;
+let pendingPackets = [];
+let packetFlushTimer = null;
+let packetUploadChain = Promise.resolve();
+
+// Monotonic sequence number over all packets of this browser session, which
+// is identified by a random epoch. As soon as a packet is queued,
+// "<epoch>:<seq>" is mirrored into a cookie so that platform pages wait until
+// the server has stored it, including packets still waiting to be uploaded.
+// Packets that are given up on are taken back out of the cookie.
+const INGEST_SEQ_KEY = 'ingest_seq';
+const INGEST_EPOCH_KEY = 'ingest_epoch';
+const UPLOAD_RETRIES = 3;
+const UPLOAD_RETRY_DELAY = 1000;
+let ingestSeq = 0;
+let ingestEpoch = null;
+let ingestSeqReady = null;
+// Highest seq of this epoch acknowledged by the server
+let storedIngestSeq = 0;
+let ingestCookieChain = Promise.resolve();
+
 (async () => {
     await initializeConfig();
 })();
@@ -166,6 +188,12 @@ async function checkActiveTask() {
             broadcastToTabs({ command: 'remove_message_box', id: 'extension-update-message' });
         }
 
+        // Servers that accept raw deflate and batched uploads advertise it here
+        await _set_session({
+            binary_upload: !!response.binary_upload,
+            batch_upload: !!response.batch_upload,
+        });
+
         const data = response.task_id;
         const new_task_id = (data !== null && data !== undefined && !isNaN(data)) ? parseInt(data, 10) : -1;
         const new_trial_num = response.trial_num || 0;
@@ -261,15 +289,177 @@ async function sendInfo(message) {
     const { logged_in } = await getUserInfo();
     if (!logged_in) {
         printDebug("background", "User not logged in. Aborting sendInfo.");
-        return;
+        return false;
     }
 
     try {
         const config = getConfig();
         await makeApiRequest(() => _post(config.urls.data, { message }));
         printDebug("background", "Info sent successfully.");
+        return true;
     } catch (error) {
         console.error("Error sending info:", error.message);
+        return false;
+    }
+}
+
+// Sends a deflate-compressed message as raw bytes to the v2 endpoint
+async function sendBinaryInfo(compressed_uint8) {
+    printDebug("background", "Sending binary info...");
+    const { logged_in } = await getUserInfo();
+    if (!logged_in) {
+        printDebug("background", "User not logged in. Aborting sendBinaryInfo.");
+        return false;
+    }
+
+    try {
+        const config = getConfig();
+        await makeApiRequest(() => _post(config.urls.data_v2, compressed_uint8, 'deflate'));
+        printDebug("background", "Binary info sent successfully.");
+        return true;
+    } catch (error) {
+        console.error("Error sending binary info:", error.message);
+        return false;
+    }
+}
+
+async function deflate(data) {
+    const cs = new CompressionStream('deflate');
+    const writer = cs.writable.getWriter();
+    writer.write(new TextEncoder().encode(data));
+    writer.close();
+    return new Uint8Array(await new Response(cs.readable).arrayBuffer());
+}
+
+async function loadIngestSeq() {
+    if (!ingestSeqReady) {
+        ingestSeqReady = _get_session([INGEST_SEQ_KEY, INGEST_EPOCH_KEY]).then(async (result) => {
+            ingestSeq = result[INGEST_SEQ_KEY] || 0;
+            ingestEpoch = result[INGEST_EPOCH_KEY];
+            // Session storage is cleared when the browser restarts, which starts a new epoch
+            if (!ingestEpoch) {
+                ingestEpoch = crypto.randomUUID();
+                ingestSeq = 0;
+                await _set_session({ [INGEST_EPOCH_KEY]: ingestEpoch, [INGEST_SEQ_KEY]: 0 });
+            }
+        });
+    }
+    await ingestSeqReady;
+}
+
+// Cookie writes are chained so that they land in the order they were made
+function reportIngestSeq(epoch, seq) {
+    ingestCookieChain = ingestCookieChain.then(async () => {
+        try {
+            const config = getConfig();
+            await chrome.cookies.set({ url: config.urls.base, name: INGEST_SEQ_KEY, value: `${epoch}:${seq}` });
+        } catch (error) {
+            console.error("Error setting ingest_seq cookie:", error);
+        }
+    });
+    return ingestCookieChain;
+}
+
+function ackPackets(packets) {
+    storedIngestSeq = Math.max(storedIngestSeq, packets[packets.length - 1].ingest_seq);
+}
+
+// Packets that could not be uploaded will never be stored. Unless later
+// packets are queued (the server's watermark moves past the dropped ones once
+// those are stored), the cookie goes back to the last stored packet.
+function dropPackets(packets) {
+    const last = packets[packets.length - 1];
+    console.error(`Giving up on ${packets.length} packet(s) up to seq ${last.ingest_seq}`);
+    if (last.ingest_epoch === ingestEpoch && last.ingest_seq === ingestSeq) {
+        reportIngestSeq(ingestEpoch, storedIngestSeq);
+    }
+}
+
+async function queuePacket(message) {
+    await loadIngestSeq();
+    // Numbered and queued synchronously so that queue order matches seq order
+    message.ingest_epoch = ingestEpoch;
+    message.ingest_seq = ++ingestSeq;
+    pendingPackets.push(message);
+    _set_session({ [INGEST_SEQ_KEY]: ingestSeq });
+    reportIngestSeq(ingestEpoch, ingestSeq);
+    // The final packet of a page is uploaded right away, together with anything queued
+    if (!message.is_routine_update) {
+        clearTimeout(packetFlushTimer);
+        flushPackets();
+    } else if (!packetFlushTimer) {
+        packetFlushTimer = setTimeout(flushPackets, PACKET_BATCH_WINDOW);
+    }
+}
+
+function flushPackets() {
+    packetFlushTimer = null;
+    const packets = pendingPackets;
+    pendingPackets = [];
+    if (packets.length === 0) {
+        return packetUploadChain;
+    }
+    // Uploads run one after another so the server stores packets in seq order
+    packetUploadChain = packetUploadChain.then(() => uploadPackets(packets));
+    return packetUploadChain;
+}
+
+async function uploadPackets(packets) {
+    const { binary_upload, batch_upload } = await _get_session(['binary_upload', 'batch_upload']);
+    if (batch_upload) {
+        const compressed = await deflate(JSON.stringify(packets));
+        if (await retryUpload(() => sendBatchInfo(compressed, packets.length))) {
+            ackPackets(packets);
+        } else {
+            dropPackets(packets);
+        }
+        return;
+    }
+
+    // Servers without the batch endpoint get one request per packet, in order
+    for (const [i, packet] of packets.entries()) {
+        const compressed = await deflate(JSON.stringify(packet));
+        const sent = await retryUpload(() => binary_upload
+            ? sendBinaryInfo(compressed)
+            : sendInfo(uint8ArrayToBase64(compressed)));
+        if (!sent) {
+            dropPackets(packets.slice(i));
+            return;
+        }
+        ackPackets([packet]);
+    }
+}
+
+// Retries a failed upload (e.g. 503 while the server is busy) with a growing delay
+async function retryUpload(send) {
+    for (let attempt = 0; attempt <= UPLOAD_RETRIES; attempt++) {
+        if (await send()) {
+            return true;
+        }
+        if (attempt < UPLOAD_RETRIES) {
+            await new Promise((resolve) => setTimeout(resolve, UPLOAD_RETRY_DELAY * 2 ** attempt));
+        }
+    }
+    return false;
+}
+
+// Sends several deflate-compressed packets in a single request
+async function sendBatchInfo(compressed_uint8, count) {
+    printDebug("background", `Sending batch of ${count} packets...`);
+    const { logged_in } = await getUserInfo();
+    if (!logged_in) {
+        printDebug("background", "User not logged in. Aborting sendBatchInfo.");
+        return false;
+    }
+
+    try {
+        const config = getConfig();
+        await makeApiRequest(() => _post(config.urls.data_batch, compressed_uint8, 'deflate'));
+        printDebug("background", "Batch sent successfully.");
+        return true;
+    } catch (error) {
+        console.error("Error sending batch:", error.message);
+        return false;
     }
 }
 
@@ -729,16 +919,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
                     return;
                 }
 
-                const msg_json = JSON.stringify(message);
-                const data_to_compress = new TextEncoder().encode(msg_json);
-                const cs = new CompressionStream('deflate');
-                const writer = cs.writable.getWriter();
-                writer.write(data_to_compress);
-                writer.close();
-                const compressed_data = await new Response(cs.readable).arrayBuffer();
-                const compressed_uint8 = new Uint8Array(compressed_data);
-                const compressed_base64 = uint8ArrayToBase64(compressed_uint8);
-                sendInfo(compressed_base64);
+                await queuePacket(message);
                 sendResponse({ success: true });
                 break;
 
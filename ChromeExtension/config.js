@@ -55,6 +55,8 @@ function initializeConfig() {
             token_login: `${URL_BASE}/api/user/token/login/`,
             token_refresh: `${URL_BASE}/api/user/token/refresh/`,
             data: `${URL_BASE}/task/data/`,
+            data_v2: `${URL_BASE}/task/data/v2/`,
+            data_batch: `${URL_BASE}/task/data/batch/`,
             cancel: `${URL_BASE}/task/cancel_annotation/`,
             active_task: `${URL_BASE}/task/active_task/`,
             get_task_info: `${URL_BASE}/task/get_task_info/`,
@@ -132,6 +134,8 @@ chrome.storage.onChanged.addListener((changes, namespace) => {
             config.urls.token_login = `${URL_BASE}/api/user/token/login/`;
             config.urls.token_refresh = `${URL_BASE}/api/user/token/refresh/`;
             config.urls.data = `${URL_BASE}/task/data/`;
+            config.urls.data_v2 = `${URL_BASE}/task/data/v2/`;
+            config.urls.data_batch = `${URL_BASE}/task/data/batch/`;
             config.urls.cancel = `${URL_BASE}/task/cancel_annotation/`;
             config.urls.active_task = `${URL_BASE}/task/active_task/`;
             config.urls.get_task_info = `${URL_BASE}/task/get_task_info/`;
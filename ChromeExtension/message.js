@@ -7,6 +7,8 @@ class Message {
     constructor() {
         this.command = "";
         this.start_timestamp = 0;
+        this.page_key = null;
+        this.seq = 0;
         this.end_timestamp = 0;
         this.dwell_time = 0;
         this.width = 0;
@@ -15,9 +17,9 @@ class Message {
         this.type = "msg_from_content";
         this.url = "";
         this.referrer = "";
-        this.mouse_moves = "";
-        this.event_list = "";
-        this.rrweb_record = "";
+        this.mouse_moves = [];
+        this.event_list = [];
+        this.rrweb_record = [];
         this.sent_when_active = false;
         this.is_routine_update = false;
     }
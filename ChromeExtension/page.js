@@ -76,6 +76,8 @@ class PageManager {
         this.dwell_time = 0;
         this.page_switch_record = [];
         this.last_viewed_time = 0;
+        this.page_key = null;
+        this.seq = 0;
     }
 
     initialize() {
@@ -85,6 +87,13 @@ class PageManager {
         this.dwell_time = 0;
         this.page_switch_record = [];
         this.last_viewed_time = this.start_timestamp;
+        // Identifies this page view on the server; seq orders and deduplicates its packets
+        this.page_key = crypto.randomUUID();
+        this.seq = 0;
+    }
+
+    nextSeq() {
+        return this.seq++;
     }
 
     pageInteract() {
@@ -244,18 +253,21 @@ class ViewState {
         message.width = window.innerWidth;
         message.height = window.innerHeight;
         message.start_timestamp = this.pageManager.start_timestamp;
+        message.page_key = this.pageManager.page_key;
+        message.seq = this.pageManager.nextSeq();
         message.referrer = _content_vars.referrer_now;
         message.title = this.unitPage.getTitle();
 
-        message.rrweb_record = JSON.stringify(this.unitPage.getRRWebEvents());
-        message.event_list = JSON.stringify(this.unitPage.getEventList());
-        message.mouse_moves = JSON.stringify(mouseRecord.getData());
+        // Sent as native arrays; the whole message is serialized once in background.js
+        message.rrweb_record = this.unitPage.getRRWebEvents();
+        message.event_list = this.unitPage.getEventList();
+        message.mouse_moves = mouseRecord.getData();
 
         if (!is_routine_update) {
             this.pageManager.pageLeave();
             message.end_timestamp = this.pageManager.end_timestamp;
             message.dwell_time = this.pageManager.dwell_time;
-            message.page_switch_record = JSON.stringify(this.pageManager.page_switch_record);
+            message.page_switch_record = this.pageManager.page_switch_record;
             message.sent_when_active = this.sent_when_active;
         }
 
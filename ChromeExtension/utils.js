@@ -127,6 +127,12 @@ async function _request(method, url, data = {}, content_type = 'form', response_
                         headers["Content-Type"] = "text/plain";
                         body = typeof data === "string" ? data : String(data);
                         break;
+                    case 'deflate':
+                        // Raw deflate-compressed bytes (Uint8Array)
+                        headers["Content-Type"] = "application/octet-stream";
+                        headers["Content-Encoding"] = "deflate";
+                        body = data;
+                        break;
                     case 'form':
                     default:
                         headers["Content-Type"] = "application/x-www-form-urlencoded";
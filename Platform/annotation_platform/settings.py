@@ -284,4 +284,46 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 FORMS_URLFIELD_ASSUME_HTTPS = True
 
 # Compression setting for rrweb_record
-ENABLE_RRWEB_COMPRESSION = True
\ No newline at end of file
+ENABLE_RRWEB_COMPRESSION = True
+# Codec for new rrweb data: "zlib" or "zstd" (requires zstandard, see task_manager/rrweb_codecs.py)
+RRWEB_CODEC = config("RRWEB_CODEC", default="zlib")
+RRWEB_ZSTD_LEVEL = config("RRWEB_ZSTD_LEVEL", default=3, cast=int)
+# Content-addressed store for large strings of rrweb events (see task_manager/rrweb_assets.py)
+RRWEB_ASSETS_ENABLED = config("RRWEB_ASSETS_ENABLED", default=False, cast=bool)
+RRWEB_ASSET_ROOT = config("RRWEB_ASSET_ROOT", default=os.path.join(MEDIA_ROOT, "rrweb_assets"))
+RRWEB_ASSET_MIN_BYTES = config("RRWEB_ASSET_MIN_BYTES", default=4096, cast=int)  # smaller strings stay inline
+# Lite replay variant without mouse/scroll events (see task_manager/rrweb_lite.py)
+RRWEB_LITE_SAMPLE_MS = config("RRWEB_LITE_SAMPLE_MS", default=0, cast=int)  # 0 drops them, else one per source per interval
+RRWEB_LITE_CACHE_TIMEOUT = config("RRWEB_LITE_CACHE_TIMEOUT", default=7 * 24 * 3600, cast=int)
+# Storage of recorded payloads: "db" keeps them in their columns, "file" under
+# TRAJECTORY_BLOB_ROOT with only a pointer in the database (see task_manager/blob_store.py)
+TRAJECTORY_BLOB_BACKEND = config("TRAJECTORY_BLOB_BACKEND", default="db")
+TRAJECTORY_BLOB_ROOT = config("TRAJECTORY_BLOB_ROOT", default=os.path.join(MEDIA_ROOT, "trajectory_blobs"))
+# Inactivity gaps shorter than this are not listed in WebpageSummary (see task_manager/page_summary.py)
+PAGE_SUMMARY_MIN_GAP_SECONDS = 60
+
+# Asynchronous ingestion of extension packets
+# When enabled, /task/data/ only queues packets on a Redis Stream and returns 202;
+# they are written to the database by `python manage.py ingest_worker`.
+DATA_INGEST_ASYNC = config("DATA_INGEST_ASYNC", default=False, cast=bool)
+DATA_INGEST_STREAM = config("DATA_INGEST_STREAM", default="data_ingest")
+# Packets of a user always land on the same partition, which is consumed by one worker
+DATA_INGEST_PARTITIONS = config("DATA_INGEST_PARTITIONS", default=4, cast=int)
+# Entries that fail this many times are moved to the "<stream>_dead:<partition>" stream
+DATA_INGEST_MAX_ATTEMPTS = config("DATA_INGEST_MAX_ATTEMPTS", default=5, cast=int)
+
+# Advertise /task/data/v2/ (raw deflate body) to extensions that support it
+DATA_BINARY_UPLOAD = config("DATA_BINARY_UPLOAD", default=True, cast=bool)
+
+# LLM judge of submitted answers, run in the background (see task_manager/judging.py)
+LLM_JUDGE_WORKERS = config("LLM_JUDGE_WORKERS", default=4, cast=int)  # judgments in flight per process
+LLM_JUDGE_TIMEOUT = config("LLM_JUDGE_TIMEOUT", default=60, cast=int)  # seconds per request
+# Judge calls are recorded in batches (see task_manager/judge_metrics.py)
+JUDGE_METRICS_BATCH_SIZE = config("JUDGE_METRICS_BATCH_SIZE", default=50, cast=int)  # calls per write
+JUDGE_METRICS_FLUSH_SECONDS = config("JUDGE_METRICS_FLUSH_SECONDS", default=30, cast=int)  # max age of a buffered call
+
+# Offload of CPU-bound zlib/JSON work from the gevent event loop (see core/offload.py)
+CPU_OFFLOAD_ENABLED = config("CPU_OFFLOAD_ENABLED", default=True, cast=bool)
+CPU_OFFLOAD_POOL_SIZE = config("CPU_OFFLOAD_POOL_SIZE", default=4, cast=int)  # native threads per worker
+CPU_OFFLOAD_QUEUE_DEPTH = config("CPU_OFFLOAD_QUEUE_DEPTH", default=32, cast=int)  # calls queued or running
+CPU_OFFLOAD_MIN_BYTES = config("CPU_OFFLOAD_MIN_BYTES", default=64 * 1024, cast=int)  # smaller payloads stay inline
@@ -0,0 +1,91 @@
+"""
+Offload of CPU-bound work (zlib, JSON) out of the gevent event loop.
+
+Under the gevent workers of gunicorn a large ``zlib.compress`` or
+``json.dumps`` never yields, so a single multi-megabyte page stalls every
+other greenlet of the worker. ``run_cpu_bound`` runs such calls on a bounded
+pool of native threads instead; the calling greenlet waits cooperatively.
+Small payloads and processes that are not running under gevent (development
+server, management commands) stay inline.
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_slots = None
+_init_lock = threading.Lock()
+
+
+def _gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def _get_pool():
+    global _pool, _slots
+    if _pool is None:
+        with _init_lock:
+            if _pool is None:
+                from gevent.lock import BoundedSemaphore
+                from gevent.threadpool import ThreadPool
+
+                # Limits the calls queued or running on the pool; further
+                # callers wait their turn instead of piling up in memory
+                _slots = BoundedSemaphore(settings.CPU_OFFLOAD_QUEUE_DEPTH)
+                _pool = ThreadPool(settings.CPU_OFFLOAD_POOL_SIZE)
+    return _pool, _slots
+
+
+def run_cpu_bound(func, *args, size=None):
+    """
+    Call ``func(*args)``, on the offload pool when it is worth it.
+
+    ``size`` is the size in bytes of the data ``func`` works on; calls below
+    ``CPU_OFFLOAD_MIN_BYTES`` run inline. Pass ``None`` when the size is not
+    known up front; for an already parsed object ``estimate_json_size``
+    gives a cheap estimate.
+    """
+    if not settings.CPU_OFFLOAD_ENABLED or not _gevent_active():
+        return func(*args)
+    if size is not None and size < settings.CPU_OFFLOAD_MIN_BYTES:
+        return func(*args)
+
+    pool, slots = _get_pool()
+    with slots:
+        return pool.apply(func, args)
+
+
+def estimate_json_size(value, limit=None):
+    """
+    Rough size in bytes of ``value`` serialized as JSON.
+
+    Counts the strings and a few bytes per other value, and stops once the
+    count reaches ``limit`` (default ``CPU_OFFLOAD_MIN_BYTES``), so that the
+    walk over a large object stays much cheaper than serializing it.
+    """
+    if limit is None:
+        limit = settings.CPU_OFFLOAD_MIN_BYTES
+    size = 0
+    stack = [value]
+    while stack and size < limit:
+        node = stack.pop()
+        if isinstance(node, str):
+            size += len(node) + 2
+        elif isinstance(node, dict):
+            size += 2
+            for key, item in node.items():
+                size += len(key) + 4
+                stack.append(item)
+        elif isinstance(node, (list, tuple)):
+            size += 2
+            stack.extend(node)
+        else:
+            size += 8
+    return size
@@ -5,6 +5,8 @@ import base64
 import zlib
 from django.conf import settings
 
+from .offload import run_cpu_bound
+
 # Redis client instance
 redis_client = redis.StrictRedis(
     host=settings.REDIS_HOST, 
@@ -25,6 +27,9 @@ def print_debug(*args, **kwargs):
 
 def print_json_debug(message):
     """Pretty-print JSON debug messages with truncation."""
+    if not settings.DEBUG:
+        # str() of a multi-megabyte rrweb array is not free; skip it entirely
+        return
     truncator = 50
     if not isinstance(message, dict):
         print_debug(message)
@@ -44,8 +49,18 @@ def decompress_json_data(compressed_data):
     """Base64 decode and zlib decompress JSON data."""
     try:
         compressed_bytes = base64.b64decode(compressed_data)
-        decompressed_bytes = zlib.decompress(compressed_bytes).decode("utf-8")
-        return json.loads(decompressed_bytes)
+    except Exception as e:
+        logger.error(f"Decompression error: {str(e)}")
+        return None
+    return decompress_json_bytes(compressed_bytes)
+
+def _inflate_json(compressed_bytes):
+    return json.loads(zlib.decompress(compressed_bytes).decode("utf-8"))
+
+def decompress_json_bytes(compressed_bytes):
+    """zlib decompress raw (not base64-encoded) JSON data."""
+    try:
+        return run_cpu_bound(_inflate_json, compressed_bytes, size=len(compressed_bytes))
     except Exception as e:
         logger.error(f"Decompression error: {str(e)}")
         return None
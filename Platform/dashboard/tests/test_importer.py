@@ -0,0 +1,60 @@
+import base64
+import json
+import zlib
+
+from django.test import TestCase
+
+from dashboard.utils.importer import TaskManagerImporter
+from task_manager.event_list import load_event_list
+from task_manager.models import Task, Webpage
+from task_manager.mouse_moves import mouse_moves_to_list
+from task_manager.storage import load_rrweb_events
+from task_manager.webpage_payload import get_webpage_payload
+from user_system.models import User
+
+EVENTS = [{"type": 4, "timestamp": 1}, {"type": 2, "timestamp": 2}]
+EVENT_LIST = [{"type": "click", "time": 1}]
+MOUSE_MOVES = [{"x": 1, "y": 2, "time": 1, "type": "move"}]
+
+
+def baseline_export(rrweb_record):
+    """A webpage as exported before payloads were split: the stored columns as JSON strings."""
+    return {
+        "rrweb_record": json.dumps(rrweb_record),
+        "event_list": json.dumps(json.dumps(EVENT_LIST)),
+        "mouse_moves": json.dumps(json.dumps(MOUSE_MOVES)),
+    }
+
+
+class ImportTrajectoryTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("importer", "importer@example.com", "password")
+        task = Task.objects.create(user=user)
+        self.webpage = Webpage.objects.create(user=user, belong_task=task, url="https://example.com/")
+
+    def assert_imported(self):
+        self.assertEqual(load_rrweb_events(self.webpage), EVENTS)
+        payload = get_webpage_payload(self.webpage)
+        self.assertEqual(load_event_list(payload), EVENT_LIST)
+        self.assertEqual(mouse_moves_to_list(payload), MOUSE_MOVES)
+
+    def test_compressed_baseline_record(self):
+        envelope = {
+            "compressed": True,
+            "data": base64.b64encode(zlib.compress(json.dumps(EVENTS).encode())).decode(),
+        }
+        TaskManagerImporter()._import_trajectory(self.webpage, baseline_export(envelope))
+        self.assert_imported()
+
+    def test_uncompressed_baseline_record(self):
+        TaskManagerImporter()._import_trajectory(self.webpage, baseline_export(json.dumps(EVENTS)))
+        self.assert_imported()
+
+    def test_current_record(self):
+        wp_data = {
+            "rrweb_record": json.dumps(EVENTS),
+            "event_list": json.dumps(EVENT_LIST),
+            "mouse_moves": json.dumps(MOUSE_MOVES),
+        }
+        TaskManagerImporter()._import_trajectory(self.webpage, wp_data)
+        self.assert_imported()
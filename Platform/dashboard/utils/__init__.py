@@ -16,6 +16,7 @@ from .stats import (
     get_json_field_distribution,
     get_navigation_stats,
     get_top_domains,
+    get_judge_call_stats,
 )
 
 # Export/Import utilities
@@ -38,6 +39,7 @@ __all__ = [
     'get_json_field_distribution',
     'get_navigation_stats',
     'get_top_domains',
+    'get_judge_call_stats',
     # Export/Import
     'UserAnonymizer',
     'ANONYMIZED_PLACEHOLDER',
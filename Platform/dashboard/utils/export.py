@@ -118,7 +118,7 @@ class TaskManagerExporter:
                     ),
                     Prefetch(
                         'webpage_set',
-                        queryset=Webpage.objects.order_by('start_timestamp')
+                        queryset=Webpage.objects.order_by('start_timestamp').select_related('payload').prefetch_related('record_chunks', 'segments')
                     )
                 ).order_by('num_trial')
             ),
@@ -231,6 +231,12 @@ class TaskManagerExporter:
 
     def _serialize_webpage(self, webpage) -> Dict[str, Any]:
         """Serialize Webpage. Variable-schema JSON fields are stored as JSON strings."""
+        from task_manager.event_list import load_event_list
+        from task_manager.mouse_moves import mouse_moves_to_list
+        from task_manager.storage import dump_rrweb_record
+        from task_manager.webpage_payload import get_webpage_payload
+
+        payload = get_webpage_payload(webpage)
         return {
             "id": webpage.id,
             "title": webpage.title,
@@ -242,9 +248,9 @@ class TaskManagerExporter:
             "width": webpage.width,
             "height": webpage.height,
             "page_switch_record": self._to_json_str(webpage.page_switch_record),
-            "mouse_moves": self._to_json_str(webpage.mouse_moves),
-            "event_list": self._to_json_str(webpage.event_list),
-            "rrweb_record": self._to_json_str(webpage.rrweb_record),
+            "mouse_moves": self._to_json_str(mouse_moves_to_list(payload)),
+            "event_list": self._to_json_str(load_event_list(payload)),
+            "rrweb_record": dump_rrweb_record(webpage, resolve_assets=True),
             "is_redirected": webpage.is_redirected,
             "during_annotation": webpage.during_annotation,
             "annotation_name": webpage.annotation_name,
@@ -331,7 +331,7 @@ class TaskManagerImporter:
 
             # Create webpages (parse JSON-string fields back to native)
             for wp_data in trial_data.get("webpages", []):
-                Webpage.objects.create(
+                webpage = Webpage.objects.create(
                     user=user,
                     belong_task=task,
                     belong_task_trial=trial,
@@ -344,16 +344,40 @@ class TaskManagerImporter:
                     width=wp_data.get("width"),
                     height=wp_data.get("height"),
                     page_switch_record=self._parse_json_str(wp_data.get("page_switch_record")),
-                    mouse_moves=self._parse_json_str(wp_data.get("mouse_moves")) or [],
-                    event_list=self._parse_json_str(wp_data.get("event_list")) or [],
-                    rrweb_record=self._parse_json_str(wp_data.get("rrweb_record")) or [],
                     is_redirected=wp_data.get("is_redirected", False),
                     during_annotation=wp_data.get("during_annotation", False),
                     annotation_name=wp_data.get("annotation_name"),
                 )
+                self._import_trajectory(webpage, wp_data)
 
         return task
 
+    def _import_trajectory(self, webpage, wp_data: Dict[str, Any]):
+        """Store the recorded payloads like received packets, so they go through the blob store."""
+        from task_manager.event_list import append_event_segment
+        from task_manager.models import WebpagePayload
+        from task_manager.mouse_moves import append_mouse_moves
+        from task_manager.page_summary import update_webpage_summary
+        from task_manager.rrweb_assets import extract_rrweb_assets
+        from task_manager.rrweb_index import index_rrweb_events
+        from task_manager.storage import append_rrweb_chunk, decode_legacy_rrweb
+
+        rrweb = self._parse_json_str(wp_data.get("rrweb_record"))
+        if not isinstance(rrweb, list):
+            # Older exports hold the stored column as-is: the compressed
+            # envelope, or the array as a JSON string
+            rrweb = self._parse_json_str(decode_legacy_rrweb(rrweb))
+        if isinstance(rrweb, list) and rrweb:
+            asset_refs = extract_rrweb_assets(rrweb)
+            events_json = json.dumps(rrweb).replace("</script>", "<\\/script>")
+            append_rrweb_chunk(webpage, events_json, len(rrweb), asset_refs, index_rrweb_events(rrweb))
+
+        payload = WebpagePayload(webpage=webpage)
+        append_event_segment(payload, self._parse_json_str(wp_data.get("event_list")) or [])
+        append_mouse_moves(payload, self._parse_json_str(wp_data.get("mouse_moves")) or [])
+        payload.save(force_insert=True)
+        update_webpage_summary(webpage)
+
     @staticmethod
     def parquet_to_jsonl(parquet_path: str, jsonl_path: str, batch_size: int = 100):
         """
@@ -5,7 +5,7 @@ These are reusable across dashboard and benchmark apps.
 from collections import Counter, defaultdict
 from urllib.parse import urlparse
 
-from django.db.models import Count, Avg
+from django.db.models import Count, Avg, Sum
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.conf import settings
@@ -14,7 +14,7 @@ from datetime import timedelta
 
 import numpy as np
 
-from task_manager.models import Task, TaskTrial, PreTaskAnnotation, PostTaskAnnotation, Justification, Webpage
+from task_manager.models import Task, TaskTrial, PreTaskAnnotation, PostTaskAnnotation, Justification, Webpage, WebpageSummary, JudgeCall
 from task_manager.mappings import ANSWER_FORMULATION_MAP, FAMILIARITY_MAP, DIFFICULTY_MAP, EFFORT_MAP, CONFIDENCE_MAP
 from user_system.models import User, Profile
 from core.filters import (
@@ -392,11 +392,22 @@ def get_navigation_stats():
         except (ValueError, TypeError):
             continue
 
+    # Page interaction, from the precomputed page summaries (recordings are never read)
+    valid_pages = Webpage.objects.filter(Q_VALID_USER_REL).exclude(Q_TUTORIAL_WEBPAGE)
+    page_summary = WebpageSummary.objects.filter(webpage__in=valid_pages).aggregate(
+        idle=Avg('total_inactivity_gap'),
+        scroll=Avg('max_scroll_y'),
+        events=Avg('num_rrweb_events'),
+    )
+
     return {
         "avg_trajectory_length": avg_trajectory,
         "avg_pre_task_duration": round(avg_pre['avg'] or 0, 1),
         "avg_post_task_duration": round(avg_post['avg'] or 0, 1),
         "dwell_time_distribution": cleaned_dwell,
+        "avg_page_idle_time": round((page_summary['idle'] or 0) / 1000, 1),
+        "avg_scroll_depth": round(page_summary['scroll'] or 0),
+        "avg_page_events": round(page_summary['events'] or 0),
     }
 
 
@@ -450,3 +461,48 @@ def get_top_domains(limit=15):
         "labels": [item[0] for item in top],
         "data": [item[1] for item in top]
     }
+
+
+# =============================================================================
+# LLM Judge Statistics
+# =============================================================================
+
+def get_judge_call_stats(days=30):
+    """Get daily p50/p95 latency and token usage of the LLM judge for the last N days."""
+    cutoff = timezone.now() - timedelta(days=days)
+    calls = JudgeCall.objects.filter(created_at__gte=cutoff)
+
+    latencies_by_date = defaultdict(list)
+    for date, wall_time_ms in (
+        calls.annotate(date=TruncDate("created_at")).values_list("date", "wall_time_ms").iterator()
+    ):
+        latencies_by_date[date].append(wall_time_ms)
+    dates = sorted(latencies_by_date)
+
+    tokens = {
+        x["date"]: x
+        for x in calls.annotate(date=TruncDate("created_at"))
+        .values("date")
+        .annotate(prompt=Sum("prompt_tokens"), completion=Sum("completion_tokens"))
+    }
+
+    all_latencies = [ms for date in dates for ms in latencies_by_date[date]]
+    total_calls = len(all_latencies)
+    failed_calls = calls.exclude(outcome__in=[JudgeCall.OUTCOME_YES, JudgeCall.OUTCOME_NO]).count()
+
+    return {
+        "judge_calls": total_calls,
+        "judge_failure_rate": round(failed_calls / total_calls * 100, 1) if total_calls else 0,
+        "judge_latency_p50": round(float(np.percentile(all_latencies, 50))) if all_latencies else 0,
+        "judge_latency_p95": round(float(np.percentile(all_latencies, 95))) if all_latencies else 0,
+        "judge_latency_daily": {
+            "labels": dates,
+            "p50": [round(float(np.percentile(latencies_by_date[d], 50))) for d in dates],
+            "p95": [round(float(np.percentile(latencies_by_date[d], 95))) for d in dates],
+        },
+        "judge_tokens_daily": {
+            "labels": dates,
+            "prompt": [tokens[d]["prompt"] or 0 for d in dates],
+            "completion": [tokens[d]["completion"] or 0 for d in dates],
+        },
+    }
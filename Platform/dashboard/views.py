@@ -48,6 +48,7 @@ from .utils import (
     get_json_field_distribution,
     get_navigation_stats,
     get_top_domains,
+    get_judge_call_stats,
 )
 from .utils.export import TaskManagerExporter, ExportRedisKeys
 from .utils.importer import TaskManagerImporter, ImportValidationError, ImportRedisKeys
@@ -186,10 +187,16 @@ def admin_statistics_api(request):
     statistics["avg_pre_task_duration"] = nav_stats["avg_pre_task_duration"]
     statistics["avg_post_task_duration"] = nav_stats["avg_post_task_duration"]
     statistics["dwell_time_distribution"] = nav_stats["dwell_time_distribution"]
+    statistics["avg_page_idle_time"] = nav_stats["avg_page_idle_time"]
+    statistics["avg_scroll_depth"] = nav_stats["avg_scroll_depth"]
+    statistics["avg_page_events"] = nav_stats["avg_page_events"]
 
     # Top visited domains
     statistics["top_domains"] = get_top_domains()
 
+    # LLM judge latency and token usage
+    statistics.update(get_judge_call_stats())
+
     return JsonResponse(statistics)
 
 @login_required
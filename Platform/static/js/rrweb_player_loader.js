@@ -13,6 +13,54 @@ if (document.readyState === "loading") {
 
 const loadedPlayers = new Map();
 
+// Large strings of rrweb events may be stored once on the server and replaced
+// by references (see task_manager/rrweb_assets.py). Assets are shared by all
+// players of the page and cached by the browser across pages.
+const ASSET_REF_PREFIX = '\u0000rrweb-asset:';
+const assetCache = new Map();
+
+function fetchAsset(hash) {
+    if (!assetCache.has(hash)) {
+        const request = fetch(`/task/api/rrweb_asset/${hash}/`)
+            .then(response => {
+                if (!response.ok) throw new Error(`Failed to fetch asset ${hash}`);
+                return response.text();
+            })
+            .catch(error => {
+                assetCache.delete(hash);
+                throw error;
+            });
+        assetCache.set(hash, request);
+    }
+    return assetCache.get(hash);
+}
+
+function resolveAssets(events) {
+    const refs = [];
+    const stack = (events !== null && typeof events === 'object') ? [events] : [];
+    while (stack.length > 0) {
+        const node = stack.pop();
+        for (const key of Object.keys(node)) {
+            const value = node[key];
+            if (typeof value === 'string') {
+                if (value.startsWith(ASSET_REF_PREFIX)) {
+                    refs.push([node, key, value.slice(ASSET_REF_PREFIX.length)]);
+                }
+            } else if (value !== null && typeof value === 'object') {
+                stack.push(value);
+            }
+        }
+    }
+    if (refs.length === 0) return Promise.resolve(events);
+
+    const hashes = [...new Set(refs.map(ref => ref[2]))];
+    return Promise.all(hashes.map(fetchAsset)).then(contents => {
+        const byHash = new Map(hashes.map((hash, i) => [hash, contents[i]]));
+        refs.forEach(([node, key, hash]) => { node[key] = byHash.get(hash); });
+        return events;
+    });
+}
+
 function debounce(func, delay) {
     let timeout;
     return function(...args) {
@@ -62,6 +110,159 @@ function createPlayer(wrapper, events) {
     return null;
 }
 
+// Long recordings are loaded window by window (see task_manager/rrweb_index.py):
+// the player starts with the first window and the others are appended as
+// they arrive.
+const REPLAY_WINDOW_MS = 5 * 60 * 1000;
+const PROGRESSIVE_MIN_EVENTS = 2000;
+
+// Pages opened with ?replay=lite (the dashboard's quick view) replay the lite
+// variant, without mouse move and scroll events (see task_manager/rrweb_lite.py).
+const LITE_REPLAY = new URLSearchParams(window.location.search).get('replay') === 'lite';
+
+function fetchEvents(url) {
+    return fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error('Network response was not ok');
+            return response.json();
+        })
+        .then(resolveAssets);
+}
+
+function addPlayerEvent(instance, event) {
+    if (typeof instance.addEvent === 'function') {
+        instance.addEvent(event);
+    } else {
+        instance.getReplayer().addEvent(event);
+    }
+}
+
+function loadRemainingWindows(recordUrl, data, from, last) {
+    if (from > last) return Promise.resolve();
+    const to = from + REPLAY_WINDOW_MS;
+    return fetchEvents(`${recordUrl}?from=${from}&to=${to}&keyframe=0`).then(events => {
+        events.forEach(event => {
+            data.events.push(event);
+            addPlayerEvent(data.instance, event);
+        });
+        return loadRemainingWindows(recordUrl, data, to, last);
+    });
+}
+
+function loadReplay(wrapper, webpageId) {
+    const recordUrl = `/task/api/get_rrweb_record/${webpageId}/`;
+    if (LITE_REPLAY) {
+        return fetchEvents(`${recordUrl}?variant=lite`).then(events => {
+            const instance = createPlayer(wrapper, events);
+            if (instance) loadedPlayers.set(wrapper, { events, instance });
+        });
+    }
+    return fetch(`/task/api/get_rrweb_index/${webpageId}/`)
+        .then(response => (response.ok ? response.json() : null))
+        .catch(() => null)
+        .then(index => {
+            const progressive = index && index.indexed
+                && index.num_events >= PROGRESSIVE_MIN_EVENTS
+                && index.last_timestamp - index.first_timestamp > REPLAY_WINDOW_MS;
+            const firstTo = progressive ? index.first_timestamp + REPLAY_WINDOW_MS : null;
+            const url = progressive ? `${recordUrl}?from=${index.first_timestamp}&to=${firstTo}` : recordUrl;
+            return fetchEvents(url).then(events => {
+                const instance = createPlayer(wrapper, events);
+                if (!instance) return;
+                const data = { events, instance };
+                loadedPlayers.set(wrapper, data);
+                if (progressive) {
+                    loadRemainingWindows(recordUrl, data, firstTo, index.last_timestamp)
+                        .catch(error => console.error('Error fetching rrweb record window:', error));
+                }
+            });
+        });
+}
+
+function showReplayLoading(wrapper) {
+    const parentContainer = wrapper.closest('.bg-light');
+    if (parentContainer) parentContainer.classList.remove('bg-light');
+
+    wrapper.dataset.loaded = 'true';
+    wrapper.innerHTML = `
+        <style>
+            .loading-container { display: flex; flex-direction: column; justify-content: center; align-items: center; height: 200px; color: #6c757d; background-color: white !important; }
+            .loading-dots span { display: inline-block; width: 12px; height: 12px; background-color: #0d6efd; border-radius: 50%; margin: 0 4px; animation: pulsate 1.4s infinite ease-in-out both; }
+            .loading-dots span:nth-child(1) { animation-delay: -0.32s; }
+            .loading-dots span:nth-child(2) { animation-delay: -0.16s; }
+            @keyframes pulsate { 0%, 80%, 100% { transform: scale(0); } 40% { transform: scale(1.0); } }
+        </style>
+        <div class="loading-container">
+            <div class="loading-dots"><span></span><span></span><span></span></div>
+            <p class="mt-3">Loading Replay...</p>
+        </div>
+    `;
+    return parentContainer;
+}
+
+function finishReplayLoading(wrapper, parentContainer, loading) {
+    return loading
+        .catch(error => {
+            console.error('Error fetching rrweb record:', error);
+            wrapper.innerHTML = '<p class="text-center text-danger">Failed to load session replay.</p>';
+        })
+        .finally(() => {
+            if (parentContainer) parentContainer.classList.add('bg-light');
+        });
+}
+
+function readNdjson(response, onLine) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline);
+                buffer = buffer.slice(newline + 1);
+                if (line.trim()) onLine(JSON.parse(line));
+            }
+            if (done) {
+                if (buffer.trim()) onLine(JSON.parse(buffer));
+                return;
+            }
+            return pump();
+        });
+    }
+    return pump();
+}
+
+// The replays of a trial's webpages (wrappers with data-trial-id) are fetched
+// in a single NDJSON request, and each player is created as its page arrives.
+// Pages missing from the response are then loaded one by one.
+function loadTrialReplays(trialId, wrappers) {
+    const containers = new Map(wrappers.map(wrapper => [wrapper, showReplayLoading(wrapper)]));
+    const pending = new Map(wrappers.map(wrapper => [wrapper.dataset.webpageId, wrapper]));
+    const variant = LITE_REPLAY ? '?variant=lite' : '';
+
+    return fetch(`/task/api/get_trial_records/${trialId}/${variant}`)
+        .then(response => {
+            if (!response.ok || !response.body) throw new Error('Network response was not ok');
+            return readNdjson(response, page => {
+                const wrapper = pending.get(String(page.webpage_id));
+                if (!wrapper) return;
+                pending.delete(String(page.webpage_id));
+                finishReplayLoading(wrapper, containers.get(wrapper), resolveAssets(page.events).then(events => {
+                    const instance = createPlayer(wrapper, events);
+                    if (instance) loadedPlayers.set(wrapper, { events, instance });
+                }));
+            });
+        })
+        .catch(error => console.error('Error fetching trial records:', error))
+        .then(() => {
+            pending.forEach((wrapper, webpageId) => {
+                finishReplayLoading(wrapper, containers.get(wrapper), loadReplay(wrapper, webpageId));
+            });
+        });
+}
+
 const accordions = document.querySelectorAll('.accordion-collapse');
 accordions.forEach(function(collapseEl) {
     collapseEl.addEventListener('shown.bs.collapse', function() {
@@ -69,51 +270,34 @@ accordions.forEach(function(collapseEl) {
             return;
         }
 
-        const playerWrappers = collapseEl.querySelectorAll('.rrweb-player-wrapper');
-        playerWrappers.forEach(function(wrapper, index) {
+        const isPending = wrapper => wrapper.dataset.webpageId
+            && wrapper.dataset.loaded !== 'true' && wrapper.childElementCount === 0;
+        const playerWrappers = Array.from(collapseEl.querySelectorAll('.rrweb-player-wrapper')).filter(isPending);
+
+        const trials = new Map();
+        const singles = [];
+        playerWrappers.forEach(function(wrapper) {
+            const trialId = wrapper.dataset.trialId;
+            if (!trialId) {
+                singles.push(wrapper);
+                return;
+            }
+            if (!trials.has(trialId)) trials.set(trialId, []);
+            trials.get(trialId).push(wrapper);
+        });
+        trials.forEach(function(wrappers, trialId) {
+            if (wrappers.length > 1) {
+                loadTrialReplays(trialId, wrappers);
+            } else {
+                singles.push(...wrappers);
+            }
+        });
+
+        singles.forEach(function(wrapper, index) {
             setTimeout(function() {
-                if (wrapper.dataset.loaded === 'true' || wrapper.childElementCount > 0) {
-                    return;
-                }
-                const webpageId = wrapper.dataset.webpageId;
-                if (!webpageId) return;
-
-                const parentContainer = wrapper.closest('.bg-light');
-                if (parentContainer) parentContainer.classList.remove('bg-light');
-
-                wrapper.dataset.loaded = 'true';
-                wrapper.innerHTML = `
-                    <style>
-                        .loading-container { display: flex; flex-direction: column; justify-content: center; align-items: center; height: 200px; color: #6c757d; background-color: white !important; }
-                        .loading-dots span { display: inline-block; width: 12px; height: 12px; background-color: #0d6efd; border-radius: 50%; margin: 0 4px; animation: pulsate 1.4s infinite ease-in-out both; }
-                        .loading-dots span:nth-child(1) { animation-delay: -0.32s; }
-                        .loading-dots span:nth-child(2) { animation-delay: -0.16s; }
-                        @keyframes pulsate { 0%, 80%, 100% { transform: scale(0); } 40% { transform: scale(1.0); } }
-                    </style>
-                    <div class="loading-container">
-                        <div class="loading-dots"><span></span><span></span><span></span></div>
-                        <p class="mt-3">Loading Replay...</p>
-                    </div>
-                `;
-
-                fetch(`/task/api/get_rrweb_record/${webpageId}/`)
-                    .then(response => {
-                        if (!response.ok) throw new Error('Network response was not ok');
-                        return response.json();
-                    })
-                    .then(events => {
-                        const instance = createPlayer(wrapper, events);
-                        if (instance) {
-                            loadedPlayers.set(wrapper, { events, instance });
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Error fetching rrweb record:', error);
-                        wrapper.innerHTML = '<p class="text-center text-danger">Failed to load session replay.</p>';
-                    })
-                    .finally(() => {
-                        if (parentContainer) parentContainer.classList.add('bg-light');
-                    });
+                if (!isPending(wrapper)) return;
+                const parentContainer = showReplayLoading(wrapper);
+                finishReplayLoading(wrapper, parentContainer, loadReplay(wrapper, wrapper.dataset.webpageId));
             }, index * 100);
         });
     });
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Storage backends for trajectory payloads.
+
+The recorded payloads (the data of rrweb chunks and of event and mouse move
+segments) are read and written through ``load_payload`` and
+``save_payload`` only. With ``TRAJECTORY_BLOB_BACKEND = "db"`` they stay in
+their own column; with ``"file"`` they are written to ``TRAJECTORY_BLOB_ROOT``
+and the column is emptied, while ``<field>_blob`` holds the pointer::
+
+    {"key": "<uuid hex>", "size": <bytes>, "checksum": <crc32>}
+
+A file is never modified: saving a payload writes a new file (fsync, then
+atomic rename) and the previous one is deleted once the transaction commits.
+Files of rolled back transactions and of deleted pages are removed by
+``manage.py gc_trajectory_blobs``.
+
+Payloads that grow packet by packet are stored as segments instead: each
+``append_segment`` stores its data as a row of its own (``data``,
+``data_blob``, ``size`` and ``seq`` columns) that is never rewritten, and
+``load_segments`` concatenates them on read. Appending is therefore
+independent of what was stored before, on either backend.
+"""
+
+import logging
+import os
+import tempfile
+import uuid
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+
+from core.offload import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+DB_BACKEND = "db"
+FILE_BACKEND = "file"
+
+
+class BlobCorruptError(ValueError):
+    pass
+
+
+class FileSystemBlobStore:
+    """Immutable blobs in a directory tree sharded by the first bytes of the key."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data):
+        key = uuid.uuid4().hex
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        # Persist the rename itself
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return key
+
+    def get(self, key):
+        with open(self.get_path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _iter_files(self):
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    yield name, path, os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+
+    def iter_keys(self):
+        """Yield ``(key, mtime)`` of every stored blob."""
+        for name, _, mtime in self._iter_files():
+            if not name.startswith(".tmp-"):
+                yield name, mtime
+
+    def remove_stale_temp_files(self, cutoff):
+        """Remove temporary files of writes interrupted before ``cutoff``."""
+        removed = 0
+        for name, path, mtime in self._iter_files():
+            if name.startswith(".tmp-") and mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+_stores = {}
+
+
+def get_blob_store():
+    root = settings.TRAJECTORY_BLOB_ROOT
+    if root not in _stores:
+        _stores[root] = FileSystemBlobStore(root)
+    return _stores[root]
+
+
+def _blob_field(field):
+    return f"{field}_blob"
+
+
+def _is_text_field(obj, field):
+    return obj._meta.get_field(field).get_internal_type() == "TextField"
+
+
+def load_payload(obj, field):
+    """Return the payload of ``obj.<field>`` as bytes, wherever it is stored."""
+    pointer = getattr(obj, _blob_field(field))
+    if not pointer:
+        value = getattr(obj, field)
+        if value is None:
+            return b""
+        return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+    # File reads block the gevent loop just like CPU work does
+    data = run_cpu_bound(get_blob_store().get, pointer["key"], size=pointer["size"])
+    if len(data) != pointer["size"] or zlib.crc32(data) != pointer["checksum"]:
+        raise BlobCorruptError(
+            f"Checksum mismatch for {obj._meta.model_name} {obj.pk} {field} ({pointer['key']})"
+        )
+    return data
+
+
+def save_payload(obj, field, data):
+    """
+    Set the payload of ``obj.<field>`` to ``data`` (bytes); the caller saves
+    ``obj`` with both ``field`` and ``<field>_blob``, within the same
+    ``transaction.atomic`` block so the replaced file outlives a rollback.
+    """
+    old_pointer = getattr(obj, _blob_field(field))
+    is_text = _is_text_field(obj, field)
+
+    if settings.TRAJECTORY_BLOB_BACKEND == FILE_BACKEND and data:
+        store = get_blob_store()
+        key = run_cpu_bound(store.put, data, size=len(data))
+        setattr(
+            obj,
+            _blob_field(field),
+            {"key": key, "size": len(data), "checksum": zlib.crc32(data)},
+        )
+        setattr(obj, field, "" if is_text else b"")
+    else:
+        setattr(obj, _blob_field(field), None)
+        setattr(obj, field, data.decode("utf-8") if is_text else data)
+
+    if old_pointer:
+        key = old_pointer["key"]
+        transaction.on_commit(lambda: get_blob_store().delete(key))
+
+
+def has_payload(obj, field):
+    return bool(getattr(obj, _blob_field(field)) or getattr(obj, field))
+
+
+def payload_size(obj, field):
+    """Size in bytes of the payload, without reading it."""
+    pointer = getattr(obj, _blob_field(field))
+    if pointer:
+        return pointer["size"]
+    value = getattr(obj, field)
+    if not value:
+        return 0
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+def discard_payload(obj, field):
+    """Delete the file of ``obj.<field>`` once the deletion of ``obj`` commits."""
+    pointer = getattr(obj, _blob_field(field))
+    if pointer:
+        key = pointer["key"]
+        transaction.on_commit(lambda: get_blob_store().delete(key))
+
+
+def move_payload_to_store(obj, field):
+    """
+    Move a payload still kept in its column to the file store, when that is
+    the configured backend. Returns whether it was moved; the caller saves.
+    """
+    if settings.TRAJECTORY_BLOB_BACKEND != FILE_BACKEND:
+        return False
+    if getattr(obj, _blob_field(field)) or not getattr(obj, field):
+        return False
+    save_payload(obj, field, load_payload(obj, field))
+    return True
+
+
+def append_segment(segments, data, first=False, **fields):
+    """
+    Store ``data`` (bytes) as a new row of ``segments.model``, placed after
+    the rows of the queryset ``segments`` (before them with ``first``).
+    ``fields`` are the other columns of the row, e.g. its parent.
+    """
+    if first:
+        bound = segments.aggregate(seq=Min("seq"))["seq"]
+        seq = 0 if bound is None else bound - 1
+    else:
+        bound = segments.aggregate(seq=Max("seq"))["seq"]
+        seq = 0 if bound is None else bound + 1
+    segment = segments.model(seq=seq, size=len(data), **fields)
+    save_payload(segment, "data", data)
+    segment.save(force_insert=True)
+    return segment
+
+
+def load_segments(segments):
+    """The payloads of the ``segments`` rows (in ``seq`` order) concatenated."""
+    return b"".join(load_payload(segment, "data") for segment in segments)
+
+
+def segments_size(segments):
+    """Total size in bytes of the ``segments`` rows, without reading them."""
+    return sum(segment.size for segment in segments)
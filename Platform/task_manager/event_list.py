@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Append-only storage of ``event_list``.
+
+Each received packet adds its events to the page as a ``WebpageSegment`` of
+kind ``events`` holding an already serialized JSON array, so a routine update
+only writes the new events: the events stored so far are neither read,
+parsed nor re-serialized. ``WebpagePayload.event_list`` keeps the events of
+rows written before segments existed and is read before the segments. The
+segments themselves are written through ``blob_store.append_segment``.
+
+The single array is only materialized (``load_event_list``) when a client
+asks for it, e.g. the exporter. A corrupt segment is logged and skipped
+there instead of discarding the whole list.
+"""
+
+import json
+import logging
+
+from core.offload import estimate_json_size, run_cpu_bound
+
+from .blob_store import append_segment, load_payload
+from .models import WebpageSegment
+from .webpage_payload import get_webpage_segments
+
+logger = logging.getLogger(__name__)
+
+EMPTY_JSON_VALUES = ("", "[]", "{}")
+
+
+def _serialize_segment(events):
+    """
+    One segment for a packet as ``(JSON array string, number of events)``,
+    or ``("", 0)`` when it holds no events.
+    """
+    if isinstance(events, list):
+        if not events:
+            return "", 0
+        return run_cpu_bound(json.dumps, events, size=estimate_json_size(events)), len(events)
+    if not isinstance(events, str):
+        return "", 0
+    events = events.strip()
+    if events in EMPTY_JSON_VALUES:
+        return "", 0
+    # Older extensions send the array as a JSON string, stored as-is
+    try:
+        data = run_cpu_bound(json.loads, events, size=len(events))
+    except json.JSONDecodeError:
+        logger.warning("Dropping corrupt event_list of a packet")
+        return "", 0
+    if not isinstance(data, list) or not data:
+        return "", 0
+    return events, len(data)
+
+
+def _append(payload, events, first=False):
+    segment, count = _serialize_segment(events)
+    if not segment:
+        return False
+    append_segment(
+        WebpageSegment.objects.filter(
+            webpage_id=payload.webpage_id, kind=WebpageSegment.KIND_EVENTS
+        ),
+        segment.encode("utf-8"),
+        first=first,
+        webpage_id=payload.webpage_id,
+        kind=WebpageSegment.KIND_EVENTS,
+        num_items=count,
+    )
+    return True
+
+
+def append_event_segment(payload, events):
+    """Append a packet of events (list or legacy JSON string) to the page of the payload."""
+    _append(payload, events)
+
+
+def fold_legacy_event_list(payload):
+    """
+    Move the legacy ``event_list`` of the payload into a segment placed before
+    all others of its page. Returns whether there was anything to move; the
+    caller saves ``payload.event_list``.
+    """
+    if not _append(payload, payload.event_list, first=True):
+        return False
+    payload.event_list = None
+    return True
+
+
+def _legacy_segment(value):
+    if isinstance(value, list):
+        return value or None
+    if not value or value in EMPTY_JSON_VALUES:
+        return None
+    return value
+
+
+def iter_event_segments(payload):
+    """Serialized segments of the page in order, legacy ``event_list`` first."""
+    legacy = _legacy_segment(payload.event_list)
+    if legacy is not None:
+        yield legacy
+    for segment in get_webpage_segments(payload, WebpageSegment.KIND_EVENTS):
+        yield load_payload(segment, "data").decode("utf-8")
+
+
+def _parse_segment(segment, webpage_id):
+    if isinstance(segment, list):
+        return segment
+    try:
+        data = run_cpu_bound(json.loads, segment, size=len(segment))
+    except json.JSONDecodeError:
+        logger.warning(f"Skipping corrupt event_list segment of webpage {webpage_id}")
+        return []
+    return data if isinstance(data, list) else []
+
+
+def load_event_list(payload):
+    """The page's events as a single list."""
+    events = []
+    for segment in iter_event_segments(payload):
+        events.extend(_parse_segment(segment, payload.webpage_id))
+    return events
+
+
+def count_events(payload):
+    """Number of events of the page; only the legacy ``event_list`` is parsed."""
+    legacy = _legacy_segment(payload.event_list)
+    count = 0 if legacy is None else len(_parse_segment(legacy, payload.webpage_id))
+    segments = get_webpage_segments(payload, WebpageSegment.KIND_EVENTS, with_data=False)
+    return count + sum(segment.num_items for segment in segments)
+
+
+def has_events(payload):
+    if _legacy_segment(payload.event_list) is not None:
+        return True
+    return WebpageSegment.objects.filter(
+        webpage_id=payload.webpage_id, kind=WebpageSegment.KIND_EVENTS
+    ).exists()
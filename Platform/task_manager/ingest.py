@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Redis Stream queue for packets sent by the extension to /task/data/.
+
+The view pushes the raw (still compressed) payload onto the stream partition
+of the user and returns immediately; ``manage.py ingest_worker`` consumes the
+partitions and stores the packets with ``store_data``. All packets of a user
+land on the same partition and each partition is owned by a single worker, so
+packets of a user are stored in the order they were received. An entry is only
+acknowledged once ``store_data`` has committed it; one that keeps failing is
+moved to the dead-letter stream after ``DATA_INGEST_MAX_ATTEMPTS`` attempts so
+that it stops holding up the partition.
+"""
+
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from redis.exceptions import ResponseError
+
+from core.utils import redis_client, decompress_json_data, decompress_json_bytes
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "ingest"
+
+
+def get_stream_key(partition):
+    return f"{settings.DATA_INGEST_STREAM}:{partition}"
+
+
+def get_partition(user_id):
+    return user_id % settings.DATA_INGEST_PARTITIONS
+
+
+def get_pending_key(user_id):
+    return f"{settings.DATA_INGEST_STREAM}_pending:{user_id}"
+
+
+def get_dead_letter_key(partition):
+    return f"{settings.DATA_INGEST_STREAM}_dead:{partition}"
+
+
+def get_attempts_key(partition):
+    return f"{get_stream_key(partition)}:attempts"
+
+
+def is_packet(message):
+    """Whether a decoded message is a packet that can be stored."""
+    return isinstance(message, dict) and isinstance(message.get("url"), str) and bool(message["url"])
+
+
+def enqueue_packet(user_id, payload, encoding="base64"):
+    """
+    Queue a raw compressed packet of a user. Returns the stream entry id.
+
+    ``encoding`` is "base64" for the form field of /task/data/ and "deflate"
+    for the raw body of /task/data/v2/ and /task/data/batch/.
+    """
+    pipe = redis_client.pipeline()
+    pipe.incr(get_pending_key(user_id))
+    pipe.xadd(
+        get_stream_key(get_partition(user_id)),
+        {
+            "user_id": user_id,
+            "message": payload,
+            "encoding": encoding,
+            "received_at": time.time(),
+        },
+    )
+    return pipe.execute()[1]
+
+
+def has_pending_packets(user_id):
+    """Whether packets of the user are queued but not yet stored."""
+    pending = redis_client.get(get_pending_key(user_id))
+    return bool(pending) and int(pending) > 0
+
+
+# Ingestion watermark: the highest ``ingest_seq`` of an extension session whose
+# packet has been handled (stored, or dropped as invalid). Every browser
+# session of the extension numbers its packets from 1 under a random
+# ``ingest_epoch`` and writes "<epoch>:<seq>" of the last packet it queued into
+# this cookie on the platform domain; packets it gives up uploading are taken
+# back out. Watermarks are kept per user and epoch, so a restarted or second
+# browser never compares its sequence numbers with another session's.
+INGEST_SEQ_COOKIE = "ingest_seq"
+# Watermarks of sessions idle for longer than this are forgotten
+INGEST_WATERMARK_TTL = 24 * 3600
+
+_EPOCH_RE = re.compile(r"^[A-Za-z0-9-]{1,64}$")
+
+_ADVANCE_WATERMARK = redis_client.register_script(
+    """
+    local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+    if tonumber(ARGV[1]) > current then
+        redis.call('SET', KEYS[1], ARGV[1])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('DEL', KEYS[2])
+    redis.call('RPUSH', KEYS[2], 1)
+    redis.call('EXPIRE', KEYS[2], 60)
+    """
+)
+
+
+def get_watermark_key(user_id, epoch):
+    return f"ingest_watermark:{user_id}:{epoch}"
+
+
+def get_watermark_notify_key(user_id):
+    return f"ingest_watermark_notify:{user_id}"
+
+
+def parse_ingest_cookie(value):
+    """``(epoch, seq)`` of an ``ingest_seq`` cookie, or None if it is missing or malformed."""
+    epoch, _, seq = (value or "").partition(":")
+    if not _EPOCH_RE.match(epoch):
+        return None
+    try:
+        return epoch, int(seq)
+    except ValueError:
+        return None
+
+
+def advance_ingest_watermark(user_id, messages):
+    """Record that the given packets are stored and wake up waiting views."""
+    seqs = {}
+    for message in messages:
+        try:
+            epoch = str(message.get("ingest_epoch", ""))
+            seq = int(message.get("ingest_seq"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if _EPOCH_RE.match(epoch):
+            seqs[epoch] = max(seq, seqs.get(epoch, seq))
+    for epoch, seq in seqs.items():
+        _ADVANCE_WATERMARK(
+            keys=[get_watermark_key(user_id, epoch), get_watermark_notify_key(user_id)],
+            args=[seq, INGEST_WATERMARK_TTL],
+        )
+
+
+def wait_for_ingest_watermark(user_id, epoch, target_seq, timeout=30):
+    """
+    Block until the packet ``target_seq`` of the extension session ``epoch``
+    is stored.
+
+    Returns immediately when it already is; otherwise waits on the notify list
+    pushed by ``advance_ingest_watermark``. Returns False on timeout.
+    """
+    if target_seq <= 0:
+        # Nothing of this session has been stored yet
+        return True
+    deadline = time.time() + timeout
+    while True:
+        watermark = redis_client.get(get_watermark_key(user_id, epoch))
+        if watermark is not None and int(watermark) >= target_seq:
+            return True
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        # Short slices so that concurrent waiters of the same user recheck
+        redis_client.blpop([get_watermark_notify_key(user_id)], timeout=1)
+
+
+def ensure_consumer_group(partition):
+    try:
+        redis_client.xgroup_create(
+            get_stream_key(partition), CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as e:
+        # BUSYGROUP: the group already exists
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _finish_entry(partition, entry_id, user_id, pipe=None):
+    pipe = pipe or redis_client.pipeline()
+    pipe.xack(get_stream_key(partition), CONSUMER_GROUP, entry_id)
+    pipe.xdel(get_stream_key(partition), entry_id)
+    pipe.hdel(get_attempts_key(partition), entry_id)
+    if user_id is not None:
+        pipe.decr(get_pending_key(user_id))
+    pipe.execute()
+
+
+def record_failed_attempt(partition, entry_id):
+    """Count a failed attempt to store an entry. Returns the number of attempts so far."""
+    key = get_attempts_key(partition)
+    pipe = redis_client.pipeline()
+    pipe.hincrby(key, entry_id, 1)
+    pipe.expire(key, INGEST_WATERMARK_TTL)
+    return pipe.execute()[0]
+
+
+def dead_letter_entry(partition, entry_id, fields, error):
+    """
+    Move an entry that keeps failing to the dead-letter stream of its
+    partition, with the error, and acknowledge it so the partition moves on.
+    """
+    try:
+        user_id = int(fields[b"user_id"])
+    except (KeyError, ValueError):
+        user_id = None
+    if user_id is not None:
+        # Pages waiting for these packets must not wait for them any longer
+        try:
+            message = _decode_entry(fields)
+            advance_ingest_watermark(user_id, message if isinstance(message, list) else [message])
+        except Exception as e:
+            logger.error(f"Cannot advance the ingest watermark past entry {entry_id}: {e}")
+    pipe = redis_client.pipeline()
+    pipe.xadd(
+        get_dead_letter_key(partition),
+        {
+            **fields,
+            "entry_id": entry_id,
+            "error": str(error)[:1000],
+            "failed_at": time.time(),
+        },
+    )
+    _finish_entry(partition, entry_id, user_id, pipe)
+
+
+def _decode_entry(fields):
+    payload = fields.get(b"message", b"")
+    if fields.get(b"encoding") == b"deflate":
+        return decompress_json_bytes(payload)
+    return decompress_json_data(payload)
+
+
+def process_entry(partition, entry_id, fields):
+    """
+    Store a single queued packet and acknowledge it.
+
+    Packets that can never be stored (corrupt payload, no url, unknown user)
+    are acknowledged and dropped. Any other error propagates and leaves the
+    entry pending, so it is retried before the next packets of the partition.
+    """
+    from .utils import store_data, store_data_batch
+
+    User = get_user_model()
+    user_id = None
+    try:
+        user_id = int(fields[b"user_id"])
+        user = User.objects.get(id=user_id)
+    except (KeyError, ValueError, User.DoesNotExist):
+        logger.error(f"Dropping ingest entry {entry_id}: unknown user {user_id}")
+        _finish_entry(partition, entry_id, user_id)
+        return
+
+    message = _decode_entry(fields)
+    if isinstance(message, list):
+        # Batch uploaded through /task/data/batch/
+        store_data_batch(message, user)
+    elif isinstance(message, dict):
+        store_data(None, message, user)
+    else:
+        logger.error(
+            f"Dropping ingest entry {entry_id} of user {user.username}: corrupt data"
+        )
+    _finish_entry(partition, entry_id, user_id)
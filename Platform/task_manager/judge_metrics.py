@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Latency and token-usage records of the LLM judge.
+
+Every judge invocation (``check_answer_llm``, ``rejudge_trials`` and
+``test_llm_judge``) is recorded as a ``JudgeCall``. Calls are buffered in
+memory per process and written with one ``bulk_create`` once
+``JUDGE_METRICS_BATCH_SIZE`` of them are waiting, by a timer
+``JUDGE_METRICS_FLUSH_SECONDS`` after the first call entered the buffer, and
+when the process exits; a crash loses at most one buffer.
+
+While an event loop runs in the current thread nothing is written from it, as
+the ORM cannot be used there; the timer still runs, and async judges call
+``flush_judge_calls`` after their loop.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import JudgeCall
+
+logger = logging.getLogger(__name__)
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_oldest = None  # time.monotonic() of the oldest buffered call
+_timer = None  # flushes the buffer once its oldest call is due
+
+
+class JudgeCallTimer:
+    """Accumulates the attempts of one judge invocation into a JudgeCall."""
+
+    def __init__(self, model, source=JudgeCall.SOURCE_LIVE):
+        self.model = model or ""
+        self.source = source
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.start = time.monotonic()
+
+    def add_attempt(self, completion=None):
+        """Count a request to the judge, with the token usage of its completion if any."""
+        self.attempts += 1
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def finish(self, outcome):
+        record_judge_call(
+            JudgeCall(
+                model=self.model,
+                source=self.source,
+                prompt_tokens=self.prompt_tokens,
+                completion_tokens=self.completion_tokens,
+                wall_time_ms=int((time.monotonic() - self.start) * 1000),
+                retries=max(self.attempts - 1, 0),
+                outcome=outcome,
+            )
+        )
+
+
+def verdict_outcome(is_correct):
+    """The JudgeCall outcome of a verdict, None meaning an invalid judgment."""
+    if is_correct is None:
+        return JudgeCall.OUTCOME_INVALID
+    return JudgeCall.OUTCOME_YES if is_correct else JudgeCall.OUTCOME_NO
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _flush_on_timer():
+    global _timer
+    with _buffer_lock:
+        _timer = None
+    try:
+        flush_judge_calls()
+    finally:
+        # The timer thread (a greenlet under gevent) has its own connection
+        connection.close()
+
+
+def record_judge_call(call):
+    global _oldest, _timer
+    with _buffer_lock:
+        _buffer.append(call)
+        if _oldest is None:
+            _oldest = time.monotonic()
+        if _timer is None:
+            _timer = threading.Timer(settings.JUDGE_METRICS_FLUSH_SECONDS, _flush_on_timer)
+            _timer.daemon = True
+            _timer.start()
+        due = (
+            len(_buffer) >= settings.JUDGE_METRICS_BATCH_SIZE
+            or time.monotonic() - _oldest >= settings.JUDGE_METRICS_FLUSH_SECONDS
+        )
+    if due and not _in_event_loop():
+        flush_judge_calls()
+
+
+def flush_judge_calls():
+    """Write the buffered judge calls."""
+    global _buffer, _oldest
+    with _buffer_lock:
+        calls, _buffer = _buffer, []
+        _oldest = None
+    if not calls:
+        return
+    try:
+        JudgeCall.objects.bulk_create(calls)
+    except DatabaseError as e:
+        logger.warning(f"Dropping {len(calls)} judge call records: {e}")
+
+
+atexit.register(flush_judge_calls)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Background judging of submitted answers.
+
+``submit_answer`` only stores the trial as ``TaskTrial.JUDGE_PENDING`` and
+releases the task row; the LLM judge runs afterwards, outside any
+transaction, on a small per-process thread pool (``LLM_JUDGE_WORKERS``)
+sharing the client of ``get_judge_client``. The participant waits on
+``answer_judgment``, which polls ``judgment_status`` and moves on to the
+reflection or post-task annotation once the verdict is stored.
+
+A Redis lock, taken when the judgment is queued, keeps a trial from being
+queued or judged twice at a time, so repeated polls do not pile up jobs; a
+judgment lost with its process is restarted by the next poll once its lock
+expires. When the LLM judge
+fails the answer is judged by exact matching instead
+(``TaskTrial.JUDGE_FALLBACK``).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from core.utils import redis_client
+
+from .models import Task, TaskTrial
+from .utils import check_answer
+
+logger = logging.getLogger(__name__)
+
+# A judgment holding its lock longer than this is considered lost
+JUDGE_LOCK_SECONDS = 300
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_lock_key(trial_id):
+    return f"judge_lock_{trial_id}"
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.LLM_JUDGE_WORKERS, thread_name_prefix="judge"
+            )
+    return _executor
+
+
+def judge_trial(trial_id):
+    """Judge a pending trial and store the verdict. Returns the trial."""
+    trial = TaskTrial.objects.select_related("belong_task__content").get(id=trial_id)
+    if trial.judge_status != TaskTrial.JUDGE_PENDING:
+        return trial
+
+    entry = trial.belong_task.content
+    status = TaskTrial.JUDGE_DONE
+    try:
+        is_correct = check_answer(entry, trial.answer)
+    except Exception as e:
+        logger.error(f"LLM judge failed for trial {trial_id}, using exact matching: {e}")
+        is_correct = check_answer(entry, trial.answer, llm=False)
+        status = TaskTrial.JUDGE_FALLBACK
+
+    with transaction.atomic():
+        task = Task.objects.select_for_update().get(id=trial.belong_task_id)
+        updated = TaskTrial.objects.filter(
+            id=trial_id, judge_status=TaskTrial.JUDGE_PENDING
+        ).update(is_correct=is_correct, judge_status=status)
+        if updated and is_correct:
+            task.end_timestamp = trial.end_timestamp
+            task.save(update_fields=["end_timestamp"])
+
+    trial.is_correct = is_correct
+    trial.judge_status = status
+    return trial
+
+
+def _run_judgment(trial_id):
+    close_old_connections()
+    lock_key = _get_lock_key(trial_id)
+    try:
+        # The lock was taken when the judgment was queued; it counts from now
+        redis_client.expire(lock_key, JUDGE_LOCK_SECONDS)
+        try:
+            judge_trial(trial_id)
+        finally:
+            redis_client.delete(lock_key)
+    except Exception:
+        logger.exception(f"Error judging trial {trial_id}")
+    finally:
+        connection.close()
+
+
+def start_judging(trial_id):
+    """Judge the trial in the background, unless it is queued or being judged already."""
+    if not redis_client.set(_get_lock_key(trial_id), 1, nx=True, ex=JUDGE_LOCK_SECONDS):
+        return
+    _get_executor().submit(_run_judgment, trial_id)
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from task_manager.models import Webpage, WebpageSegment, WebpageSummary
+from task_manager.page_summary import build_webpage_summary
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Compute the WebpageSummary of webpages stored before summaries existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report how many webpages would be summarized without changing anything')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute existing summaries as well')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of webpages summarized per transaction')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        pages = Webpage.objects.order_by('id')
+        if not options['rebuild']:
+            pages = pages.filter(summary__isnull=True)
+        total = pages.count()
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Summarizing webpages..."))
+        if dry_run or total == 0:
+            self.stdout.write(f"Webpages to summarize: {total}")
+            return
+
+        summarized = 0
+        last_id = 0
+        with tqdm(total=total, desc="Webpages", file=sys.stdout) as progress:
+            while True:
+                batch = list(
+                    pages.filter(id__gt=last_id)
+                    .select_related('payload')
+                    .prefetch_related(
+                        'record_chunks',
+                        # Summaries only read the counts and sizes of segments
+                        Prefetch('segments', queryset=WebpageSegment.objects.defer('data')),
+                    )[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                summaries = [build_webpage_summary(page) for page in batch]
+                with transaction.atomic():
+                    if options['rebuild']:
+                        WebpageSummary.objects.filter(webpage_id__in=[page.id for page in batch]).delete()
+                    # Summaries written meanwhile by a final packet are newer, keep them
+                    WebpageSummary.objects.bulk_create(summaries, ignore_conflicts=True)
+                summarized += len(summaries)
+                progress.update(len(batch))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Summary ==="))
+        self.stdout.write(self.style.SUCCESS(f"Webpages summarized: {summarized}"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from task_manager.models import Webpage
+from task_manager.storage import compact_rrweb_chunks
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Merge the append-only rrweb chunks of finished pages into a single chunk per page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show how many pages would be compacted without changing anything')
+        parser.add_argument('--task-id', type=int, default=None, help='Only compact the webpages of this task')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        task_id = options['task_id']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Compacting rrweb chunks of finished tasks..."))
+
+        # Only pages of finished tasks: active tasks may still receive packets
+        pages = Webpage.objects.filter(belong_task__active=False)
+        if task_id is not None:
+            pages = pages.filter(belong_task_id=task_id)
+        pages = pages.annotate(
+            num_chunks=Count('record_chunks')
+        ).filter(num_chunks__gt=1).only('id').order_by('id')
+
+        total_pages = pages.count()
+        if total_pages == 0:
+            self.stdout.write(self.style.SUCCESS("Nothing to compact."))
+            return
+
+        if dry_run:
+            total_chunks = sum(pages.values_list('num_chunks', flat=True))
+            self.stdout.write(f"Pages to compact: {total_pages}")
+            self.stdout.write(f"Chunks to merge: {total_chunks}")
+            return
+
+        removed = 0
+        for page in tqdm(pages.iterator(chunk_size=100), total=total_pages, desc="Compacting pages", file=sys.stdout):
+            removed += compact_rrweb_chunks(page)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Compaction Summary ==="))
+        self.stdout.write(f"Pages compacted: {total_pages}")
+        self.stdout.write(self.style.SUCCESS(f"Chunks removed: {removed}"))
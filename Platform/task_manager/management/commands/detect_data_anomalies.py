@@ -1,15 +1,15 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db.models import Count, Q, F, Prefetch, Max, OuterRef, Subquery, Avg
 from django.db.models.functions import Length
 from task_manager.models import Task, TaskTrial, Webpage, PostTaskAnnotation, PreTaskAnnotation
 from user_system.models import User
-from core.utils import decompress_json_data
+from task_manager.page_summary import get_webpage_summary
 from tqdm import tqdm
 from collections import defaultdict
 import logging
 import sys
 import statistics
-import json
 import difflib
 
 logger = logging.getLogger(__name__)
@@ -352,11 +352,18 @@ class Command(BaseCommand):
         if not candidate_task_ids:
             return
 
+        if options['max_inactivity'] < settings.PAGE_SUMMARY_MIN_GAP_SECONDS:
+            self.stdout.write(self.style.WARNING(
+                f"Page summaries only list inactivity gaps over {settings.PAGE_SUMMARY_MIN_GAP_SECONDS}s, shorter ones are not reported."
+            ))
+        threshold_ms = options['max_inactivity'] * 1000
+
+        # Gaps come from the page summaries, recordings are only decoded for pages without one
         pages_qs = Webpage.objects.filter(
             belong_task_id__in=list(candidate_task_ids),
             is_redirected=False
-        ).only(
-            'id', 'belong_task_id', 'rrweb_record'
+        ).select_related('summary').only(
+            'id', 'belong_task_id', 'summary__inactivity_gaps'
         ).order_by('belong_task_id')
 
         current_task_id = None
@@ -372,27 +379,10 @@ class Command(BaseCommand):
 
             task_inactivity_gaps = []
             for p in pages:
-                events = self._get_rrweb_events(p.rrweb_record)
-                if not events:
-                    continue
-
-                page_gaps = []
-                last_ts = events[0].get('timestamp')
-                for ev in events:
-                    if self._is_interaction_event(ev):
-                        curr_ts = ev.get('timestamp')
-                        if last_ts and curr_ts:
-                            gap = (curr_ts - last_ts) / 1000.0
-                            if gap > options['max_inactivity']:
-                                page_gaps.append(gap)
-                        last_ts = curr_ts
-
-                if last_ts and events[-1].get('timestamp'):
-                    gap = (events[-1].get('timestamp') - last_ts) / 1000.0
-                    if gap > options['max_inactivity']:
-                        page_gaps.append(gap)
-
-                task_inactivity_gaps.extend(page_gaps)
+                summary = get_webpage_summary(p)
+                task_inactivity_gaps.extend(
+                    gap / 1000.0 for gap in summary.inactivity_gaps if gap > threshold_ms
+                )
 
             if task_inactivity_gaps:
                 count = len(task_inactivity_gaps)
@@ -416,9 +406,9 @@ class Command(BaseCommand):
         Only runs with --detailed flag due to memory/time cost."""
         pages_qs = Webpage.objects.filter(
             belong_task_id__in=relevant_task_ids
-        ).only(
-            'id', 'dwell_time', 'mouse_moves', 'event_list', 'rrweb_record',
-            'is_redirected', 'belong_task_id'
+        ).select_related('summary').only(
+            'id', 'dwell_time', 'is_redirected', 'belong_task_id',
+            'summary__num_mouse_moves', 'summary__num_events', 'summary__num_rrweb_events',
         ).order_by('belong_task_id')
 
         current_task_id = None
@@ -438,10 +428,9 @@ class Command(BaseCommand):
             for p in pages:
                 if p.is_redirected:
                     continue
-                m = self._count_items(p.mouse_moves)
-                e_rrweb = self._cheap_count_rrweb(p.rrweb_record)
-                e_list = self._count_items(p.event_list)
-                e = max(e_rrweb, e_list)
+                summary = get_webpage_summary(p)
+                m = summary.num_mouse_moves
+                e = max(summary.num_rrweb_events, summary.num_events)
 
                 total_m += m
                 total_e += e
@@ -621,63 +610,6 @@ class Command(BaseCommand):
         
         flush()
 
-    def _get_rrweb_events(self, rrweb_record):
-        if not rrweb_record: return []
-        if isinstance(rrweb_record, list): return rrweb_record
-        if isinstance(rrweb_record, dict) and rrweb_record.get("compressed"):
-            return decompress_json_data(rrweb_record["data"]) or []
-        if isinstance(rrweb_record, str):
-            if rrweb_record in ("[]", "{}"): return []
-            try:
-                data = json.loads(rrweb_record)
-                if isinstance(data, dict) and data.get("compressed"):
-                    return decompress_json_data(data["data"]) or []
-                return data if isinstance(data, list) else []
-            except:
-                return []
-        return []
-
-    def _is_interaction_event(self, event):
-        return event.get('type') in [2, 3]
-
     def _is_similar(self, s1, s2, threshold=0.9):
         if not s1 or not s2: return s1 == s2
         return difflib.SequenceMatcher(None, s1, s2).ratio() > threshold
-
-    def _cheap_count_rrweb(self, rrweb_record):
-        """
-        Estimate if rrweb_record has events without full decompression if possible.
-        If it's empty, return 0. If it's compressed, return 1 (to indicate non-empty).
-        We only decompress if we really need the exact count or for inactivity gaps.
-        """
-        if not rrweb_record: return 0
-        if isinstance(rrweb_record, list): return len(rrweb_record)
-        if isinstance(rrweb_record, dict):
-            if rrweb_record.get("compressed"): return 1 # Non-empty indicator
-            return len(rrweb_record)
-        if isinstance(rrweb_record, str):
-            if rrweb_record in ("[]", "{}"): return 0
-            return 1 # Assume non-empty if string has content
-        return 0
-
-    def _count_items(self, val):
-        if not val: return 0
-        if isinstance(val, list): return len(val)
-        if isinstance(val, dict):
-            if val.get("compressed"):
-                # If we really need the count of compressed items, we'd have to decompress.
-                # For efficiency, we just return a large number if we don't want to decompress here,
-                # but for accuracy in detect_data_anomalies, it's better to be correct.
-                return len(self._get_rrweb_events(val))
-            return len(val)
-        if isinstance(val, str) and val.strip():
-            if val in ("[]", "{}"): return 0
-            try:
-                data = json.loads(val)
-                if isinstance(data, list): return len(data)
-                if isinstance(data, dict):
-                    if data.get("compressed"):
-                        return len(self._get_rrweb_events(data))
-                    return len(data)
-            except: return 0
-        return 0
\ No newline at end of file
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from task_manager.models import RrwebAsset, WebpageRecordChunk
+from task_manager.rrweb_assets import get_asset_path, is_asset_hash
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Delete the rrweb assets no recording references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without changing anything')
+        parser.add_argument('--min-age-hours', type=int, default=24, help='Keep unreferenced assets younger than this, they may belong to packets being stored')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['min_age_hours'])
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Finding unreferenced rrweb assets..."))
+        unreferenced = RrwebAsset.objects.filter(created_at__lt=cutoff).exclude(
+            Exists(WebpageRecordChunk.assets.through.objects.filter(rrwebasset_id=OuterRef('hash')))
+        )
+        to_delete = list(unreferenced.values_list('hash', flat=True))
+
+        freed = 0
+        deleted = 0
+        for i in range(0, len(to_delete), 1000):
+            batch = to_delete[i:i + 1000]
+            if dry_run:
+                freed += self._delete_files(batch, dry_run)
+                deleted += len(batch)
+                continue
+            with transaction.atomic():
+                # Checked again under the row locks: assets a packet is storing
+                # right now are locked by it and skipped, and a packet that
+                # comes later waits for the files to be gone and writes them again
+                batch = list(
+                    unreferenced.filter(hash__in=batch)
+                    .select_for_update(skip_locked=True)
+                    .values_list('hash', flat=True)
+                )
+                RrwebAsset.objects.filter(hash__in=batch).delete()
+                freed += self._delete_files(batch, dry_run)
+            deleted += len(batch)
+
+        # Files left behind by packets whose transaction was rolled back
+        orphans = 0
+        cutoff_ts = time.time() - options['min_age_hours'] * 3600
+        for root, _, files in os.walk(settings.RRWEB_ASSET_ROOT):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.getmtime(path) >= cutoff_ts:
+                    continue
+                if name.startswith('.tmp-'):
+                    size = os.path.getsize(path)
+                    if not dry_run:
+                        os.remove(path)
+                elif not is_asset_hash(name) or RrwebAsset.objects.filter(hash=name).exists():
+                    continue
+                else:
+                    size = os.path.getsize(path)
+                    if not dry_run and not self._delete_orphan(name, path):
+                        continue
+                orphans += 1
+                freed += size
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Asset GC Summary ==="))
+        self.stdout.write(f"Unreferenced assets {'to delete' if dry_run else 'deleted'}: {deleted}")
+        self.stdout.write(f"Orphan files {'to delete' if dry_run else 'deleted'}: {orphans}")
+        self.stdout.write(self.style.SUCCESS(f"Space freed: {freed / 1024 / 1024:.2f} MB"))
+
+    def _delete_files(self, hashes, dry_run):
+        freed = 0
+        for asset_hash in hashes:
+            path = get_asset_path(asset_hash)
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+        return freed
+
+    def _delete_orphan(self, asset_hash, path):
+        """
+        Delete the file of an asset without a row. The hash is claimed with a
+        row of its own first, so a packet storing the same asset meanwhile
+        either created its row first (the file is kept) or waits until the
+        file is gone and writes it again.
+        """
+        try:
+            with transaction.atomic():
+                RrwebAsset.objects.create(hash=asset_hash)
+                os.remove(path)
+                RrwebAsset.objects.filter(hash=asset_hash).delete()
+        except (IntegrityError, FileNotFoundError):
+            return False
+        return True
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from task_manager.blob_store import get_blob_store
+from task_manager.models import WebpageRecordChunk, WebpageSegment
+from tqdm import tqdm
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = 'Delete blob store files that no webpage, segment or rrweb chunk points to (deleted pages, rolled back packets).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without changing anything')
+        parser.add_argument('--min-age-hours', type=float, default=24, help='Keep unreferenced files younger than this, they may belong to packets being stored')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = time.time() - options['min_age_hours'] * 3600
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Collecting blob pointers..."))
+        referenced = set()
+        pointers = [
+            WebpageRecordChunk.objects.filter(data_blob__isnull=False).values_list('data_blob', flat=True),
+            WebpageSegment.objects.filter(data_blob__isnull=False).values_list('data_blob', flat=True),
+        ]
+        for queryset in pointers:
+            for pointer in queryset.iterator(chunk_size=2000):
+                if pointer:
+                    referenced.add(pointer['key'])
+
+        store = get_blob_store()
+        deleted = 0
+        for key, mtime in tqdm(store.iter_keys(), desc="Scanning blob store", file=sys.stdout):
+            if key in referenced or mtime >= cutoff:
+                continue
+            deleted += 1
+            if not dry_run:
+                store.delete(key)
+
+        temp_files = 0 if dry_run else store.remove_stale_temp_files(cutoff)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Blob GC Summary ==="))
+        self.stdout.write(f"Referenced blobs: {len(referenced)}")
+        if not dry_run:
+            self.stdout.write(f"Interrupted writes removed: {temp_files}")
+        self.stdout.write(self.style.SUCCESS(f"Unreferenced blobs {'to delete' if dry_run else 'deleted'}: {deleted}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from task_manager.models import WebpageRecordChunk
+from task_manager.storage import index_rrweb_chunk
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Build the keyframe index of rrweb chunks stored before chunks were indexed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report how many chunks would be indexed without changing anything')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of chunks loaded at a time')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Indexing rrweb chunks..."))
+        chunks = WebpageRecordChunk.objects.filter(keyframes__isnull=True).order_by('id')
+        total = chunks.count()
+        if dry_run or total == 0:
+            self.stdout.write(f"Chunks to index: {total}")
+            return
+
+        indexed = 0
+        failed = 0
+        last_id = 0
+        with tqdm(total=total, desc="Chunks", file=sys.stdout) as progress:
+            while True:
+                batch = list(chunks.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                for chunk in batch:
+                    if index_rrweb_chunk(chunk):
+                        chunk.save(update_fields=['first_timestamp', 'last_timestamp', 'keyframes'])
+                        indexed += 1
+                    else:
+                        failed += 1
+                progress.update(len(batch))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Index Summary ==="))
+        self.stdout.write(self.style.SUCCESS(f"Chunks indexed: {indexed}"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Corrupt chunks skipped: {failed}"))
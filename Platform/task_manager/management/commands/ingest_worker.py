@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from redis.exceptions import RedisError
+from core.utils import redis_client
+from task_manager.ingest import (
+    CONSUMER_GROUP,
+    dead_letter_entry,
+    ensure_consumer_group,
+    get_stream_key,
+    process_entry,
+    record_failed_attempt,
+)
+from task_manager.utils import DataStoreBusyError
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Each partition is owned by a single worker, so one consumer name per group is enough
+CONSUMER_NAME = "owner"
+LEASE_SECONDS = 30
+# Leases are renewed in the background, so that a slow batch never lets one expire
+RENEW_INTERVAL = LEASE_SECONDS / 3
+
+_RENEW_LEASE = redis_client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+)
+
+
+class Command(BaseCommand):
+    help = 'Consume packets queued by /task/data/ and store them in the database. Several workers can run side by side.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=str, default=None, help='Comma-separated partitions to consume (default: all)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Maximum number of entries read per partition at once')
+        parser.add_argument('--block', type=int, default=1000, help='Milliseconds to block waiting for new entries')
+        parser.add_argument('--retry-delay', type=float, default=1.0, help='Initial delay in seconds before retrying a failed entry')
+
+    def handle(self, *args, **options):
+        total = settings.DATA_INGEST_PARTITIONS
+        if options['partitions']:
+            try:
+                partitions = [int(p) for p in options['partitions'].split(',')]
+            except ValueError:
+                raise CommandError("--partitions must be a comma-separated list of integers")
+            invalid = [p for p in partitions if not 0 <= p < total]
+            if invalid:
+                raise CommandError(f"Invalid partitions {invalid}: DATA_INGEST_PARTITIONS is {total}")
+        else:
+            partitions = list(range(total))
+
+        self.batch_size = options['batch_size']
+        self.block = options['block']
+        self.retry_delay = options['retry_delay']
+        self.token = f"{socket.gethostname()}:{os.getpid()}"
+        self.owned = set()
+        self.failures = {}
+        self.stopping = threading.Event()
+
+        for p in partitions:
+            ensure_consumer_group(p)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Ingest worker {self.token} watching partitions {partitions}"))
+
+        threading.Thread(target=self._renew_leases, daemon=True).start()
+        try:
+            while True:
+                self._claim_partitions(partitions)
+                if not self.owned:
+                    time.sleep(self.block / 1000)
+                    continue
+                close_old_connections()
+                self._consume()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("\nStopping ingest worker..."))
+        finally:
+            self.stopping.set()
+            self._release_partitions()
+
+    def _lease_key(self, partition):
+        return f"{get_stream_key(partition)}:owner"
+
+    def _claim_partitions(self, partitions):
+        """Acquire or renew the lease of every partition this worker may consume."""
+        for p in partitions:
+            key = self._lease_key(p)
+            if redis_client.set(key, self.token, nx=True, ex=LEASE_SECONDS):
+                self.stdout.write(self.style.SUCCESS(f"Claimed partition {p}"))
+                self.owned.add(p)
+            elif self._renew_lease(p):
+                self.owned.add(p)
+            elif p in self.owned:
+                self.stdout.write(self.style.WARNING(f"Lost partition {p}"))
+                self.owned.discard(p)
+
+    def _renew_lease(self, partition):
+        return bool(_RENEW_LEASE(keys=[self._lease_key(partition)], args=[self.token, LEASE_SECONDS]))
+
+    def _renew_leases(self):
+        """Keep the leases of the owned partitions alive while entries are being stored."""
+        while not self.stopping.wait(RENEW_INTERVAL):
+            for p in list(self.owned):
+                try:
+                    renewed = self._renew_lease(p)
+                except RedisError as e:
+                    logger.error(f"Failed to renew the lease of partition {p}: {e}")
+                    continue
+                if not renewed:
+                    self.stdout.write(self.style.WARNING(f"Lost partition {p}"))
+                    self.owned.discard(p)
+
+    def _release_partitions(self):
+        for p in self.owned:
+            key = self._lease_key(p)
+            if redis_client.get(key) == self.token.encode():
+                redis_client.delete(key)
+
+    def _consume(self):
+        now = time.time()
+        ready = [p for p in self.owned if self.failures.get(p, (0, 0))[1] <= now]
+
+        # Entries delivered earlier but not acknowledged come first, to keep per-user order
+        new = []
+        for p in ready:
+            pending = redis_client.xreadgroup(
+                CONSUMER_GROUP, CONSUMER_NAME, {get_stream_key(p): '0'}, count=self.batch_size
+            )
+            entries = pending[0][1] if pending else []
+            if entries:
+                self._process_entries(p, entries)
+            else:
+                new.append(p)
+
+        if not new:
+            if not ready:
+                time.sleep(self.retry_delay)
+            return
+
+        response = redis_client.xreadgroup(
+            CONSUMER_GROUP,
+            CONSUMER_NAME,
+            {get_stream_key(p): '>' for p in new},
+            count=self.batch_size,
+            block=self.block,
+        )
+        streams = {get_stream_key(p): p for p in new}
+        for stream, entries in response or []:
+            self._process_entries(streams[stream.decode()], entries)
+
+    def _process_entries(self, partition, entries):
+        for entry_id, fields in entries:
+            if partition not in self.owned:
+                # The lease was lost; the new owner reads the entries left pending
+                return
+            if fields is None:
+                # The entry was deleted while pending; only the acknowledgement is left
+                redis_client.xack(get_stream_key(partition), CONSUMER_GROUP, entry_id)
+                continue
+            try:
+                process_entry(partition, entry_id, fields)
+            except DataStoreBusyError as e:
+                # Not the entry's fault, so it does not count as an attempt
+                logger.warning(str(e))
+                self._back_off(partition)
+                return
+            except Exception as e:
+                close_old_connections()
+                attempts = record_failed_attempt(partition, entry_id)
+                if attempts >= settings.DATA_INGEST_MAX_ATTEMPTS:
+                    logger.error(
+                        f"Moving ingest entry {entry_id} (partition {partition}) to the dead-letter stream "
+                        f"after {attempts} attempts: {e}"
+                    )
+                    dead_letter_entry(partition, entry_id, fields, e)
+                    self.failures.pop(partition, None)
+                    continue
+                # Leave the entry pending and back off; later entries of the
+                # partition wait so that packets are stored in order.
+                logger.error(f"Failed to store ingest entry {entry_id} (partition {partition}, attempt {attempts}): {e}")
+                self._back_off(partition)
+                return
+            self.failures.pop(partition, None)
+
+    def _back_off(self, partition):
+        failures = self.failures.get(partition, (0, 0))[0] + 1
+        delay = min(self.retry_delay * 2 ** (failures - 1), 60)
+        self.failures[partition] = (failures, time.time() + delay)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from task_manager.models import JudgeVerdict
+from task_manager.utils import JUDGE_STATS_KEY, get_judge_stats
+from core.utils import redis_client
+
+
+class Command(BaseCommand):
+    help = 'Show how answers were judged: exact matches, cached verdicts and LLM calls.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        stats = get_judge_stats()
+        exact_hits = stats['exact_hits']
+        cache_hits = stats['cache_hits']
+        llm_calls = stats['llm_calls']
+        total = exact_hits + cache_hits + llm_calls
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Judge Summary ==="))
+        self.stdout.write(f"Answers judged: {total}")
+        if total:
+            self.stdout.write(f"Exact matches: {exact_hits} ({exact_hits / total:.1%})")
+            self.stdout.write(f"Cached verdicts: {cache_hits} ({cache_hits / total:.1%})")
+            self.stdout.write(f"LLM calls: {llm_calls} ({llm_calls / total:.1%})")
+        if llm_calls:
+            avg_ms = stats['llm_time_ms'] / llm_calls
+            self.stdout.write(f"Average LLM latency: {avg_ms:.0f} ms")
+            self.stdout.write(self.style.SUCCESS(
+                f"Estimated LLM time saved by cached verdicts: {cache_hits * avg_ms / 1000:.1f} s"
+            ))
+        self.stdout.write(f"Stored verdicts: {JudgeVerdict.objects.count()}")
+
+        if options['reset']:
+            redis_client.delete(JUDGE_STATS_KEY)
+            self.stdout.write(self.style.WARNING("Counters reset."))
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from task_manager.blob_store import FILE_BACKEND, move_payload_to_store, payload_size
+from task_manager.event_list import fold_legacy_event_list
+from task_manager.models import Webpage, WebpagePayload, WebpageRecordChunk, WebpageSegment
+from task_manager.mouse_moves import fold_legacy_mouse_moves
+from task_manager.storage import fold_legacy_rrweb
+from tqdm import tqdm
+import sys
+
+EMPTY_JSON_VALUES = (None, "", "[]", "{}", [])
+
+PAYLOAD_FIELDS = [
+    'rrweb_record', 'event_list', 'mouse_moves',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold the legacy rrweb_record/event_list/mouse_moves columns of webpage payloads into the '
+        'append-only storage and, with TRAJECTORY_BLOB_BACKEND=file, move all payloads to the blob store.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report how many rows would change without changing anything')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of rows updated per transaction')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        to_files = settings.TRAJECTORY_BLOB_BACKEND == FILE_BACKEND
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+        if not to_files:
+            self.stdout.write(self.style.WARNING(
+                "TRAJECTORY_BLOB_BACKEND is not 'file': legacy columns are folded, payloads stay in the database."
+            ))
+
+        unsplit = Webpage.objects.filter(payload__isnull=True).count()
+        if unsplit:
+            self.stdout.write(self.style.WARNING(
+                f"{unsplit} webpages are not split yet and are skipped, run split_webpage_payloads first."
+            ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Folding legacy webpage payloads..."))
+        pages = WebpagePayload.objects.order_by('webpage_id')
+        changed_pages = 0
+        moved_bytes = 0
+        last_id = 0
+        with tqdm(total=pages.count(), desc="Webpages", file=sys.stdout) as progress:
+            while True:
+                batch = list(pages.filter(webpage_id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].webpage_id
+                progress.update(len(batch))
+
+                if dry_run:
+                    changed_pages += sum(1 for page in batch if self._page_needs_move(page))
+                    continue
+
+                changed = []
+                # Files written for a batch that rolls back are left to gc_trajectory_blobs
+                with transaction.atomic():
+                    for page in batch:
+                        moved = fold_legacy_rrweb(page)
+                        moved = fold_legacy_event_list(page) or moved
+                        moved = fold_legacy_mouse_moves(page) or moved
+                        if moved:
+                            changed.append(page)
+                    WebpagePayload.objects.bulk_update(changed, PAYLOAD_FIELDS)
+                changed_pages += len(changed)
+
+        moved_chunks = 0
+        if to_files:
+            for model, label in ((WebpageRecordChunk, "rrweb chunks"), (WebpageSegment, "segments")):
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Moving {label}..."))
+                count, size = self._move_rows(model, batch_size, dry_run)
+                moved_chunks += count
+                moved_bytes += size
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Move Summary ==="))
+        self.stdout.write(f"Webpages {'to update' if dry_run else 'updated'}: {changed_pages}")
+        self.stdout.write(f"Chunks and segments {'to move' if dry_run else 'moved'}: {moved_chunks}")
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Moved to the blob store: {moved_bytes / 1024 / 1024:.2f} MB"))
+            self.stdout.write("Run VACUUM on the database to reclaim the freed space.")
+
+    @staticmethod
+    def _move_rows(model, batch_size, dry_run):
+        """Move the ``data`` of rows of a chunk or segment model to the blob store."""
+        rows = model.objects.filter(data_blob__isnull=True).order_by('id')
+        moved_rows = 0
+        moved_bytes = 0
+        last_id = 0
+        with tqdm(total=rows.count(), desc=model.__name__, file=sys.stdout) as progress:
+            while True:
+                batch = list(rows.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                progress.update(len(batch))
+                if dry_run:
+                    moved_rows += sum(1 for row in batch if row.data)
+                    continue
+                with transaction.atomic():
+                    moved = [row for row in batch if move_payload_to_store(row, 'data')]
+                    model.objects.bulk_update(moved, ['data', 'data_blob'])
+                moved_rows += len(moved)
+                moved_bytes += sum(payload_size(row, 'data') for row in moved)
+        return moved_rows, moved_bytes
+
+    @staticmethod
+    def _page_needs_move(page):
+        return any(getattr(page, field) not in EMPTY_JSON_VALUES for field in PAYLOAD_FIELDS)
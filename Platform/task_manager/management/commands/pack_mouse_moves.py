@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from task_manager.models import Webpage, WebpagePayload
+from task_manager.mouse_moves import encode_mouse_moves, fold_legacy_mouse_moves, parse_legacy_mouse_moves
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Convert JSON mouse_moves of existing webpages into the packed binary format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the size reduction without changing anything')
+        parser.add_argument('--batch-size', type=int, default=200, help='Number of webpages updated per transaction')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        unsplit = Webpage.objects.filter(payload__isnull=True).count()
+        if unsplit:
+            self.stdout.write(self.style.WARNING(
+                f"{unsplit} webpages are not split yet and are skipped, run split_webpage_payloads first."
+            ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Packing JSON mouse_moves..."))
+
+        pages = WebpagePayload.objects.filter(mouse_moves__isnull=False).exclude(
+            mouse_moves__in=["[]", "", "{}", []]
+        ).only('webpage_id', 'mouse_moves').order_by('webpage_id')
+
+        total_pages = pages.count()
+        if total_pages == 0:
+            self.stdout.write(self.style.SUCCESS("No JSON mouse_moves left to pack."))
+            return
+
+        json_bytes = 0
+        packed_bytes = 0
+        converted = 0
+        batch = []
+
+        def flush():
+            if batch and not dry_run:
+                with transaction.atomic():
+                    for page in batch:
+                        fold_legacy_mouse_moves(page)
+                    WebpagePayload.objects.bulk_update(batch, ['mouse_moves'])
+            batch.clear()
+
+        for page in tqdm(pages.iterator(chunk_size=batch_size), total=total_pages, desc="Packing pages", file=sys.stdout):
+            if isinstance(page.mouse_moves, str):
+                json_bytes += len(page.mouse_moves)
+            packed_bytes += len(encode_mouse_moves(parse_legacy_mouse_moves(page.mouse_moves)))
+            batch.append(page)
+            converted += 1
+
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Packing Summary ==="))
+        self.stdout.write(f"Pages {'to convert' if dry_run else 'converted'}: {converted}")
+        self.stdout.write(f"JSON size:   {json_bytes / 1024 / 1024:.2f} MB")
+        self.stdout.write(self.style.SUCCESS(f"Packed size: {packed_bytes / 1024 / 1024:.2f} MB"))
@@ -210,9 +210,6 @@ class Command(BaseCommand):
                     title=f"Populated Page {i}",
                     start_timestamp=timezone.now(),
                     end_timestamp=timezone.now(),
-                    rrweb_record="[]",
-                    event_list="[]",
-                    mouse_moves="[]",
                     page_switch_record="[]",
                     dwell_time=0,
                     referrer="",
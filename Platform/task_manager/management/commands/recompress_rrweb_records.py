@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from task_manager.blob_store import payload_size
+from task_manager.models import WebpagePayload, WebpageRecordChunk
+from task_manager.rrweb_codecs import get_write_codec
+from task_manager.storage import decode_chunk, decode_legacy_rrweb, encode_legacy_rrweb, set_chunk_data
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Recompress the rrweb data of finished tasks with the configured codec (RRWEB_CODEC) and dictionary.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show how many records would be recompressed without changing anything')
+        parser.add_argument('--batch-size', type=int, default=200, help='Number of records rewritten per transaction')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many records, to spread the pass over several runs')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        limit = options['limit']
+
+        codec, dictionary_id = get_write_codec()
+        if codec is None:
+            self.stdout.write(self.style.WARNING("ENABLE_RRWEB_COMPRESSION is off, nothing to do."))
+            return
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Recompressing rrweb data with {codec}" + (f" (dictionary {dictionary_id})" if dictionary_id else "") + "..."
+        ))
+
+        # Only finished tasks: chunks of active tasks may still be compacted or appended to
+        chunks = WebpageRecordChunk.objects.filter(
+            webpage__belong_task__active=False
+        ).exclude(
+            compressed=True, codec=codec, dictionary_id=dictionary_id
+        ).order_by('id')
+        # Envelopes written before codecs existed have no "codec" key (zlib)
+        pages = WebpagePayload.objects.filter(
+            webpage__belong_task__active=False, rrweb_record__compressed=True
+        ).filter(
+            ~Q(rrweb_record__has_key='codec')
+            | ~Q(rrweb_record__codec=codec)
+            | ~Q(rrweb_record__dictionary=dictionary_id)
+        ).only('webpage_id', 'rrweb_record').order_by('webpage_id')
+
+        total_chunks = chunks.count()
+        total_pages = pages.count()
+        if limit is not None:
+            total_chunks = min(total_chunks, limit)
+            total_pages = min(total_pages, max(limit - total_chunks, 0))
+
+        if dry_run or total_chunks + total_pages == 0:
+            self.stdout.write(f"Chunks to recompress: {total_chunks}")
+            self.stdout.write(f"Legacy records to recompress: {total_pages}")
+            return
+
+        before = 0
+        after = 0
+
+        # Keyset pagination: rewritten rows drop out of the querysets above
+        last_id = 0
+        with tqdm(total=total_chunks, desc="Recompressing chunks", file=sys.stdout) as progress:
+            while progress.n < total_chunks:
+                batch = list(chunks.filter(id__gt=last_id)[:min(batch_size, total_chunks - progress.n)])
+                if not batch:
+                    break
+                rewritten = []
+                with transaction.atomic():
+                    for chunk in batch:
+                        try:
+                            text = decode_chunk(chunk)
+                        except Exception as e:
+                            self.stdout.write(self.style.WARNING(f"Skipping corrupt chunk {chunk.id}: {e}"))
+                            continue
+                        before += payload_size(chunk, 'data')
+                        set_chunk_data(chunk, text, codec, dictionary_id)
+                        after += payload_size(chunk, 'data')
+                        rewritten.append(chunk)
+                    WebpageRecordChunk.objects.bulk_update(rewritten, ['data', 'data_blob', 'size', 'compressed', 'codec', 'dictionary'])
+                last_id = batch[-1].id
+                progress.update(len(batch))
+
+        last_id = 0
+        with tqdm(total=total_pages, desc="Recompressing legacy records", file=sys.stdout) as progress:
+            while progress.n < total_pages:
+                batch = list(pages.filter(webpage_id__gt=last_id)[:min(batch_size, total_pages - progress.n)])
+                if not batch:
+                    break
+                rewritten = []
+                for page in batch:
+                    text = decode_legacy_rrweb(page.rrweb_record)
+                    if text == "[]":
+                        continue  # undecodable, keep the original
+                    before += len(page.rrweb_record.get('data', ''))
+                    page.rrweb_record = encode_legacy_rrweb(text, codec, dictionary_id)
+                    after += len(page.rrweb_record['data'])
+                    rewritten.append(page)
+                with transaction.atomic():
+                    WebpagePayload.objects.bulk_update(rewritten, ['rrweb_record'])
+                last_id = batch[-1].webpage_id
+                progress.update(len(batch))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Recompression Summary ==="))
+        self.stdout.write(f"Chunks recompressed: {total_chunks}")
+        self.stdout.write(f"Legacy records recompressed: {total_pages}")
+        self.stdout.write(f"Size before: {before / 1024 / 1024:.2f} MB")
+        self.stdout.write(self.style.SUCCESS(f"Size after:  {after / 1024 / 1024:.2f} MB"))
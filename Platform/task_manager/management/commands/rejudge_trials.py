@@ -0,0 +1,278 @@
+import asyncio
+import json
+from decouple import config
+from openai import AsyncOpenAI
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from task_manager.models import Task, TaskTrial, JudgeCall, JudgeVerdict, RejudgeRun, RejudgeDisagreement
+from task_manager.judge_metrics import JudgeCallTimer, flush_judge_calls, verdict_outcome
+from task_manager.utils import (
+    JUDGE_PROMPT_VERSION,
+    _normalize,
+    build_judge_prompt,
+    check_answer_rule,
+    get_judge_model,
+    hash_normalized_answer,
+    parse_judgment,
+)
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-judge the answers of past trials with the current judge model and prompt '
+        'and record disagreements with the stored verdicts; --apply also updates the trials.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report how many trials would be re-judged without changing anything')
+        parser.add_argument('--apply', action='store_true', help='Also update the verdicts of the trials (default: only record disagreements)')
+        parser.add_argument('--resume', type=int, metavar='RUN_ID', help='Continue an interrupted run from its checkpoint and retry its failed trials')
+        parser.add_argument('--model', type=str, help='Judge model (default: LLM_JUDGE_MODEL)')
+        parser.add_argument('--workers', type=int, default=8, help='Number of LLM requests in flight')
+        parser.add_argument('--batch-size', type=int, default=200, help='Number of trials judged per batch and checkpoint')
+        parser.add_argument('--retries', type=int, default=3, help='Number of retries for failed API calls')
+        parser.add_argument('--backoff', type=float, default=1.0, help='Seconds before the first retry, doubled on each retry')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if options['resume']:
+            try:
+                run = RejudgeRun.objects.get(id=options['resume'])
+            except RejudgeRun.DoesNotExist:
+                raise CommandError(f"Rejudge run {options['resume']} does not exist.")
+            if run.finished_at and not run.failed_trial_ids:
+                raise CommandError(f"Rejudge run {run.id} is already finished.")
+            if run.report_only == options['apply']:
+                raise CommandError(
+                    f"Rejudge run {run.id} was started {'without' if run.report_only else 'with'} --apply, "
+                    "resume it the same way."
+                )
+            if run.prompt_version != JUDGE_PROMPT_VERSION:
+                raise CommandError(
+                    f"Rejudge run {run.id} used prompt version {run.prompt_version}, "
+                    f"the current one is {JUDGE_PROMPT_VERSION}. Start a new run."
+                )
+        else:
+            run = RejudgeRun(
+                model=options['model'] or get_judge_model(),
+                prompt_version=JUDGE_PROMPT_VERSION,
+                report_only=not options['apply'],
+            )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        # Trials waiting for their first verdict are left to judging.py
+        trials = (
+            TaskTrial.objects.filter(is_correct__isnull=False, belong_task__content__isnull=False)
+            .exclude(judge_status=TaskTrial.JUDGE_PENDING)
+            .select_related('belong_task__content')
+            .only('id', 'answer', 'is_correct', 'judge_status', 'end_timestamp', 'belong_task__end_timestamp', 'belong_task__content')
+            .order_by('id')
+        )
+        remaining = trials.filter(id__gt=run.last_trial_id)
+        # Trials that errored before are judged again first
+        retry = list(trials.filter(id__in=run.failed_trial_ids)) if run.failed_trial_ids else []
+        run.failed_trial_ids = [trial.id for trial in retry]
+        run.errors = len(retry)
+        total = remaining.count() + len(retry)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Re-judging trials with {run.model} (prompt version {run.prompt_version})..."
+        ))
+        if dry_run or total == 0:
+            self.stdout.write(f"Trials to re-judge: {total}")
+            return
+
+        run.save()
+        self.stdout.write(f"Rejudge run {run.id}, resume with --resume {run.id}")
+
+        with tqdm(total=total, desc="Trials", file=sys.stdout) as progress:
+            for i in range(0, len(retry), options['batch_size']):
+                batch = retry[i:i + options['batch_size']]
+                self.judge_batch(run, batch, options)
+                progress.update(len(batch))
+            while True:
+                batch = list(remaining.filter(id__gt=run.last_trial_id)[:options['batch_size']])
+                if not batch:
+                    break
+                self.judge_batch(run, batch, options)
+                progress.update(len(batch))
+
+        run.finished_at = timezone.now()
+        run.save(update_fields=['finished_at'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Rejudge Summary ==="))
+        self.stdout.write(f"Trials judged: {run.judged}")
+        self.stdout.write(self.style.SUCCESS(f"Disagreements: {run.disagreements}"))
+        if run.report_only:
+            self.stdout.write("Disagreements recorded only, trials unchanged (apply them with --apply)")
+        if run.errors:
+            self.stdout.write(self.style.WARNING(
+                f"Trials left unchanged after errors: {run.errors} (retry them with --resume {run.id})"
+            ))
+
+    def judge_batch(self, run, batch, options):
+        """Judge a batch of trials and store its results together with the checkpoint."""
+        exact = set()
+        keys = {}
+        jobs = {}
+        failed = []
+        for trial in batch:
+            entry = trial.belong_task.content
+            try:
+                authentic_answers = json.loads(entry.answer)
+            except json.JSONDecodeError:
+                self.stderr.write(self.style.ERROR(f"Invalid answers of dataset entry {entry.id}"))
+                failed.append(trial.id)
+                continue
+            if check_answer_rule(entry.question, authentic_answers, trial.answer):
+                exact.add(trial.id)
+                continue
+            normalized_answer = _normalize(trial.answer)
+            key = (entry.id, hash_normalized_answer(normalized_answer))
+            keys[trial.id] = key
+            jobs.setdefault(key, (entry.question, authentic_answers, trial.answer, normalized_answer))
+
+        verdicts = {}
+        new_verdicts = []
+        if jobs:
+            cached = JudgeVerdict.objects.filter(
+                entry_id__in={key[0] for key in jobs},
+                answer_hash__in={key[1] for key in jobs},
+                model=run.model,
+                prompt_version=run.prompt_version,
+            ).values_list('entry_id', 'answer_hash', 'is_correct')
+            for entry_id, answer_hash, is_correct in cached:
+                verdicts[(entry_id, answer_hash)] = is_correct
+            pending = {key: job for key, job in jobs.items() if key not in verdicts}
+            if pending:
+                judged = asyncio.run(self.judge_concurrently(run.model, pending, options))
+                flush_judge_calls()
+                new_verdicts = [
+                    JudgeVerdict(
+                        entry_id=key[0],
+                        answer_hash=key[1],
+                        normalized_answer=pending[key][3],
+                        model=run.model,
+                        prompt_version=run.prompt_version,
+                        is_correct=is_correct,
+                    )
+                    for key, is_correct in judged.items()
+                    if is_correct is not None
+                ]
+                verdicts.update(judged)
+
+        disagreements = []
+        changed = []
+        ended = []
+        for trial in batch:
+            if trial.id in exact:
+                is_correct = True
+            elif trial.id in keys:
+                is_correct = verdicts.get(keys[trial.id])
+            else:
+                continue
+            if is_correct is None:
+                failed.append(trial.id)
+                continue
+            if is_correct != trial.is_correct:
+                disagreements.append(RejudgeDisagreement(
+                    run=run,
+                    trial=trial,
+                    old_is_correct=trial.is_correct,
+                    new_is_correct=is_correct,
+                    applied=not run.report_only,
+                ))
+            if not run.report_only and (is_correct != trial.is_correct or trial.judge_status != TaskTrial.JUDGE_DONE):
+                # A task ends with its first correct answer, as in judging.py
+                if is_correct and not trial.is_correct and trial.belong_task.end_timestamp is None:
+                    ended.append(trial)
+                trial.is_correct = is_correct
+                trial.judge_status = TaskTrial.JUDGE_DONE
+                changed.append(trial)
+
+        # Failed trials are kept aside rather than held back by the checkpoint,
+        # so one trial failing again does not stop the run
+        batch_ids = {trial.id for trial in batch}
+        run.last_trial_id = max(run.last_trial_id, batch[-1].id)
+        run.failed_trial_ids = [i for i in run.failed_trial_ids if i not in batch_ids] + failed
+        run.judged += len(batch) - len(failed)
+        run.disagreements += len(disagreements)
+        run.errors = len(run.failed_trial_ids)
+        with transaction.atomic():
+            JudgeVerdict.objects.bulk_create(new_verdicts, ignore_conflicts=True)
+            RejudgeDisagreement.objects.bulk_create(disagreements)
+            TaskTrial.objects.bulk_update(changed, ['is_correct', 'judge_status'])
+            for trial in ended:
+                Task.objects.filter(id=trial.belong_task_id, end_timestamp__isnull=True).update(
+                    end_timestamp=trial.end_timestamp or timezone.now()
+                )
+            run.save(update_fields=['last_trial_id', 'failed_trial_ids', 'judged', 'disagreements', 'errors'])
+
+    async def judge_concurrently(self, model, jobs, options):
+        """Judge ``{key: (question, authentic_answers, answer, normalized)}`` with a pool of workers."""
+        queue = asyncio.Queue()
+        for key, job in jobs.items():
+            queue.put_nowait((key, job))
+        verdicts = {}
+
+        async with AsyncOpenAI(
+            base_url=config("LLM_BASE_URL", default=None),
+            api_key=config("LLM_API_KEY", default=None),
+            timeout=settings.LLM_JUDGE_TIMEOUT,
+        ) as client:
+            tasks = [
+                asyncio.create_task(self.worker(client, model, queue, verdicts, options))
+                for _ in range(min(options['workers'], len(jobs)))
+            ]
+            await queue.join()
+
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return verdicts
+
+    async def worker(self, client, model, queue, verdicts, options):
+        while True:
+            key, (question, authentic_answers, answer, _) = await queue.get()
+            try:
+                prompt = build_judge_prompt(question, authentic_answers, answer)
+                verdicts[key] = await self.judge(client, model, prompt, options)
+            finally:
+                queue.task_done()
+
+    async def judge(self, client, model, prompt, options):
+        """The verdict of the judge on a prompt, or None when every attempt failed."""
+        max_retries = options['retries']
+        timer = JudgeCallTimer(model, JudgeCall.SOURCE_REJUDGE)
+        outcome = JudgeCall.OUTCOME_INVALID
+        for attempt in range(max_retries + 1):
+            try:
+                completion = await client.chat.completions.create(
+                    model=model, messages=[{"role": "user", "content": prompt}], temperature=0
+                )
+                timer.add_attempt(completion)
+                is_correct = parse_judgment(completion)
+                if is_correct is not None:
+                    timer.finish(verdict_outcome(is_correct))
+                    return is_correct
+                outcome = JudgeCall.OUTCOME_INVALID
+                self.stderr.write(self.style.WARNING("Judge returned neither yes nor no"))
+            except Exception as e:
+                if timer.attempts <= attempt:
+                    timer.add_attempt()
+                outcome = JudgeCall.OUTCOME_ERROR
+                self.stderr.write(
+                    self.style.WARNING(f"Judge attempt {attempt + 1}/{max_retries + 1} failed: {e}")
+                )
+
+            if attempt < max_retries:
+                await asyncio.sleep(options['backoff'] * 2**attempt)
+        timer.finish(outcome)
+        return None
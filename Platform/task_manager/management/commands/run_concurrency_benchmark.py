@@ -121,6 +121,9 @@ class Command(BaseCommand):
         self.stdout.write("--- Cleaning up test data & compacting database ---")
         with open(os.devnull, "w") as f, redirect_stdout(f), redirect_stderr(f):
             call_command("pressure_test", "--cleanup")
+            if settings.TRAJECTORY_BLOB_BACKEND == "file":
+                # Payload files of the deleted test pages
+                call_command("gc_trajectory_blobs", "--min-age-hours", "0")
 
         engine = settings.DATABASES["default"]["ENGINE"]
 
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from task_manager.models import Webpage, WebpagePayload
+from task_manager.webpage_payload import PRE_SPLIT_FIELDS, build_webpage_payload
+from tqdm import tqdm
+import sys
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the rrweb/event/mouse payload columns of webpages recorded before the split '
+        'into their WebpagePayload row, then empty the columns on Webpage.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report how many webpages would be split without changing anything')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of webpages copied per transaction')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No changes will be made"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Splitting webpage payloads..."))
+        pages = Webpage.objects.filter(payload__isnull=True).order_by('id')
+        total = pages.count()
+        if total == 0:
+            self.stdout.write(self.style.SUCCESS("All webpages are already split."))
+            return
+
+        split = 0
+        last_id = 0
+        with tqdm(total=total, desc="Webpages", file=sys.stdout) as progress:
+            while True:
+                ids = list(pages.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                last_id = ids[-1]
+                progress.update(len(ids))
+
+                if dry_run:
+                    split += len(ids)
+                    continue
+
+                with transaction.atomic():
+                    # Lock the rows so a packet stored meanwhile waits for the copy
+                    rows = list(
+                        Webpage.objects.select_for_update()
+                        .filter(id__in=ids)
+                        .values('id', *PRE_SPLIT_FIELDS)
+                    )
+                    # A packet may have split some pages before the lock was taken
+                    done = set(WebpagePayload.objects.filter(webpage_id__in=ids).values_list('webpage_id', flat=True))
+                    payloads = [
+                        build_webpage_payload(row.pop('id'), row)
+                        for row in rows if row['id'] not in done
+                    ]
+                    WebpagePayload.objects.bulk_create(payloads)
+                    Webpage.objects.filter(id__in=[p.webpage_id for p in payloads]).update(
+                        **{field: None for field in PRE_SPLIT_FIELDS}
+                    )
+                split += len(payloads)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Split Summary ==="))
+        self.stdout.write(f"Webpages {'to split' if dry_run else 'split'}: {split}")
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS("Run VACUUM on the database to reclaim the freed space."))
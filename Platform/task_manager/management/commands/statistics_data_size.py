@@ -1,6 +1,6 @@
-import json
 from django.core.management.base import BaseCommand
 from task_manager.models import Task, TaskTrial, Webpage
+from task_manager.page_summary import get_webpage_summary
 
 class Command(BaseCommand):
     help = 'Statistics the data size of tasks, trials and webpages, separating rrweb_record, event_list and mouse_moves'
@@ -10,6 +10,7 @@ class Command(BaseCommand):
 
         # Initialize counters
         total_rrweb_size = 0
+        total_rrweb_raw_size = 0
         total_event_list_size = 0
         total_mouse_moves_size = 0
         
@@ -17,25 +18,21 @@ class Command(BaseCommand):
         task_sizes = {} # map task_id -> size
         trial_sizes = {} # map trial_id -> size
 
-        # helper to estimate size
-        def get_size(data):
-            if data is None:
-                return 0
-            # Rough estimation: length of JSON string
-            try:
-                return len(json.dumps(data))
-            except:
-                return 0
-
-        # Use iterator to avoid loading all objects into memory
-        webpages = Webpage.objects.all().iterator()
+        # Sizes are read from the page summaries; only pages without one are decoded
+        webpages = Webpage.objects.select_related('summary').only(
+            'id', 'belong_task_id', 'belong_task_trial_id',
+            'summary__rrweb_stored_bytes', 'summary__rrweb_raw_bytes',
+            'summary__event_list_bytes', 'summary__mouse_moves_bytes',
+        ).iterator()
         
         for wp in webpages:
             webpage_count += 1
             
-            rrweb = get_size(wp.rrweb_record)
-            events = get_size(wp.event_list)
-            moves = get_size(wp.mouse_moves)
+            summary = get_webpage_summary(wp)
+            rrweb = summary.rrweb_stored_bytes
+            events = summary.event_list_bytes
+            moves = summary.mouse_moves_bytes
+            total_rrweb_raw_size += summary.rrweb_raw_bytes
             
             total_rrweb_size += rrweb
             total_event_list_size += events
@@ -70,7 +67,7 @@ class Command(BaseCommand):
             return f"{size:.2f} {power_labels[n]}"
 
         self.stdout.write("\n--- Total Data Size by Field ---")
-        self.stdout.write(f"rrweb_record: {format_bytes(total_rrweb_size)}")
+        self.stdout.write(f"rrweb_record: {format_bytes(total_rrweb_size)} ({format_bytes(total_rrweb_raw_size)} uncompressed)")
         self.stdout.write(f"event_list:   {format_bytes(total_event_list_size)}")
         self.stdout.write(f"mouse_moves:  {format_bytes(total_mouse_moves_size)}")
         self.stdout.write(f"Total:        {format_bytes(total_size)}")
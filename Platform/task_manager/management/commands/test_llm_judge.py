@@ -3,6 +3,8 @@ import asyncio
 from decouple import config
 from openai import AsyncOpenAI
 from django.core.management.base import BaseCommand
+from task_manager.models import JudgeCall
+from task_manager.judge_metrics import JudgeCallTimer, flush_judge_calls, verdict_outcome
 from task_manager.utils import _normalize
 
 
@@ -50,6 +52,7 @@ class Command(BaseCommand):
                     options["retries"],
                 )
             )
+            flush_judge_calls()
         else:
             self.stdout.write(
                 self.style.WARNING("This command now only supports --concurrent mode.")
@@ -274,19 +277,26 @@ Answer:"""
 **User's Answer:** "{user_answer}"
 
 Is the user's answer correct?"""
+        timer = JudgeCallTimer(model, JudgeCall.SOURCE_TEST)
+        outcome = JudgeCall.OUTCOME_INVALID
         for attempt in range(max_retries + 1):
             try:
                 completion = await client.chat.completions.create(
                     model=model, messages=[{"role": "user", "content": prompt}], temperature=0
                 )
+                timer.add_attempt(completion)
+                outcome = JudgeCall.OUTCOME_INVALID
                 if (
                     completion.choices
                     and completion.choices[0].message
                     and completion.choices[0].message.content
                 ):
                     judgment = completion.choices[0].message.content.strip().lower()
+                    timer.finish(verdict_outcome(judgment == "yes"))
                     return judgment == "yes"
             except Exception as e:
+                timer.add_attempt()
+                outcome = JudgeCall.OUTCOME_ERROR
                 self.stderr.write(
                     self.style.WARNING(
                         f"LLM Judge Attempt {attempt + 1}/{max_retries + 1} failed for '{question}': {e}"
@@ -303,4 +313,5 @@ Is the user's answer correct?"""
                 f"LLM Judge failed for question '{question}' after {max_retries + 1} attempts."
             )
         )
+        timer.finish(outcome)
         return False
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from task_manager.models import RrwebDictionary, WebpageRecordChunk
+from task_manager.rrweb_codecs import ZLIB, ZSTD, compress_text, zstd_available
+from task_manager.storage import decode_chunk
+from tqdm import tqdm
+import json
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Train a zstd dictionary on a sample of recent rrweb events and make it the active one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunks', type=int, default=2000, help='Number of most recent rrweb chunks to sample events from')
+        parser.add_argument('--max-samples', type=int, default=50000, help='Maximum number of events used as training samples')
+        parser.add_argument('--max-sample-bytes', type=int, default=1024 * 1024, help='Events larger than this are truncated')
+        parser.add_argument('--dict-size', type=int, default=112640, help='Size of the dictionary in bytes')
+        parser.add_argument('--no-activate', action='store_true', help='Store the dictionary without using it for new data')
+
+    def handle(self, *args, **options):
+        if not zstd_available():
+            raise CommandError("zstandard is not installed (pip install zstandard)")
+        import zstandard
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Collecting rrweb samples..."))
+
+        chunks = WebpageRecordChunk.objects.filter(num_events__gt=0).order_by('-id')[:options['chunks']]
+        samples = []
+        for chunk in tqdm(chunks.iterator(chunk_size=100), total=options['chunks'], desc="Reading chunks", file=sys.stdout):
+            try:
+                events = json.loads(decode_chunk(chunk))
+            except Exception:
+                continue  # corrupt chunk
+            # Chunks are stored as json.dumps output, so re-dumped events have the same bytes
+            for event in events:
+                samples.append(json.dumps(event).encode('utf-8')[:options['max_sample_bytes']])
+            if len(samples) >= options['max_samples']:
+                samples = samples[:options['max_samples']]
+                break
+
+        if not samples:
+            raise CommandError("No rrweb events to train on.")
+
+        self.stdout.write(f"Training a {options['dict_size']} byte dictionary on {len(samples)} events...")
+        try:
+            trained = zstandard.train_dictionary(options['dict_size'], samples)
+        except zstandard.ZstdError as e:
+            raise CommandError(f"Training failed ({e}); sample more chunks.")
+
+        activate = not options['no_activate']
+        with transaction.atomic():
+            if activate:
+                RrwebDictionary.objects.filter(is_active=True).update(is_active=False)
+            dictionary = RrwebDictionary.objects.create(
+                data=trained.as_bytes(),
+                num_samples=len(samples),
+                is_active=activate,
+            )
+
+        # Compare against per-record zlib on the samples themselves
+        text = "[" + ",".join(s.decode('utf-8', errors='ignore') for s in samples[:1000]) + "]"
+        zlib_size = len(compress_text(text, ZLIB)[0])
+        zstd_size = len(compress_text(text, ZSTD, dictionary.id)[0])
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== Dictionary Summary ==="))
+        self.stdout.write(f"Dictionary id: {dictionary.id} ({'active' if activate else 'inactive'})")
+        self.stdout.write(f"Sample size:   {len(text.encode('utf-8')) / 1024:.1f} KB")
+        self.stdout.write(f"zlib:          {zlib_size / 1024:.1f} KB")
+        self.stdout.write(self.style.SUCCESS(f"zstd + dict:   {zstd_size / 1024:.1f} KB"))
+        if activate:
+            self.stdout.write("Set RRWEB_CODEC=zstd to compress new data with it, and run recompress_rrweb_records for existing data.")
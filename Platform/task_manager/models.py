@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
+from django.utils import timezone
 
 from user_system.models import User
 from core.filters import Q_VALID_USER_REL
@@ -26,6 +27,60 @@ class TaskDatasetEntry(models.Model):
     )  # number of tasks associated with this entry
 
 
+# LLM verdict on a normalized answer to a dataset entry, reused by check_answer
+class JudgeVerdict(models.Model):
+    entry = models.ForeignKey(
+        TaskDatasetEntry,
+        on_delete=models.CASCADE,
+        related_name="judge_verdicts",
+    )
+    answer_hash = models.CharField(max_length=64)  # sha256 of normalized_answer
+    normalized_answer = models.TextField()  # answer after _normalize
+    model = models.CharField(max_length=128)  # judge model that gave the verdict
+    prompt_version = models.IntegerField()  # JUDGE_PROMPT_VERSION of the prompt used
+    is_correct = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["entry", "answer_hash", "model", "prompt_version"],
+                name="unique_judge_verdict",
+            )
+        ]
+
+
+# One invocation of the LLM judge, for latency and token-usage monitoring (see judge_metrics.py)
+class JudgeCall(models.Model):
+    OUTCOME_YES = "yes"
+    OUTCOME_NO = "no"
+    OUTCOME_INVALID = "invalid"  # no yes/no judgment after all attempts
+    OUTCOME_ERROR = "error"  # the API call failed
+    OUTCOME_CHOICES = (
+        (OUTCOME_YES, "Yes"),
+        (OUTCOME_NO, "No"),
+        (OUTCOME_INVALID, "Invalid"),
+        (OUTCOME_ERROR, "Error"),
+    )
+    SOURCE_LIVE = "live"  # answers submitted by participants
+    SOURCE_REJUDGE = "rejudge"  # manage.py rejudge_trials
+    SOURCE_TEST = "test"  # manage.py test_llm_judge
+    SOURCE_CHOICES = (
+        (SOURCE_LIVE, "Live"),
+        (SOURCE_REJUDGE, "Rejudge"),
+        (SOURCE_TEST, "Test"),
+    )
+
+    model = models.CharField(max_length=128)
+    source = models.CharField(max_length=16, choices=SOURCE_CHOICES, default=SOURCE_LIVE)
+    prompt_tokens = models.IntegerField(default=0)  # summed over attempts
+    completion_tokens = models.IntegerField(default=0)  # summed over attempts
+    wall_time_ms = models.IntegerField()  # whole invocation, retries included
+    retries = models.IntegerField(default=0)
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)  # time of the call, not of the write
+
+
 class ValidTaskManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().filter(Q_VALID_USER_REL)
@@ -151,12 +206,24 @@ class CancelAnnotation(models.Model):
 
 # Task Trial
 class TaskTrial(models.Model):
+    JUDGE_PENDING = "pending"  # answer submitted, verdict not known yet
+    JUDGE_DONE = "done"
+    JUDGE_FALLBACK = "fallback"  # the LLM judge failed, judged by exact matching
+    JUDGE_STATUS_CHOICES = (
+        (JUDGE_PENDING, "Pending"),
+        (JUDGE_DONE, "Done"),
+        (JUDGE_FALLBACK, "Fallback"),
+    )
+
     start_timestamp = models.DateTimeField(auto_now_add=True)
     end_timestamp = models.DateTimeField(null=True)
     num_trial = models.IntegerField()  # number of trials
 
     answer = models.CharField(max_length=1000, default="undefined")
     is_correct = models.BooleanField(null=True)
+    judge_status = models.CharField(
+        max_length=16, choices=JUDGE_STATUS_CHOICES, default=JUDGE_DONE
+    )  # see judging.py
 
     confidence = models.IntegerField(default=-1)  # confidence level, 0->4, low -> high
     answer_formulation_method = models.JSONField(
@@ -172,6 +239,31 @@ class TaskTrial(models.Model):
     )
 
 
+# Re-judging of past trials with the current judge (manage.py rejudge_trials)
+class RejudgeRun(models.Model):
+    model = models.CharField(max_length=128)  # judge model
+    prompt_version = models.IntegerField()  # JUDGE_PROMPT_VERSION of the prompt used
+    report_only = models.BooleanField(default=False)  # disagreements recorded but not applied
+    last_trial_id = models.IntegerField(default=0)  # checkpoint: trials up to it are judged, except failed_trial_ids
+    failed_trial_ids = models.JSONField(default=list)  # trials that errored, retried on --resume
+    judged = models.IntegerField(default=0)
+    disagreements = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+
+# Trial whose re-judged verdict differs from its stored is_correct
+class RejudgeDisagreement(models.Model):
+    run = models.ForeignKey(
+        RejudgeRun, on_delete=models.CASCADE, related_name="disagreements_found"
+    )
+    trial = models.ForeignKey(TaskTrial, on_delete=models.CASCADE)
+    old_is_correct = models.BooleanField()
+    new_is_correct = models.BooleanField()
+    applied = models.BooleanField(default=False)  # trial updated with new_is_correct
+
+
 # Justification
 class Justification(models.Model):
     belong_task_trial = models.ForeignKey(
@@ -222,9 +314,18 @@ class Webpage(models.Model):
     width = models.IntegerField(null=True)
     height = models.IntegerField(null=True)
     page_switch_record = models.JSONField(null=True)  # page switch record in JSON format
-    mouse_moves = models.JSONField()  # mouse move data in JSON format
-    event_list = models.JSONField()  # list of events in JSON format
-    rrweb_record = models.JSONField()  # rrweb record in JSON forma
+    # Pre-split payload columns: copied to WebpagePayload by
+    # ``manage.py split_webpage_payloads`` and emptied, see webpage_payload.py
+    mouse_moves = models.JSONField(null=True)
+    event_list = models.JSONField(null=True)
+    rrweb_record = models.JSONField(null=True)
+
+    page_key = models.CharField(
+        max_length=64, null=True
+    )  # page view id generated by the extension (null for legacy packets)
+    last_seq = models.IntegerField(
+        default=-1
+    )  # highest packet sequence number applied to this page
 
     is_redirected = models.BooleanField(
         default=False
@@ -236,6 +337,164 @@ class Webpage(models.Model):
         max_length=100, null=True
     )  # name of the annotation, e.g. "pre_task", "post_task", etc.
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["belong_task", "page_key"], name="unique_task_page_key"
+            )
+        ]
+
+
+# Recorded data of a webpage, kept apart so that listing pages never loads it
+class WebpagePayload(models.Model):
+    webpage = models.OneToOneField(
+        Webpage,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="payload",
+    )
+    mouse_moves = models.JSONField(
+        null=True
+    )  # mouse moves of legacy rows, newer packets are WebpageSegments, see mouse_moves.py
+    event_list = models.JSONField(
+        null=True
+    )  # events of legacy rows, newer packets are WebpageSegments, see event_list.py
+    rrweb_record = models.JSONField(
+        null=True
+    )  # rrweb record of legacy rows, newer packets are WebpageRecordChunks
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save_webpage_payload skip rows that did not change
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+# Interaction statistics of a webpage, computed when its final packet is stored (see page_summary.py)
+class WebpageSummary(models.Model):
+    webpage = models.OneToOneField(
+        Webpage,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+    )
+    num_rrweb_events = models.IntegerField(default=0)
+    rrweb_type_counts = models.JSONField(default=dict, blank=True)  # rrweb event type -> count
+    rrweb_source_counts = models.JSONField(
+        default=dict, blank=True
+    )  # incremental snapshot source -> count
+    num_events = models.IntegerField(default=0)  # entries of event_list
+    num_mouse_moves = models.IntegerField(default=0)
+    first_event_timestamp = models.BigIntegerField(null=True)  # ms
+    last_event_timestamp = models.BigIntegerField(null=True)  # ms
+    max_inactivity_gap = models.BigIntegerField(default=0)  # ms, longest gap between interaction events
+    total_inactivity_gap = models.BigIntegerField(
+        default=0
+    )  # ms, sum of inactivity_gaps
+    inactivity_gaps = models.JSONField(
+        default=list, blank=True
+    )  # gaps (ms) longer than PAGE_SUMMARY_MIN_GAP_SECONDS
+    rrweb_raw_bytes = models.BigIntegerField(default=0)  # uncompressed JSON size
+    rrweb_stored_bytes = models.BigIntegerField(default=0)  # size as stored (compressed)
+    event_list_bytes = models.BigIntegerField(default=0)
+    mouse_moves_bytes = models.BigIntegerField(default=0)
+    max_scroll_y = models.IntegerField(default=0)  # deepest vertical scroll offset reached (px)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+# Trained zstd dictionary for rrweb recordings (see rrweb_codecs.py)
+class RrwebDictionary(models.Model):
+    data = models.BinaryField()  # raw zstd dictionary
+    num_samples = models.IntegerField(default=0)  # number of samples it was trained on
+    is_active = models.BooleanField(default=False)  # used to compress new data
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+# Large string payload of rrweb events kept in the content-addressed asset store (see rrweb_assets.py)
+class RrwebAsset(models.Model):
+    hash = models.CharField(max_length=64, primary_key=True)  # sha256 of the content
+    size = models.IntegerField(default=0)  # content size in bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+# Append-only rrweb storage: one compressed chunk per received packet
+class WebpageRecordChunk(models.Model):
+    webpage = models.ForeignKey(
+        Webpage,
+        on_delete=models.CASCADE,
+        related_name="record_chunks",
+    )
+    seq = models.IntegerField()  # position of the chunk within the page's stream
+    data = models.BinaryField()  # serialized JSON array of rrweb events
+    data_blob = models.JSONField(
+        null=True, blank=True
+    )  # pointer to data in the blob store, see blob_store.py
+    compressed = models.BooleanField(default=True)  # whether data is compressed
+    codec = models.CharField(
+        max_length=16, default="zlib", blank=True
+    )  # compression codec of data, see rrweb_codecs.py
+    dictionary = models.ForeignKey(
+        RrwebDictionary,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="+",
+    )  # zstd dictionary data was compressed with
+    num_events = models.IntegerField(default=0)  # number of events in the chunk
+    size = models.IntegerField(null=True, blank=True)  # size of data in bytes, null for chunks written before it
+    first_timestamp = models.BigIntegerField(null=True, blank=True)  # timestamp of its first event
+    last_timestamp = models.BigIntegerField(null=True, blank=True)  # timestamp of its last event
+    keyframes = models.JSONField(
+        null=True, blank=True
+    )  # [offset, timestamp] of its full snapshots, null until indexed, see rrweb_index.py
+    assets = models.ManyToManyField(
+        RrwebAsset, related_name="chunks", blank=True
+    )  # RrwebAssets it references, see rrweb_assets.py
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["webpage", "seq"], name="unique_webpage_record_chunk_seq"
+            )
+        ]
+
+
+# Append-only event and mouse move storage: one segment per received packet and
+# kind, concatenated on read (see blob_store.append_segment)
+class WebpageSegment(models.Model):
+    KIND_EVENTS = "events"  # JSON array of events, see event_list.py
+    KIND_MOUSE_MOVES = "mouse_moves"  # packed block of mouse moves, see mouse_moves.py
+    KIND_CHOICES = (
+        (KIND_EVENTS, "Events"),
+        (KIND_MOUSE_MOVES, "Mouse moves"),
+    )
+
+    webpage = models.ForeignKey(
+        Webpage,
+        on_delete=models.CASCADE,
+        related_name="segments",
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    seq = models.IntegerField()  # position of the segment within the page's stream of its kind
+    data = models.BinaryField()  # payload of the segment
+    data_blob = models.JSONField(
+        null=True, blank=True
+    )  # pointer to data in the blob store, see blob_store.py
+    size = models.IntegerField(default=0)  # size of data in bytes
+    num_items = models.IntegerField(default=0)  # number of events or mouse moves in the segment
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["webpage", "kind", "seq"], name="unique_webpage_segment_seq"
+            )
+        ]
+
 
 # Annotation of certain behaviors
 # e.g. click, hover, scroll, etc.
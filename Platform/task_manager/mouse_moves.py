@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Packed binary encoding of ``mouse_moves``.
+
+The extension records one ``{x, y, time, type}`` point per animation frame,
+which makes ``mouse_moves`` the largest uncompressed field of a page when it
+is stored as JSON. Each received packet is instead stored as one
+self-contained block in a ``WebpageSegment`` of kind ``mouse_moves``, so
+appending a packet never touches the points stored before. A block is::
+
+    header   "<4sIq"   magic, number of points, time of the first point (ms)
+    dt       int32[n]  time deltas to the previous point (the first one is 0)
+    x, y     int32[n]  page coordinates in hundredths of a pixel
+    type     uint8[n]  index into MOVE_TYPES
+
+The format is lossy below ``1 / COORDINATE_SCALE`` pixel: coordinates are
+rounded to hundredths, which keeps the fractional positions reported on
+zoomed pages. The JSON shape is only rebuilt (``mouse_moves_to_list``) when a
+client asks for it, e.g. the exporter.
+"""
+
+import json
+import logging
+import struct
+
+import numpy as np
+
+from .blob_store import append_segment, load_segments
+from .models import WebpageSegment
+from .webpage_payload import get_webpage_segments
+
+logger = logging.getLogger(__name__)
+
+BLOCK_MAGIC = b"MMv2"
+BLOCK_HEADER = struct.Struct("<4sIq")
+COORDINATE_SCALE = 100
+# Blocks of the first format stored whole pixels
+_SCALES = {BLOCK_MAGIC: COORDINATE_SCALE, b"MMv1": 1}
+MOVE_TYPES = ("move", "scroll")
+_TYPE_INDEX = {name: i for i, name in enumerate(MOVE_TYPES)}
+_POINT_SIZE = 4 + 4 + 4 + 1  # dt, x, y, type
+
+EMPTY_JSON_VALUES = ("", "[]", "{}")
+
+
+def encode_mouse_moves(moves):
+    """Encode a list of ``{x, y, time, type}`` dicts as a single block."""
+    points = []
+    for move in moves:
+        try:
+            points.append(
+                (
+                    int(move["time"]),
+                    round(float(move["x"]) * COORDINATE_SCALE),
+                    round(float(move["y"]) * COORDINATE_SCALE),
+                    _TYPE_INDEX.get(move.get("type"), 0),
+                )
+            )
+        except (KeyError, TypeError, ValueError, OverflowError):
+            continue  # skip malformed points
+    if not points:
+        return b""
+
+    data = np.array(points, dtype=np.int64)
+    times = data[:, 0]
+    dt = np.diff(times, prepend=times[0]).astype("<i4")
+    return b"".join(
+        (
+            BLOCK_HEADER.pack(BLOCK_MAGIC, len(points), int(times[0])),
+            dt.tobytes(),
+            data[:, 1].astype("<i4").tobytes(),
+            data[:, 2].astype("<i4").tobytes(),
+            data[:, 3].astype("u1").tobytes(),
+        )
+    )
+
+
+def _iter_blocks(blob):
+    view = memoryview(blob)
+    offset = 0
+    while offset + BLOCK_HEADER.size <= len(view):
+        magic, count, base_time = BLOCK_HEADER.unpack_from(view, offset)
+        if magic not in _SCALES:
+            logger.error(f"Corrupt mouse_moves block at offset {offset}")
+            return
+        start = offset + BLOCK_HEADER.size
+        yield count, base_time, _SCALES[magic], view[start:start + count * _POINT_SIZE]
+        offset = start + count * _POINT_SIZE
+
+
+def decode_mouse_moves(blob):
+    """Decode packed blocks into ``time``, ``x``, ``y`` and ``type`` NumPy arrays."""
+    columns = {"time": [], "x": [], "y": [], "type": []}
+    if blob:
+        for count, base_time, scale, body in _iter_blocks(bytes(blob)):
+            dt = np.frombuffer(body, dtype="<i4", count=count, offset=0)
+            columns["time"].append(base_time + np.cumsum(dt, dtype=np.int64))
+            columns["x"].append(np.frombuffer(body, dtype="<i4", count=count, offset=4 * count) / scale)
+            columns["y"].append(np.frombuffer(body, dtype="<i4", count=count, offset=8 * count) / scale)
+            columns["type"].append(np.frombuffer(body, dtype="u1", count=count, offset=12 * count))
+
+    dtypes = {"time": np.int64, "x": np.float64, "y": np.float64, "type": np.uint8}
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[name])
+        for name, parts in columns.items()
+    }
+
+
+def parse_legacy_mouse_moves(value):
+    if not value or value in EMPTY_JSON_VALUES:
+        return []
+    if isinstance(value, list):
+        return value
+    try:
+        data = json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def _coordinate(value):
+    # Whole pixels come back as ints, as the extension sent them
+    return int(value) if value.is_integer() else value
+
+
+def _get_segments(payload, with_data=True):
+    return get_webpage_segments(payload, WebpageSegment.KIND_MOUSE_MOVES, with_data)
+
+
+def mouse_moves_to_list(payload):
+    """The page's mouse moves in the original ``[{x, y, time, type}]`` shape."""
+    moves = parse_legacy_mouse_moves(payload.mouse_moves)
+    columns = decode_mouse_moves(load_segments(_get_segments(payload)))
+    moves.extend(
+        {
+            "x": _coordinate(x),
+            "y": _coordinate(y),
+            "time": t,
+            "type": MOVE_TYPES[k] if k < len(MOVE_TYPES) else "move",
+        }
+        for t, x, y, k in zip(
+            columns["time"].tolist(),
+            columns["x"].tolist(),
+            columns["y"].tolist(),
+            columns["type"].tolist(),
+        )
+    )
+    return moves
+
+
+def count_mouse_moves(payload):
+    """Number of mouse moves of the page, without decoding the packed points."""
+    legacy = payload.mouse_moves
+    legacy_count = 0
+    if legacy and legacy not in EMPTY_JSON_VALUES:
+        legacy_count = len(parse_legacy_mouse_moves(legacy))
+    return legacy_count + sum(segment.num_items for segment in _get_segments(payload, with_data=False))
+
+
+def has_mouse_moves(payload):
+    if payload.mouse_moves and payload.mouse_moves not in EMPTY_JSON_VALUES:
+        return True
+    return WebpageSegment.objects.filter(
+        webpage_id=payload.webpage_id, kind=WebpageSegment.KIND_MOUSE_MOVES
+    ).exists()
+
+
+def _append(payload, moves, first=False):
+    block = encode_mouse_moves(parse_legacy_mouse_moves(moves))
+    if not block:
+        return False
+    append_segment(
+        WebpageSegment.objects.filter(
+            webpage_id=payload.webpage_id, kind=WebpageSegment.KIND_MOUSE_MOVES
+        ),
+        block,
+        first=first,
+        webpage_id=payload.webpage_id,
+        kind=WebpageSegment.KIND_MOUSE_MOVES,
+        num_items=BLOCK_HEADER.unpack_from(block)[1],
+    )
+    return True
+
+
+def append_mouse_moves(payload, moves):
+    """Append a packet of mouse moves (list or legacy JSON string) to the page of the payload."""
+    _append(payload, moves)
+
+
+def fold_legacy_mouse_moves(payload):
+    """
+    Pack the legacy JSON ``mouse_moves`` of the payload into a segment placed
+    before all others of its page. Returns whether there was anything to
+    pack; the caller saves ``payload.mouse_moves``.
+    """
+    legacy = payload.mouse_moves
+    if not legacy or legacy in EMPTY_JSON_VALUES:
+        return False
+    # JSON points predate every packed block, so they go first
+    _append(payload, legacy, first=True)
+    payload.mouse_moves = None
+    return True
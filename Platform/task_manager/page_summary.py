@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Per-page interaction statistics (``WebpageSummary``).
+
+The summary is computed once, when the final (non-routine) packet of a page
+is stored, so analysis code (``detect_data_anomalies``,
+``statistics_data_size``, the dashboard) reads small rows instead of
+decoding every recording. Pages stored before summaries existed are
+summarized on the fly by ``get_webpage_summary`` until
+``manage.py build_webpage_summaries`` has saved theirs.
+
+Inactivity gaps follow ``detect_data_anomalies``: the time between two
+consecutive full or incremental snapshots, plus the time from the last of
+them to the last event of the page.
+"""
+
+import json
+import logging
+from collections import Counter
+
+from django.conf import settings
+
+from core.offload import run_cpu_bound
+
+from .blob_store import payload_size, segments_size
+from .event_list import count_events
+from .models import WebpageSegment, WebpageSummary
+from .mouse_moves import count_mouse_moves
+from .storage import EMPTY_JSON_VALUES, decode_chunk, decode_legacy_rrweb
+from .webpage_payload import get_webpage_payload, get_webpage_segments
+
+logger = logging.getLogger(__name__)
+
+FULL_SNAPSHOT = 2
+INCREMENTAL_SNAPSHOT = 3
+SCROLL_SOURCE = 3
+
+
+class _EventScan:
+    """Statistics folded over the rrweb events of a page, one segment at a time."""
+
+    def __init__(self, min_gap):
+        self.min_gap = min_gap
+        self.type_counts = Counter()
+        self.source_counts = Counter()
+        self.num_events = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.last_interaction_ts = None
+        self.max_gap = 0
+        self.gaps = []
+        self.max_scroll_y = 0
+
+    def _add_gap(self, gap):
+        self.max_gap = max(self.max_gap, gap)
+        if gap > self.min_gap:
+            self.gaps.append(gap)
+
+    def scan(self, text):
+        events = json.loads(text)
+        if not isinstance(events, list):
+            return
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            self.num_events += 1
+            event_type = event.get("type")
+            self.type_counts[str(event_type)] += 1
+            ts = event.get("timestamp")
+            ts = int(ts) if isinstance(ts, (int, float)) else None
+            if self.first_ts is None:
+                self.first_ts = ts
+                self.last_interaction_ts = ts
+            if ts is not None:
+                self.last_ts = ts
+
+            if event_type == INCREMENTAL_SNAPSHOT:
+                data = event.get("data") or {}
+                source = data.get("source")
+                self.source_counts[str(source)] += 1
+                if source == SCROLL_SOURCE and isinstance(data.get("y"), (int, float)):
+                    self.max_scroll_y = max(self.max_scroll_y, int(data["y"]))
+
+            if event_type in (FULL_SNAPSHOT, INCREMENTAL_SNAPSHOT):
+                if self.last_interaction_ts and ts:
+                    self._add_gap(ts - self.last_interaction_ts)
+                self.last_interaction_ts = ts
+
+    def finish(self):
+        if self.last_interaction_ts and self.last_ts:
+            self._add_gap(self.last_ts - self.last_interaction_ts)
+
+
+def _legacy_size(value):
+    if value in (None, *EMPTY_JSON_VALUES, []):
+        return 0
+    return len(value) if isinstance(value, str) else len(json.dumps(value))
+
+
+def _scan_segment(scan, text, what):
+    try:
+        run_cpu_bound(scan.scan, text, size=len(text))
+    except json.JSONDecodeError:
+        logger.warning(f"Skipping corrupt rrweb segment ({what}) in page summary")
+
+
+def build_webpage_summary(webpage):
+    """Compute the summary of ``webpage`` from its stored data (unsaved)."""
+    payload = get_webpage_payload(webpage)
+    scan = _EventScan(settings.PAGE_SUMMARY_MIN_GAP_SECONDS * 1000)
+    raw_bytes = 0
+    stored_bytes = _legacy_size(payload.rrweb_record)
+
+    if stored_bytes:
+        text = decode_legacy_rrweb(payload.rrweb_record)
+        raw_bytes += len(text)
+        _scan_segment(scan, text, f"legacy record of webpage {webpage.id}")
+    for chunk in webpage.record_chunks.all():
+        text = decode_chunk(chunk)
+        raw_bytes += len(text)
+        stored_bytes += payload_size(chunk, "data")
+        _scan_segment(scan, text, f"chunk {chunk.id} of webpage {webpage.id}")
+    scan.finish()
+
+    return WebpageSummary(
+        webpage=webpage,
+        num_rrweb_events=scan.num_events,
+        rrweb_type_counts=dict(scan.type_counts),
+        rrweb_source_counts=dict(scan.source_counts),
+        num_events=count_events(payload),
+        num_mouse_moves=count_mouse_moves(payload),
+        first_event_timestamp=scan.first_ts,
+        last_event_timestamp=scan.last_ts,
+        max_inactivity_gap=scan.max_gap,
+        total_inactivity_gap=sum(scan.gaps),
+        inactivity_gaps=scan.gaps,
+        rrweb_raw_bytes=raw_bytes,
+        rrweb_stored_bytes=stored_bytes,
+        event_list_bytes=_legacy_size(payload.event_list)
+        + segments_size(get_webpage_segments(payload, WebpageSegment.KIND_EVENTS, with_data=False)),
+        mouse_moves_bytes=_legacy_size(payload.mouse_moves)
+        + segments_size(get_webpage_segments(payload, WebpageSegment.KIND_MOUSE_MOVES, with_data=False)),
+        max_scroll_y=scan.max_scroll_y,
+    )
+
+
+def update_webpage_summary(webpage):
+    """Recompute and save the summary of ``webpage``."""
+    summary = build_webpage_summary(webpage)
+    summary.save()
+    return summary
+
+
+def get_webpage_summary(webpage):
+    """The saved summary of ``webpage``, or one computed on the fly (unsaved)."""
+    try:
+        return webpage.summary
+    except WebpageSummary.DoesNotExist:
+        return build_webpage_summary(webpage)
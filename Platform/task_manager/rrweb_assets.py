@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Content-addressed store for large string payloads of rrweb events.
+
+Full snapshots embed inline stylesheets, ``data:`` images and long text
+nodes, and the same content comes back on every page of a site a participant
+visits. With ``RRWEB_ASSETS_ENABLED``, ingestion replaces every string of at
+least ``RRWEB_ASSET_MIN_BYTES`` by the reference ``ASSET_REF_PREFIX + sha256``
+and writes the content once to ``RRWEB_ASSET_ROOT/ab/cd/<sha256>``.
+
+Each chunk is linked to the assets it references (``WebpageRecordChunk.assets``)
+and ``manage.py gc_rrweb_assets`` removes the assets no chunk links to. A
+packet locks the rows of its assets until its transaction commits and only
+then makes sure their files exist, so the collector, which deletes a row and
+its file under the same lock, never removes an asset a packet is storing.
+The replay player fetches assets from ``get_rrweb_asset`` (cached by the
+browser for good) and substitutes them itself; the exporter inlines them with
+``resolve_asset_refs``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+from core.offload import estimate_json_size, run_cpu_bound
+
+from .models import RrwebAsset
+
+logger = logging.getLogger(__name__)
+
+# NUL does not occur in DOM strings, so a reference cannot clash with content
+ASSET_REF_PREFIX = "\x00rrweb-asset:"
+# How json.dumps serializes a reference
+_ASSET_REF_JSON = re.compile(r'"\\u0000rrweb-asset:([0-9a-f]{64})"')
+_ASSET_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_asset_hash(value):
+    return bool(_ASSET_HASH.match(value or ""))
+
+
+def get_asset_path(asset_hash):
+    return os.path.join(
+        settings.RRWEB_ASSET_ROOT, asset_hash[:2], asset_hash[2:4], asset_hash
+    )
+
+
+def _write_asset(asset_hash, payload):
+    path = get_asset_path(asset_hash)
+    if os.path.exists(path):
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename, so a reader never sees a partial asset
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_asset(asset_hash):
+    """Content of an asset, or None when it is not in the store."""
+    try:
+        with open(get_asset_path(asset_hash), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _extract(events, min_bytes):
+    assets = {}
+    stack = [events]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            if isinstance(value, str):
+                if len(value) < min_bytes:
+                    continue
+                payload = value.encode("utf-8")
+                asset_hash = hashlib.sha256(payload).hexdigest()
+                assets.setdefault(asset_hash, payload)
+                node[key] = ASSET_REF_PREFIX + asset_hash
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+    return assets
+
+
+def extract_rrweb_assets(events):
+    """
+    Move the large strings of a packet's events to the asset store.
+
+    ``events`` is modified in place. Returns the sorted hashes it now
+    references, to be linked to its chunk by ``append_rrweb_chunk`` in the
+    same transaction.
+    """
+    if not settings.RRWEB_ASSETS_ENABLED or not isinstance(events, list):
+        return []
+    assets = run_cpu_bound(
+        _extract, events, settings.RRWEB_ASSET_MIN_BYTES, size=estimate_json_size(events)
+    )
+    if not assets:
+        return []
+    _claim_assets(assets)
+    return sorted(assets)
+
+
+def _claim_assets(assets):
+    """
+    Lock the rows of ``{hash: content}`` until the transaction commits,
+    creating the missing ones, then write the missing files.
+    """
+    hashes = list(assets)
+    while True:
+        RrwebAsset.objects.bulk_create(
+            [RrwebAsset(hash=h, size=len(assets[h])) for h in hashes],
+            ignore_conflicts=True,
+        )
+        locked = RrwebAsset.objects.select_for_update().filter(hash__in=hashes)
+        # Rows deleted by gc_rrweb_assets in between are created again
+        if len(locked.values_list("hash", flat=True)) == len(hashes):
+            break
+    for asset_hash, payload in assets.items():
+        _write_asset(asset_hash, payload)
+
+
+def _inline(match):
+    asset_hash = match.group(1)
+    payload = read_asset(asset_hash)
+    if payload is None:
+        logger.error(f"Missing rrweb asset {asset_hash}")
+        return match.group(0)
+    return json.dumps(payload.decode("utf-8")).replace("</script>", "<\\/script>")
+
+
+def resolve_asset_refs(text):
+    """Inline the assets referenced by a serialized JSON array of events."""
+    if "\\u0000rrweb-asset:" not in text:
+        return text
+    return _ASSET_REF_JSON.sub(_inline, text)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compression codecs for rrweb recordings.
+
+Compressed data always records the codec it was written with, so codecs can
+be switched (``RRWEB_CODEC``) without rewriting existing data:
+
+- ``WebpageRecordChunk`` rows carry ``codec`` and ``dictionary`` columns;
+- legacy ``Webpage.rrweb_record`` values use the envelope
+  ``{"compressed": True, "codec": ..., "dictionary": ..., "data": <base64>}``,
+  where a missing ``codec`` means zlib.
+
+``zstd`` compresses with the active ``RrwebDictionary`` trained by
+``manage.py train_rrweb_dictionary``: full snapshots of the same sites share
+most of their DOM and CSS, which a per-record zlib stream cannot exploit.
+``manage.py recompress_rrweb_records`` rewrites older data with the current
+codec. ``zstandard`` is an optional dependency; without it new data falls back
+to zlib.
+
+Data is HTTP-compatible when it needs no dictionary: zlib streams are what
+HTTP calls ``deflate`` and plain zstd frames are ``zstd``, so the replay
+endpoint can send such data to the browser as stored.
+"""
+
+import codecs
+import logging
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+from core.offload import run_cpu_bound
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+CODECS = (ZLIB, ZSTD)
+
+# Size of the pieces streamed by ``iter_decompress_text``
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# How long the id of the active dictionary is cached by each process
+ACTIVE_DICTIONARY_TTL = 60
+
+_dictionaries = {}  # dictionary id -> zstandard.ZstdCompressionDict
+_active_dictionary = {"id": None, "expires_at": 0}
+_local = threading.local()  # zstd (de)compressors are not thread-safe
+_warned_missing_zstd = False
+
+
+def zstd_available():
+    return zstandard is not None
+
+
+def get_dictionary(dictionary_id):
+    """Load a trained dictionary; rows are immutable so they are cached forever."""
+    if dictionary_id is None:
+        return None
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is None:
+        from .models import RrwebDictionary
+
+        row = RrwebDictionary.objects.only("data").get(id=dictionary_id)
+        dictionary = zstandard.ZstdCompressionDict(bytes(row.data))
+        _dictionaries[dictionary_id] = dictionary
+    return dictionary
+
+
+def get_active_dictionary_id():
+    now = time.time()
+    if now >= _active_dictionary["expires_at"]:
+        from .models import RrwebDictionary
+
+        _active_dictionary["id"] = (
+            RrwebDictionary.objects.filter(is_active=True)
+            .order_by("-created_at")
+            .values_list("id", flat=True)
+            .first()
+        )
+        _active_dictionary["expires_at"] = now + ACTIVE_DICTIONARY_TTL
+    return _active_dictionary["id"]
+
+
+def get_write_codec():
+    """
+    The ``(codec, dictionary_id)`` new data is compressed with.
+
+    ``codec`` is None when ``ENABLE_RRWEB_COMPRESSION`` is off.
+    """
+    global _warned_missing_zstd
+    if not getattr(settings, "ENABLE_RRWEB_COMPRESSION", True):
+        return None, None
+    if getattr(settings, "RRWEB_CODEC", ZLIB) == ZSTD:
+        if zstandard is not None:
+            return ZSTD, get_active_dictionary_id()
+        if not _warned_missing_zstd:
+            logger.warning("RRWEB_CODEC is zstd but zstandard is not installed, using zlib")
+            _warned_missing_zstd = True
+    return ZLIB, None
+
+
+def _zstd_compressor(dictionary_id, dictionary):
+    level = settings.RRWEB_ZSTD_LEVEL
+    cache = _local.__dict__.setdefault("compressors", {})
+    compressor = cache.get((dictionary_id, level))
+    if compressor is None:
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+        cache[(dictionary_id, level)] = compressor
+    return compressor
+
+
+def _zstd_decompressor(dictionary_id, dictionary):
+    cache = _local.__dict__.setdefault("decompressors", {})
+    decompressor = cache.get(dictionary_id)
+    if decompressor is None:
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        cache[dictionary_id] = decompressor
+    return decompressor
+
+
+def _compress(payload, codec, dictionary_id, dictionary):
+    if codec == ZSTD:
+        return _zstd_compressor(dictionary_id, dictionary).compress(payload)
+    return zlib.compress(payload)
+
+
+def _decompress(data, codec, dictionary_id, dictionary):
+    if codec == ZSTD:
+        payload = _zstd_decompressor(dictionary_id, dictionary).decompress(data)
+    else:
+        payload = zlib.decompress(data)
+    return payload.decode("utf-8")
+
+
+def compress_text(text, codec=None, dictionary_id=None):
+    """
+    Compress a JSON string. Returns ``(data, codec, dictionary_id)``.
+
+    Without an explicit ``codec`` the one configured for new data is used;
+    the returned codec is None when compression is disabled.
+    """
+    payload = text.encode("utf-8")
+    if codec is None:
+        codec, dictionary_id = get_write_codec()
+        if codec is None:
+            return payload, None, None
+    # Dictionaries are loaded here, not on the offload pool, which has no
+    # database connection
+    dictionary = get_dictionary(dictionary_id) if codec == ZSTD else None
+    data = run_cpu_bound(
+        _compress, payload, codec, dictionary_id, dictionary, size=len(payload)
+    )
+    return data, codec, dictionary_id
+
+
+def decompress_text(data, codec=ZLIB, dictionary_id=None):
+    """Decompress data written by ``compress_text`` back into a JSON string."""
+    codec = codec or ZLIB
+    if codec not in CODECS:
+        raise ValueError(f"Unknown rrweb codec: {codec}")
+    if codec == ZSTD and zstandard is None:
+        raise RuntimeError("zstandard is required to read zstd-compressed rrweb data")
+    dictionary = get_dictionary(dictionary_id) if codec == ZSTD else None
+    return run_cpu_bound(
+        _decompress, data, codec, dictionary_id, dictionary, size=len(data)
+    )
+
+
+def http_content_coding(codec, dictionary_id=None):
+    """The HTTP ``Content-Encoding`` of data written with ``codec``, or None."""
+    codec = codec or ZLIB
+    if codec == ZLIB:
+        return "deflate"
+    if codec == ZSTD and dictionary_id is None:
+        return "zstd"
+    return None
+
+
+def _iter_zlib(data):
+    decompressor = zlib.decompressobj()
+    while data:
+        yield decompressor.decompress(data, STREAM_BLOCK_SIZE)
+        data = decompressor.unconsumed_tail
+    yield decompressor.flush()
+
+
+def iter_decompress_text(data, codec=ZLIB, dictionary_id=None):
+    """
+    Like ``decompress_text``, but yield the JSON string in pieces of at most
+    ``STREAM_BLOCK_SIZE`` bytes so large records are never held in memory.
+
+    Pieces are small, so they are decompressed inline rather than offloaded.
+    """
+    codec = codec or ZLIB
+    if codec not in CODECS:
+        raise ValueError(f"Unknown rrweb codec: {codec}")
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed rrweb data")
+        # A suspended stream keeps its decompressor busy, so it gets its own
+        decompressor = zstandard.ZstdDecompressor(dict_data=get_dictionary(dictionary_id))
+        blocks = decompressor.read_to_iter(
+            data, read_size=STREAM_BLOCK_SIZE, write_size=STREAM_BLOCK_SIZE
+        )
+    else:
+        blocks = _iter_zlib(data)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
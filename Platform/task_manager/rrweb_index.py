@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Keyframe index of rrweb recordings.
+
+Every ``WebpageRecordChunk`` records the timestamps of its first and last
+event and its ``keyframes``: ``[offset, timestamp]`` pairs locating the full
+snapshots (type 2) among its events, the offset pointing at the Meta event
+(type 4) that precedes a snapshot when there is one. The index is built
+when a packet is stored or chunks are compacted; ``keyframes`` is null for
+chunks stored before that until ``manage.py index_rrweb_records`` runs.
+
+Together the chunks form a timestamp -> chunk map, so a time window of a
+long recording is served by decoding only the chunks it overlaps, starting
+from the nearest preceding full snapshot (``storage.dump_rrweb_window``).
+"""
+
+META = 4
+FULL_SNAPSHOT = 2
+
+
+def _timestamp(event):
+    ts = event.get("timestamp") if isinstance(event, dict) else None
+    return int(ts) if isinstance(ts, (int, float)) else None
+
+
+def index_rrweb_events(events):
+    """The index fields of a chunk holding ``events``, as a dict."""
+    first_ts = last_ts = None
+    keyframes = []
+    for offset, event in enumerate(events):
+        ts = _timestamp(event)
+        if ts is None:
+            continue
+        if first_ts is None:
+            first_ts = ts
+        last_ts = ts
+        if event.get("type") == FULL_SNAPSHOT:
+            if offset and isinstance(events[offset - 1], dict) and events[offset - 1].get("type") == META:
+                offset -= 1
+            keyframes.append([offset, ts])
+    return {
+        "first_timestamp": first_ts,
+        "last_timestamp": last_ts,
+        "keyframes": keyframes,
+    }
+
+
+def is_indexed(chunk):
+    return chunk.keyframes is not None
+
+
+def merge_rrweb_indexes(chunks):
+    """
+    The index of the concatenation of ``chunks`` (in ``seq`` order), or None
+    if one of them is not indexed.
+    """
+    if not all(is_indexed(c) for c in chunks):
+        return None
+    first_ts = next((c.first_timestamp for c in chunks if c.first_timestamp is not None), None)
+    last_ts = next((c.last_timestamp for c in reversed(chunks) if c.last_timestamp is not None), None)
+    keyframes = []
+    base = 0
+    for c in chunks:
+        keyframes.extend([offset + base, ts] for offset, ts in c.keyframes)
+        base += c.num_events
+    return {
+        "first_timestamp": first_ts,
+        "last_timestamp": last_ts,
+        "keyframes": keyframes,
+    }
+
+
+def find_keyframe(chunks, start):
+    """
+    ``(chunk position, event offset)`` of the last keyframe at or before
+    ``start`` among indexed ``chunks``, or None when there is none.
+    """
+    for position in range(len(chunks) - 1, -1, -1):
+        for offset, ts in reversed(chunks[position].keyframes):
+            if ts <= start:
+                return position, offset
+    return None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lite variant of rrweb recordings, for reviewing the flow of a page quickly.
+
+Mouse move, touch move, drag and scroll events make up most of a recording
+but tell little about what happened on the page. The lite variant drops
+them, or keeps one per source every ``RRWEB_LITE_SAMPLE_MS`` when that is
+set, and keeps snapshots, DOM mutations, inputs and all other events.
+
+It is generated once per state of the recording (``rrweb_record_etag``) and
+kept zlib-compressed in the cache for ``RRWEB_LITE_CACHE_TIMEOUT``, so it
+can be sent as is with ``Content-Encoding: deflate``.
+"""
+
+import json
+import logging
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.offload import run_cpu_bound
+
+from .storage import iter_rrweb_segments
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_SNAPSHOT = 3
+# MouseMove, Scroll, TouchMove and Drag incremental sources
+HIGH_FREQUENCY_SOURCES = (1, 3, 6, 12)
+
+
+class _Sampler:
+    """Decides which high-frequency events are kept, across the segments of a page."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_kept = {}
+
+    def keep(self, event):
+        if not isinstance(event, dict) or event.get("type") != INCREMENTAL_SNAPSHOT:
+            return True
+        source = (event.get("data") or {}).get("source")
+        if source not in HIGH_FREQUENCY_SOURCES:
+            return True
+        ts = event.get("timestamp")
+        if not self.interval or not isinstance(ts, (int, float)):
+            return False
+        last = self.last_kept.get(source)
+        if last is not None and ts - last < self.interval:
+            return False
+        self.last_kept[source] = ts
+        return True
+
+    def filter(self, text):
+        """The kept events of a JSON array string, without the brackets."""
+        events = json.loads(text)
+        if not isinstance(events, list):
+            return ""
+        return json.dumps([event for event in events if self.keep(event)])[1:-1]
+
+
+def build_lite_record(webpage, chunks=None):
+    """The lite variant of the recording as a zlib-compressed JSON array."""
+    sampler = _Sampler(settings.RRWEB_LITE_SAMPLE_MS)
+    compressor = zlib.compressobj()
+    parts = [compressor.compress(b"[")]
+    separator = b""
+    for segment in iter_rrweb_segments(webpage, chunks):
+        try:
+            inner = run_cpu_bound(sampler.filter, segment, size=len(segment))
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping corrupt rrweb segment of webpage {webpage.id}: {e}")
+            continue
+        if inner:
+            parts.append(compressor.compress(separator + inner.encode("utf-8")))
+            separator = b","
+    parts.append(compressor.compress(b"]"))
+    parts.append(compressor.flush())
+    return b"".join(parts)
+
+
+def get_lite_record(webpage, record_etag, chunks=None):
+    """The cached lite variant of the recording, generated on first use."""
+    key = f"rrweb_lite:{webpage.id}:{record_etag}:{settings.RRWEB_LITE_SAMPLE_MS}"
+    try:
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cannot read the lite replay of webpage {webpage.id} from the cache: {e}")
+        data = None
+    if data is not None:
+        return data
+
+    data = build_lite_record(webpage, chunks)
+    try:
+        cache.set(key, data, settings.RRWEB_LITE_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Cannot cache the lite replay of webpage {webpage.id}: {e}")
+    return data
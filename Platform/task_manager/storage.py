@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Read/write helpers for rrweb recordings.
+
+A page's recording is the legacy ``WebpagePayload.rrweb_record`` value (a list,
+a JSON string or a ``{"compressed": True, "data": ...}`` envelope) followed by its
+``WebpageRecordChunk`` rows in ``seq`` order. New packets are only ever
+appended as chunks, so storing a packet never touches earlier data.
+Compression is delegated to ``rrweb_codecs``, the location of chunk data to
+``blob_store``; large strings of chunks may be references into the asset
+store of ``rrweb_assets``. Chunks carry the keyframe index of ``rrweb_index``.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+
+from core.offload import estimate_json_size, run_cpu_bound
+
+from .blob_store import discard_payload, load_payload, payload_size, save_payload
+from .models import WebpageRecordChunk
+from .rrweb_assets import resolve_asset_refs
+from .rrweb_codecs import compress_text, decompress_text, iter_decompress_text
+from .rrweb_index import find_keyframe, index_rrweb_events, is_indexed, merge_rrweb_indexes
+from .webpage_payload import get_webpage_payload
+
+logger = logging.getLogger(__name__)
+
+EMPTY_JSON_VALUES = ("", "[]", "{}")
+
+
+def join_json_arrays(texts):
+    """Concatenate serialized JSON arrays into one array without parsing them."""
+    parts = []
+    for text in texts:
+        inner = text.strip()[1:-1].strip()
+        if inner:
+            parts.append(inner)
+    return "[" + ",".join(parts) + "]"
+
+
+def decode_legacy_rrweb(record):
+    """Return the legacy ``WebpagePayload.rrweb_record`` value as a JSON array string."""
+    if not record:
+        return "[]"
+    if isinstance(record, list):
+        return json.dumps(record)
+    if isinstance(record, str):
+        if record in EMPTY_JSON_VALUES:
+            return "[]"
+        if not record.lstrip().startswith("{"):
+            return record
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError:
+            return "[]"
+    if isinstance(record, dict) and record.get("compressed"):
+        try:
+            return decompress_text(
+                base64.b64decode(record["data"]),
+                record.get("codec"),
+                record.get("dictionary"),
+            )
+        except Exception as e:
+            logger.error(f"Error decompressing legacy rrweb_record: {e}")
+    return "[]"
+
+
+def encode_legacy_rrweb(text, codec=None, dictionary_id=None):
+    """Build a compressed ``WebpagePayload.rrweb_record`` envelope for a JSON array string."""
+    data, codec, dictionary_id = compress_text(text, codec, dictionary_id)
+    if codec is None:
+        return text
+    return {
+        "compressed": True,
+        "codec": codec,
+        "dictionary": dictionary_id,
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def decode_chunk(chunk):
+    """Return the events of a single chunk as a JSON array string."""
+    data = load_payload(chunk, "data")
+    if chunk.compressed:
+        return decompress_text(data, chunk.codec, chunk.dictionary_id)
+    return data.decode("utf-8")
+
+
+def set_chunk_data(chunk, text, codec=None, dictionary_id=None):
+    """Store a JSON array string as the chunk's data with the given (or configured) codec."""
+    data, codec, dictionary_id = compress_text(text, codec, dictionary_id)
+    save_payload(chunk, "data", data)
+    chunk.size = len(data)
+    chunk.compressed = codec is not None
+    chunk.codec = codec or ""
+    chunk.dictionary_id = dictionary_id
+
+
+def _get_chunks(webpage):
+    # ``record_chunks.all()`` reuses prefetched rows when the caller prefetched them
+    return webpage.record_chunks.all()
+
+
+def iter_rrweb_segments(webpage, chunks=None):
+    """
+    Yield the page's recording as consecutive JSON array strings. ``chunks``
+    may be given as returned by ``list_rrweb_chunks``.
+    """
+    legacy = get_webpage_payload(webpage).rrweb_record
+    if legacy not in (None, *EMPTY_JSON_VALUES, []):
+        yield decode_legacy_rrweb(legacy)
+    for chunk in _get_chunks(webpage) if chunks is None else chunks:
+        yield decode_chunk(chunk)
+
+
+def dump_rrweb_record(webpage, resolve_assets=False):
+    """
+    Return the full recording as a single JSON array string.
+
+    Asset references are kept for the replay player, which resolves them
+    itself; pass ``resolve_assets`` for a self-contained record.
+    """
+    segments = iter_rrweb_segments(webpage)
+    if resolve_assets:
+        segments = (resolve_asset_refs(segment) for segment in segments)
+    return join_json_arrays(segments)
+
+
+def list_rrweb_chunks(webpage):
+    """The chunk rows of the page without their data, which is loaded on access."""
+    return list(webpage.record_chunks.defer("data"))
+
+
+def get_stored_rrweb_chunk(webpage, chunks):
+    """
+    The chunk holding the page's whole recording, compressed, or None when the
+    recording is spread over several chunks (``compact_rrweb_records`` merges
+    those of finished tasks) or still has a legacy record.
+    """
+    legacy = get_webpage_payload(webpage).rrweb_record
+    if legacy not in (None, *EMPTY_JSON_VALUES, []) or len(chunks) != 1:
+        return None
+    return chunks[0] if chunks[0].compressed else None
+
+
+def rrweb_record_etag(webpage, chunks):
+    """
+    A validator of the page's stored recording, computed from chunk metadata
+    only. Appending, compacting or recompressing chunks changes it.
+    """
+    legacy = get_webpage_payload(webpage).rrweb_record
+    if isinstance(legacy, dict):
+        legacy = [legacy.get("codec"), legacy.get("dictionary"), len(legacy.get("data") or "")]
+    else:
+        legacy = len(legacy) if legacy else 0
+    state = [legacy] + [
+        [
+            c.id,
+            c.seq,
+            c.num_events,
+            c.codec,
+            c.dictionary_id,
+            # Chunks written before ``size`` existed read it from their data
+            c.size if c.size is not None else payload_size(c, "data"),
+        ]
+        for c in chunks
+    ]
+    return hashlib.sha256(json.dumps(state).encode("utf-8")).hexdigest()[:32]
+
+
+def _iter_chunk_text(chunk):
+    try:
+        data = load_payload(chunk, "data")
+        if chunk.compressed:
+            yield from iter_decompress_text(data, chunk.codec, chunk.dictionary_id)
+        else:
+            yield data.decode("utf-8")
+    except Exception as e:
+        logger.error(f"Error streaming rrweb chunk {chunk.id} of webpage {chunk.webpage_id}: {e}")
+        raise
+
+
+def _iter_array_items(pieces):
+    """Yield the text between the brackets of a JSON array given in pieces."""
+    opened = False
+    held = ""
+    for piece in pieces:
+        if not opened:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            piece = piece[1:]
+            opened = True
+        text = held + piece
+        # The last non-blank character may be the closing bracket, hold it back
+        end = len(text.rstrip()) - 1
+        if end < 0:
+            held = text
+            continue
+        held = text[end:]
+        if end:
+            yield text[:end]
+
+
+def stream_rrweb_record(webpage, chunks=None):
+    """
+    Yield the full recording as pieces of a single JSON array string.
+
+    Chunks are loaded and decompressed one at a time, in pieces of bounded
+    size, so memory use does not grow with the recording; ``chunks`` may be
+    given as returned by ``list_rrweb_chunks``.
+    """
+    if chunks is None:
+        chunks = list_rrweb_chunks(webpage)
+    legacy = get_webpage_payload(webpage).rrweb_record
+    segments = []
+    if legacy not in (None, *EMPTY_JSON_VALUES, []):
+        segments.append([decode_legacy_rrweb(legacy)])
+    # Chunk generators only load their data once the stream reaches them
+    segments.extend(_iter_chunk_text(chunk) for chunk in chunks)
+
+    yield "["
+    separator = ""
+    for pieces in segments:
+        started = False
+        for text in _iter_array_items(pieces):
+            if not started:
+                text = text.lstrip()
+                if not text:
+                    continue
+                yield separator
+                separator = ","
+                started = True
+            yield text
+    yield "]"
+
+
+def load_rrweb_events(webpage):
+    """Return the full recording as a list of rrweb events."""
+    events = []
+    for segment in iter_rrweb_segments(webpage):
+        try:
+            data = run_cpu_bound(json.loads, segment, size=len(segment))
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping corrupt rrweb segment of webpage {webpage.id}: {e}")
+            continue
+        if isinstance(data, list):
+            events.extend(data)
+    return events
+
+
+def has_rrweb_events(webpage):
+    """Whether the page has any recorded rrweb event."""
+    if get_webpage_payload(webpage).rrweb_record not in (None, *EMPTY_JSON_VALUES, []):
+        return True
+    return webpage.record_chunks.filter(num_events__gt=0).exists()
+
+
+def count_chunk_events(webpage):
+    """Number of events stored in chunks, read from chunk metadata only."""
+    return webpage.record_chunks.aggregate(total=Sum("num_events"))["total"] or 0
+
+
+def append_rrweb_chunk(webpage, events_json, num_events, asset_refs=None, index=None):
+    """
+    Append a packet of rrweb events to the page.
+
+    ``events_json`` is the serialized JSON array received from the extension;
+    it is stored as-is (optionally compressed) without being re-serialized.
+    ``asset_refs`` are the hashes returned by ``extract_rrweb_assets``,
+    ``index`` the fields returned by ``index_rrweb_events``.
+    """
+    last_seq = webpage.record_chunks.aggregate(last=Max("seq"))["last"]
+    chunk = WebpageRecordChunk(
+        webpage=webpage,
+        seq=0 if last_seq is None else last_seq + 1,
+        num_events=num_events,
+        **(index or {}),
+    )
+    set_chunk_data(chunk, events_json)
+    chunk.save()
+    if asset_refs:
+        _link_assets(chunk, asset_refs)
+    return chunk
+
+
+def _link_assets(chunk, asset_hashes):
+    ChunkAsset = WebpageRecordChunk.assets.through
+    ChunkAsset.objects.bulk_create(
+        [ChunkAsset(webpagerecordchunk_id=chunk.id, rrwebasset_id=h) for h in asset_hashes],
+        ignore_conflicts=True,
+    )
+
+
+def fold_legacy_rrweb(payload):
+    """
+    Move the legacy ``rrweb_record`` of the payload into a chunk placed before
+    all others of its page. The caller saves ``payload.rrweb_record``.
+
+    Returns whether the legacy value was moved; undecodable values are kept.
+    """
+    if payload.rrweb_record in (None, *EMPTY_JSON_VALUES, []):
+        return False
+    text = decode_legacy_rrweb(payload.rrweb_record)
+    try:
+        events = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(events, list) or not events:
+        return False
+
+    first_seq = WebpageRecordChunk.objects.filter(
+        webpage_id=payload.webpage_id
+    ).aggregate(first=Min("seq"))["first"]
+    chunk = WebpageRecordChunk(
+        webpage_id=payload.webpage_id,
+        seq=0 if first_seq is None else first_seq - 1,
+        num_events=len(events),
+        **index_rrweb_events(events),
+    )
+    set_chunk_data(chunk, text)
+    chunk.save()
+    payload.rrweb_record = None
+    return True
+
+
+def compact_rrweb_chunks(webpage):
+    """
+    Merge all chunks of a page into a single chunk.
+
+    Returns the number of chunks removed by the merge.
+    """
+    with transaction.atomic():
+        chunks = list(
+            WebpageRecordChunk.objects.select_for_update()
+            .filter(webpage=webpage)
+            .order_by("seq")
+        )
+        if len(chunks) < 2:
+            return 0
+
+        merged = join_json_arrays(decode_chunk(c) for c in chunks)
+        index = merge_rrweb_indexes(chunks)
+        if index is None:
+            index = run_cpu_bound(_index_text, merged, size=len(merged))
+
+        # Keep the last seq so packets arriving after compaction still sort after it
+        target = chunks[-1]
+        set_chunk_data(target, merged)
+        target.num_events = sum(c.num_events for c in chunks)
+        for field, value in index.items():
+            setattr(target, field, value)
+        target.save(
+            update_fields=[
+                "data",
+                "data_blob",
+                "compressed",
+                "codec",
+                "dictionary",
+                "size",
+                "num_events",
+                "first_timestamp",
+                "last_timestamp",
+                "keyframes",
+            ]
+        )
+        # The merged chunk takes over the asset links of the others before they go
+        _link_assets(
+            target,
+            WebpageRecordChunk.assets.through.objects.filter(
+                webpagerecordchunk_id__in=[c.id for c in chunks[:-1]]
+            ).values_list("rrwebasset_id", flat=True).distinct(),
+        )
+
+        for c in chunks[:-1]:
+            discard_payload(c, "data")
+        WebpageRecordChunk.objects.filter(
+            id__in=[c.id for c in chunks[:-1]]
+        ).delete()
+        return len(chunks) - 1
+
+
+def _index_text(text):
+    events = json.loads(text)
+    return index_rrweb_events(events if isinstance(events, list) else [])
+
+
+def index_rrweb_chunk(chunk):
+    """Build the keyframe index of a chunk stored without one. The caller saves it."""
+    text = decode_chunk(chunk)
+    try:
+        index = run_cpu_bound(_index_text, text, size=len(text))
+    except json.JSONDecodeError as e:
+        logger.error(f"Cannot index corrupt rrweb chunk {chunk.id}: {e}")
+        return False
+    for field, value in index.items():
+        setattr(chunk, field, value)
+    return True
+
+
+def _timestamp(event):
+    ts = event.get("timestamp") if isinstance(event, dict) else None
+    return ts if isinstance(ts, (int, float)) else None
+
+
+def _slice_window(events, begin, start, end):
+    """``events[begin:]``, or those from ``start`` when ``begin`` is None, before ``end``."""
+    if begin is not None:
+        events = events[begin:]
+    else:
+        events = [e for e in events if _timestamp(e) is None or _timestamp(e) >= start]
+    return [e for e in events if _timestamp(e) is None or _timestamp(e) < end]
+
+
+def _dump_window(text, begin, start, end):
+    events = json.loads(text)
+    if not isinstance(events, list):
+        return "[]"
+    return json.dumps(_slice_window(events, begin, start, end))
+
+
+def dump_rrweb_window(webpage, start, end, from_keyframe=True, chunks=None):
+    """
+    Return the events of the recording timed within ``[start, end)`` as a
+    JSON array string.
+
+    With ``from_keyframe`` the window starts at the last full snapshot at or
+    before ``start`` instead, so it can be replayed on its own. Only the
+    chunks overlapping the window are decoded, and only the first and last
+    of them are parsed; recordings without a complete index are sliced
+    after a full decode.
+    """
+    if chunks is None:
+        chunks = list_rrweb_chunks(webpage)
+    legacy = get_webpage_payload(webpage).rrweb_record
+    if legacy not in (None, *EMPTY_JSON_VALUES, []) or not all(is_indexed(c) for c in chunks):
+        events = load_rrweb_events(webpage)
+        begin = None
+        if from_keyframe:
+            keyframes = [offset for offset, ts in index_rrweb_events(events)["keyframes"] if ts <= start]
+            begin = keyframes[-1] if keyframes else None
+        window = _slice_window(events, begin, start, end)
+        return run_cpu_bound(json.dumps, window, size=estimate_json_size(window))
+
+    # Chunks without events have no place on the timeline
+    chunks = [c for c in chunks if c.first_timestamp is not None]
+    found = find_keyframe(chunks, start) if from_keyframe else None
+    if found:
+        first, begin = found
+    else:
+        first = next((i for i, c in enumerate(chunks) if c.last_timestamp >= start), len(chunks))
+        begin = None
+
+    parts = []
+    for position in range(first, len(chunks)):
+        chunk = chunks[position]
+        if chunk.first_timestamp >= end:
+            break
+        text = decode_chunk(chunk)
+        cut_head = position == first and (
+            begin != 0 if begin is not None else chunk.first_timestamp < start
+        )
+        if cut_head or chunk.last_timestamp >= end:
+            text = run_cpu_bound(
+                _dump_window,
+                text,
+                begin if position == first else 0,
+                start,
+                end,
+                size=len(text),
+            )
+        parts.append(text)
+    return join_json_arrays(parts)
+
+
+def describe_rrweb_index(webpage, chunks=None):
+    """
+    The timeline of the recording as a dict for the replay player: its time
+    range, number of events and keyframe timestamps. ``indexed`` is False
+    when some data has no index yet, and windows are then served slowly.
+    """
+    if chunks is None:
+        chunks = list_rrweb_chunks(webpage)
+    legacy = get_webpage_payload(webpage).rrweb_record
+    indexed = legacy in (None, *EMPTY_JSON_VALUES, []) and all(is_indexed(c) for c in chunks)
+    timed = [c for c in chunks if c.first_timestamp is not None]
+    return {
+        "indexed": indexed,
+        "num_events": sum(c.num_events for c in chunks),
+        "first_timestamp": timed[0].first_timestamp if timed else None,
+        "last_timestamp": timed[-1].last_timestamp if timed else None,
+        "keyframes": [ts for c in timed if is_indexed(c) for _, ts in c.keyframes],
+        "chunks": [
+            [c.seq, c.first_timestamp, c.last_timestamp, c.num_events] for c in timed
+        ],
+    }
@@ -0,0 +1,49 @@
+import json
+
+from django.test import TestCase
+
+from task_manager.event_list import (
+    append_event_segment,
+    count_events,
+    fold_legacy_event_list,
+    load_event_list,
+)
+from task_manager.models import Task, Webpage, WebpagePayload, WebpageSegment
+from task_manager.webpage_payload import save_webpage_payload
+from user_system.models import User
+
+
+class EventSegmentTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("events", "events@example.com", "password")
+        task = Task.objects.create(user=user)
+        self.webpage = Webpage.objects.create(user=user, belong_task=task, url="https://example.com/")
+        self.payload = WebpagePayload.objects.create(webpage=self.webpage)
+
+    def test_segments_round_trip(self):
+        append_event_segment(self.payload, [{"a": 1}])
+        append_event_segment(self.payload, json.dumps([{"a": 2}, {"a": 3}]))
+        append_event_segment(self.payload, [])
+
+        self.assertEqual(load_event_list(self.payload), [{"a": 1}, {"a": 2}, {"a": 3}])
+        self.assertEqual(count_events(self.payload), 3)
+        self.assertEqual(
+            WebpageSegment.objects.filter(webpage=self.webpage, kind=WebpageSegment.KIND_EVENTS).count(), 2
+        )
+
+    def test_legacy_event_list_is_read_first(self):
+        self.payload.event_list = json.dumps([{"a": 0}])
+        append_event_segment(self.payload, [{"a": 1}])
+
+        self.assertEqual(load_event_list(self.payload), [{"a": 0}, {"a": 1}])
+        self.assertEqual(count_events(self.payload), 2)
+
+    def test_folded_event_list_is_saved(self):
+        WebpagePayload.objects.filter(webpage=self.webpage).update(event_list=json.dumps([{"a": 0}]))
+        payload = WebpagePayload.objects.get(webpage=self.webpage)
+
+        self.assertTrue(fold_legacy_event_list(payload))
+        save_webpage_payload(payload)
+        payload = WebpagePayload.objects.get(webpage=self.webpage)
+        self.assertIsNone(payload.event_list)
+        self.assertEqual(load_event_list(payload), [{"a": 0}])
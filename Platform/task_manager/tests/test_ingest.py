@@ -0,0 +1,185 @@
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from task_manager import ingest
+from task_manager.event_list import load_event_list
+from task_manager.management.commands import ingest_worker
+from task_manager.models import Task, Webpage, WebpageSummary
+from task_manager.storage import load_rrweb_events
+from task_manager.utils import _store_packet
+from task_manager.webpage_payload import get_webpage_payload
+from user_system.models import User
+
+
+def make_packet(seq, page_key="page-1", routine=True):
+    return {
+        "url": "https://example.com/",
+        "start_timestamp": 1700000000000,
+        "page_key": page_key,
+        "seq": seq,
+        "rrweb_record": [{"type": 3, "timestamp": 1700000000000 + seq}],
+        "event_list": [{"seq": seq}],
+        "mouse_moves": [{"x": seq, "y": seq, "time": 1700000000000 + seq}],
+        "is_routine_update": routine,
+        "dwell_time": 1000,
+    }
+
+
+class StorePacketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ingest", "ingest@example.com", "password")
+        self.task = Task.objects.create(user=self.user)
+
+    def store(self, packet):
+        return _store_packet(packet, self.user, self.task, {})
+
+    def test_replayed_packet_is_applied_once(self):
+        self.store(make_packet(0))
+        self.store(make_packet(1))
+        self.store(make_packet(1))
+
+        webpage = Webpage.objects.get(belong_task=self.task, page_key="page-1")
+        self.assertEqual(webpage.last_seq, 1)
+        self.assertEqual(load_event_list(get_webpage_payload(webpage)), [{"seq": 0}, {"seq": 1}])
+        self.assertEqual(len(load_rrweb_events(webpage)), 2)
+
+    def test_older_packet_is_skipped(self):
+        self.store(make_packet(2))
+        self.store(make_packet(1))
+
+        webpage = Webpage.objects.get(belong_task=self.task, page_key="page-1")
+        self.assertEqual(webpage.last_seq, 2)
+        self.assertEqual(load_event_list(get_webpage_payload(webpage)), [{"seq": 2}])
+
+    def test_routine_packets_leave_the_payload_row_alone(self):
+        self.store(make_packet(0))
+        with CaptureQueriesContext(connection) as queries:
+            self.store(make_packet(1))
+
+        payload_writes = [
+            q["sql"] for q in queries.captured_queries
+            if "webpagepayload" in q["sql"] and not q["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(payload_writes, [])
+
+    def test_final_packet_is_summarized_after_commit(self):
+        self.store(make_packet(0))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.store(make_packet(1, routine=False))
+        self.assertFalse(WebpageSummary.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        webpage = Webpage.objects.get(belong_task=self.task, page_key="page-1")
+        self.assertTrue(WebpageSummary.objects.filter(webpage=webpage).exists())
+
+    def test_page_keys_are_separate_webpages(self):
+        self.store(make_packet(0, page_key="page-1"))
+        self.store(make_packet(0, page_key="page-2"))
+        self.store(make_packet(1, page_key="page-1"))
+
+        self.assertEqual(Webpage.objects.filter(belong_task=self.task).count(), 2)
+
+
+class IngestWatermarkTests(TestCase):
+    def test_parse_ingest_cookie(self):
+        self.assertEqual(ingest.parse_ingest_cookie("3f2a-9c:12"), ("3f2a-9c", 12))
+        self.assertIsNone(ingest.parse_ingest_cookie("12"))
+        self.assertIsNone(ingest.parse_ingest_cookie("epoch:"))
+        self.assertIsNone(ingest.parse_ingest_cookie("bad epoch:1"))
+        self.assertIsNone(ingest.parse_ingest_cookie(None))
+
+    def test_advance_keeps_the_highest_seq_of_each_epoch(self):
+        messages = [
+            {"ingest_epoch": "a", "ingest_seq": 3},
+            {"ingest_epoch": "a", "ingest_seq": 5},
+            {"ingest_epoch": "b", "ingest_seq": 1},
+            {"ingest_seq": 9},  # extensions without epochs are ignored
+        ]
+        with mock.patch.object(ingest, "_ADVANCE_WATERMARK") as script:
+            ingest.advance_ingest_watermark(7, messages)
+
+        calls = {call.kwargs["keys"][0]: call.kwargs["args"][0] for call in script.call_args_list}
+        self.assertEqual(
+            calls,
+            {ingest.get_watermark_key(7, "a"): 5, ingest.get_watermark_key(7, "b"): 1},
+        )
+
+    def test_wait_returns_once_the_epoch_reached_the_seq(self):
+        with mock.patch.object(ingest, "redis_client") as redis:
+            redis.get.return_value = b"5"
+            self.assertTrue(ingest.wait_for_ingest_watermark(7, "a", 5, timeout=1))
+            redis.get.assert_called_with(ingest.get_watermark_key(7, "a"))
+
+    def test_wait_returns_when_nothing_was_stored_yet(self):
+        with mock.patch.object(ingest, "redis_client") as redis:
+            self.assertTrue(ingest.wait_for_ingest_watermark(7, "a", 0, timeout=1))
+            redis.get.assert_not_called()
+
+    def test_wait_times_out_for_a_new_epoch(self):
+        with mock.patch.object(ingest, "redis_client") as redis:
+            redis.get.return_value = None
+            self.assertFalse(ingest.wait_for_ingest_watermark(7, "b", 1, timeout=0))
+
+
+class IngestWorkerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("worker", "worker@example.com", "password")
+        self.worker = ingest_worker.Command()
+        self.worker.owned = {0}
+        self.worker.failures = {}
+        self.worker.retry_delay = 1.0
+
+    def entry(self, message):
+        return {b"user_id": str(self.user.id).encode(), b"message": json.dumps(message).encode()}
+
+    def test_packet_without_url_is_dropped(self):
+        Task.objects.create(user=self.user)
+        message = {"seq": 1, "ingest_epoch": "a", "ingest_seq": 4}
+        with mock.patch.object(ingest, "decompress_json_data", side_effect=json.loads), \
+                mock.patch.object(ingest, "_finish_entry") as finish, \
+                mock.patch("task_manager.utils.advance_ingest_watermark") as advance:
+            ingest.process_entry(0, b"1-0", self.entry(message))
+        self.assertFalse(Webpage.objects.exists())
+        # Pages waiting for the dropped packet are released
+        advance.assert_called_once_with(self.user.id, [message])
+        finish.assert_called_once_with(0, b"1-0", self.user.id)
+
+    def test_dead_lettered_entry_advances_the_watermark(self):
+        message = [make_packet(0) | {"ingest_epoch": "a", "ingest_seq": 3}]
+        with mock.patch.object(ingest, "decompress_json_data", side_effect=json.loads), \
+                mock.patch.object(ingest, "redis_client"), \
+                mock.patch.object(ingest, "advance_ingest_watermark") as advance:
+            ingest.dead_letter_entry(0, b"1-0", self.entry(message), RuntimeError("boom"))
+        advance.assert_called_once_with(self.user.id, message)
+
+    @override_settings(DATA_INGEST_MAX_ATTEMPTS=3)
+    def test_failing_entry_is_retried_then_dead_lettered(self):
+        entries = [(b"1-0", {}), (b"2-0", {})]
+        with mock.patch.object(ingest_worker, "process_entry", side_effect=[RuntimeError("boom"), None]) as process, \
+                mock.patch.object(ingest_worker, "record_failed_attempt", return_value=2), \
+                mock.patch.object(ingest_worker, "dead_letter_entry") as dead_letter:
+            self.worker._process_entries(0, entries)
+        # Below the limit the partition backs off before the next entry
+        self.assertEqual(process.call_count, 1)
+        dead_letter.assert_not_called()
+        self.assertIn(0, self.worker.failures)
+
+        with mock.patch.object(ingest_worker, "process_entry", side_effect=[RuntimeError("boom"), None]) as process, \
+                mock.patch.object(ingest_worker, "record_failed_attempt", return_value=3), \
+                mock.patch.object(ingest_worker, "dead_letter_entry") as dead_letter:
+            self.worker._process_entries(0, entries)
+        dead_letter.assert_called_once()
+        self.assertEqual(dead_letter.call_args.args[:2], (0, b"1-0"))
+        self.assertEqual(process.call_count, 2)
+        self.assertNotIn(0, self.worker.failures)
+
+    def test_lost_partition_stops_processing(self):
+        self.worker.owned = set()
+        with mock.patch.object(ingest_worker, "process_entry") as process:
+            self.worker._process_entries(0, [(b"1-0", {})])
+        process.assert_not_called()
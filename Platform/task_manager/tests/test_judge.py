@@ -0,0 +1,142 @@
+import json
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from task_manager import judging
+from task_manager.management.commands.rejudge_trials import Command as RejudgeCommand
+from task_manager.models import (
+    JudgeVerdict,
+    RejudgeDisagreement,
+    RejudgeRun,
+    Task,
+    TaskDataset,
+    TaskDatasetEntry,
+    TaskTrial,
+)
+from task_manager.utils import check_answer, get_pending_annotation
+from user_system.models import User
+
+
+def make_entry():
+    dataset = TaskDataset.objects.create(name="dataset", path="dataset.jsonl")
+    return TaskDatasetEntry.objects.create(
+        belong_dataset=dataset, question="What is the capital of France?", answer=json.dumps(["Paris"])
+    )
+
+
+class JudgeVerdictCacheTests(TestCase):
+    def setUp(self):
+        self.entry = make_entry()
+
+    def test_exact_match_skips_the_llm(self):
+        with mock.patch("task_manager.utils.check_answer_llm") as llm:
+            self.assertTrue(check_answer(self.entry, "paris"))
+        llm.assert_not_called()
+
+    def test_verdict_is_reused_for_the_same_normalized_answer(self):
+        with mock.patch("task_manager.utils.check_answer_llm", return_value=True) as llm:
+            self.assertTrue(check_answer(self.entry, "The city of Paris"))
+            self.assertTrue(check_answer(self.entry, "the city of paris"))
+        llm.assert_called_once()
+        self.assertEqual(JudgeVerdict.objects.filter(entry=self.entry).count(), 1)
+
+    def test_other_answers_are_judged_again(self):
+        with mock.patch("task_manager.utils.check_answer_llm", side_effect=[True, False]) as llm:
+            self.assertTrue(check_answer(self.entry, "The city of Paris"))
+            self.assertFalse(check_answer(self.entry, "London"))
+        self.assertEqual(llm.call_count, 2)
+
+
+class StartJudgingTests(TestCase):
+    def test_repeated_polls_queue_one_judgment(self):
+        locks = set()
+
+        def set_lock(key, value, nx=False, ex=None):
+            if nx and key in locks:
+                return None
+            locks.add(key)
+            return True
+
+        with mock.patch.object(judging, "redis_client") as redis, \
+                mock.patch.object(judging, "_get_executor") as executor:
+            redis.set.side_effect = set_lock
+            for _ in range(3):
+                judging.start_judging(7)
+        executor.return_value.submit.assert_called_once_with(judging._run_judgment, 7)
+
+
+async def fake_judge_concurrently(self, model, jobs, options):
+    """Judges every answer mentioning Paris correct."""
+    return {key: "paris" in job[2].lower() for key, job in jobs.items()}
+
+
+@mock.patch.object(RejudgeCommand, "judge_concurrently", fake_judge_concurrently)
+class RejudgeTrialsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("rejudge", "rejudge@example.com", "password")
+        entry = make_entry()
+        self.user = user
+        self.task = Task.objects.create(user=user, content=entry)
+        self.wrong = TaskTrial.objects.create(
+            belong_task=self.task, num_trial=1, answer="The city of Paris", is_correct=False
+        )
+        other = User.objects.create_user("other", "other@example.com", "password")
+        ended_task = Task.objects.create(user=other, content=entry, end_timestamp=self.wrong.start_timestamp)
+        self.right = TaskTrial.objects.create(
+            belong_task=ended_task, num_trial=1, answer="London", is_correct=True
+        )
+
+    def rejudge(self, *args):
+        call_command("rejudge_trials", *args, stdout=mock.MagicMock(), stderr=mock.MagicMock())
+
+    def test_report_only_by_default(self):
+        self.rejudge()
+
+        run = RejudgeRun.objects.get()
+        self.assertTrue(run.report_only)
+        self.assertEqual((run.judged, run.disagreements), (2, 2))
+        self.assertFalse(RejudgeDisagreement.objects.filter(applied=True).exists())
+        self.wrong.refresh_from_db()
+        self.assertFalse(self.wrong.is_correct)
+
+    def test_apply_updates_trials_and_tasks(self):
+        self.rejudge("--apply")
+
+        self.wrong.refresh_from_db()
+        self.right.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertTrue(self.wrong.is_correct)
+        self.assertFalse(self.right.is_correct)
+        self.assertIsNotNone(self.task.end_timestamp)
+        self.assertEqual(RejudgeDisagreement.objects.filter(applied=True).count(), 2)
+        # Changed verdicts do not send the participant to annotations
+        self.assertIsNone(get_pending_annotation(self.user))
+
+    def test_cached_verdicts_are_reused(self):
+        JudgeVerdict.objects.all().delete()
+        self.rejudge()
+        verdicts = JudgeVerdict.objects.count()
+
+        with mock.patch.object(RejudgeCommand, "judge_concurrently") as judge:
+            self.rejudge()
+        judge.assert_not_called()
+        self.assertEqual(JudgeVerdict.objects.count(), verdicts)
+
+    def test_resume_retries_failed_trials(self):
+        async def judge_london_only(self, model, jobs, options):
+            return {key: False if "london" in job[2].lower() else None for key, job in jobs.items()}
+
+        with mock.patch.object(RejudgeCommand, "judge_concurrently", judge_london_only):
+            self.rejudge("--apply")
+        run = RejudgeRun.objects.get()
+        self.assertEqual(run.failed_trial_ids, [self.wrong.id])
+        self.assertEqual((run.judged, run.errors), (1, 1))
+
+        self.rejudge("--apply", "--resume", str(run.id))
+        run.refresh_from_db()
+        self.assertEqual(run.failed_trial_ids, [])
+        self.assertEqual((run.judged, run.disagreements, run.errors), (2, 2, 0))
+        self.wrong.refresh_from_db()
+        self.assertTrue(self.wrong.is_correct)
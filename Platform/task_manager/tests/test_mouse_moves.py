@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from task_manager.models import Task, Webpage, WebpagePayload
+from task_manager.mouse_moves import (
+    append_mouse_moves,
+    count_mouse_moves,
+    decode_mouse_moves,
+    encode_mouse_moves,
+    mouse_moves_to_list,
+)
+from user_system.models import User
+
+
+class MouseMovesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("moves", "moves@example.com", "password")
+        task = Task.objects.create(user=user)
+        webpage = Webpage.objects.create(user=user, belong_task=task, url="https://example.com/")
+        self.payload = WebpagePayload.objects.create(webpage=webpage)
+
+    def test_segments_round_trip(self):
+        moves = [
+            {"x": 10, "y": 20, "time": 1000, "type": "move"},
+            {"x": 10.25, "y": 21.5, "time": 1016, "type": "scroll"},
+        ]
+        append_mouse_moves(self.payload, moves[:1])
+        append_mouse_moves(self.payload, moves[1:])
+
+        self.assertEqual(mouse_moves_to_list(self.payload), moves)
+        self.assertEqual(count_mouse_moves(self.payload), 2)
+
+    def test_coordinates_keep_hundredths_of_a_pixel(self):
+        columns = decode_mouse_moves(encode_mouse_moves([{"x": 1.234, "y": -5.678, "time": 0}]))
+        self.assertEqual(columns["x"].tolist(), [1.23])
+        self.assertEqual(columns["y"].tolist(), [-5.68])
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from task_manager.models import RrwebAsset, Task, Webpage
+from task_manager.rrweb_assets import extract_rrweb_assets, get_asset_path
+from task_manager.storage import append_rrweb_chunk, compact_rrweb_chunks, dump_rrweb_record
+from user_system.models import InformedConsent, User
+
+ASSET_ROOT = tempfile.mkdtemp()
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username,
+        f"{username}@example.com",
+        "password",
+        consent_agreed=True,
+        agreed_consent_version=InformedConsent.get_latest(),
+    )
+
+
+def snapshot(text):
+    return [{"type": 2, "timestamp": 1, "data": {"node": {"textContent": text}}}]
+
+
+@override_settings(RRWEB_ASSETS_ENABLED=True, RRWEB_ASSET_ROOT=ASSET_ROOT, RRWEB_ASSET_MIN_BYTES=16)
+class RrwebAssetTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(ASSET_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = make_user("assets")
+        task = Task.objects.create(user=self.user)
+        self.webpage = Webpage.objects.create(user=self.user, belong_task=task, url="https://example.com/")
+
+    def append(self, events):
+        refs = extract_rrweb_assets(events)
+        return append_rrweb_chunk(self.webpage, json.dumps(events), len(events), refs)
+
+    def test_chunks_link_their_assets(self):
+        text = "body { color: red; }" * 10
+        chunk = self.append(snapshot(text))
+
+        asset_hash = hashlib.sha256(text.encode()).hexdigest()
+        self.assertEqual(list(chunk.assets.values_list("hash", flat=True)), [asset_hash])
+        self.assertTrue(os.path.exists(get_asset_path(asset_hash)))
+        self.assertEqual(json.loads(dump_rrweb_record(self.webpage, resolve_assets=True)), snapshot(text))
+
+    def test_compaction_keeps_the_asset_links(self):
+        self.append(snapshot("a" * 32))
+        self.append(snapshot("b" * 32) + snapshot("a" * 32))
+
+        compact_rrweb_chunks(self.webpage)
+        chunk = self.webpage.record_chunks.get()
+        self.assertEqual(chunk.assets.count(), 2)
+
+    def test_gc_deletes_only_unreferenced_assets(self):
+        kept = self.append(snapshot("k" * 32)).assets.get()
+        dropped = "d" * 32
+        extract_rrweb_assets(snapshot(dropped))  # stored, but its chunk never was
+        dropped_hash = hashlib.sha256(dropped.encode()).hexdigest()
+        orphan_hash = hashlib.sha256(b"orphan").hexdigest()
+        orphan_path = get_asset_path(orphan_hash)
+        os.makedirs(os.path.dirname(orphan_path), exist_ok=True)
+        with open(orphan_path, "wb") as f:
+            f.write(b"orphan")
+        os.utime(orphan_path, (0, 0))
+
+        call_command("gc_rrweb_assets", "--min-age-hours", "0", stdout=mock.MagicMock())
+
+        self.assertEqual(list(RrwebAsset.objects.values_list("hash", flat=True)), [kept.hash])
+        self.assertTrue(os.path.exists(get_asset_path(kept.hash)))
+        self.assertFalse(os.path.exists(get_asset_path(dropped_hash)))
+        self.assertFalse(os.path.exists(orphan_path))
+
+    def test_assets_are_served_to_the_owner_only(self):
+        asset = self.append(snapshot("s" * 32)).assets.get()
+        url = reverse("task_manager:get_rrweb_asset", args=[asset.hash])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        other = make_user("other")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
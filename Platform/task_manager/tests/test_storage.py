@@ -0,0 +1,52 @@
+import json
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from task_manager.blob_store import load_payload
+from task_manager.models import Task, Webpage
+from task_manager.rrweb_codecs import ZLIB
+from task_manager.storage import append_rrweb_chunk, decode_chunk, dump_rrweb_record, rrweb_record_etag
+from user_system.models import User
+
+EVENTS = [{"type": 2, "timestamp": 1}, {"type": 3, "timestamp": 2, "data": {"text": "é" * 100}}]
+
+
+class ChunkRoundTripTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("storage", "storage@example.com", "password")
+        task = Task.objects.create(user=user)
+        self.webpage = Webpage.objects.create(user=user, belong_task=task, url="https://example.com/")
+
+    def append_chunks(self):
+        for events in (EVENTS[:1], EVENTS[1:]):
+            append_rrweb_chunk(self.webpage, json.dumps(events), len(events))
+
+    def test_chunks_decode_to_the_stored_events(self):
+        self.append_chunks()
+
+        chunks = list(self.webpage.record_chunks.all())
+        self.assertEqual([c.codec for c in chunks], [ZLIB, ZLIB])
+        self.assertEqual([json.loads(decode_chunk(c)) for c in chunks], [EVENTS[:1], EVENTS[1:]])
+        self.assertEqual(json.loads(dump_rrweb_record(self.webpage)), EVENTS)
+
+    def test_file_backend_round_trip(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(TRAJECTORY_BLOB_BACKEND="file", TRAJECTORY_BLOB_ROOT=root):
+            self.append_chunks()
+            chunk = self.webpage.record_chunks.first()
+            self.assertIsNotNone(chunk.data_blob)
+            self.assertEqual(bytes(chunk.data), b"")
+            self.assertEqual(json.loads(decode_chunk(chunk)), EVENTS[:1])
+            self.assertEqual(json.loads(dump_rrweb_record(self.webpage)), EVENTS)
+
+    def test_etag_uses_the_stored_chunk_sizes(self):
+        self.append_chunks()
+        chunks = list(self.webpage.record_chunks.defer("data"))
+        self.assertEqual([c.size for c in chunks], [len(load_payload(c, "data")) for c in chunks])
+
+        etag = rrweb_record_etag(self.webpage, chunks)
+        append_rrweb_chunk(self.webpage, json.dumps(EVENTS), len(EVENTS))
+        self.assertNotEqual(etag, rrweb_record_etag(self.webpage, list(self.webpage.record_chunks.defer("data"))))
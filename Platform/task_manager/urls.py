@@ -8,6 +8,8 @@ app_name = "task_manager"
 urlpatterns = [
     path("home/", views.task_home, name="home"),
     path("data/", views.data, name="data"),
+    path("data/v2/", views.data_v2, name="data_v2"),
+    path("data/batch/", views.data_batch, name="data_batch"),
     path("annotation/", views.annotation_home, name="annotation_home"),
     path("active_task/", views.active_task, name="active_task"),
     path("get_task_info/", views.get_task_info, name="get_task_info"),
@@ -38,6 +40,11 @@ urlpatterns = [
     path(
         "submit_answer/<int:task_id>/", views.submit_answer, name="submit_answer"
     ),  # Submit answer
+    path(
+        "answer_judgment/<int:task_trial_id>/",
+        views.answer_judgment,
+        name="answer_judgment",
+    ),  # Wait for the verdict on a submitted answer
     path(
         "cancel_annotation/<int:task_id>/",
         views.cancel_annotation,
@@ -67,4 +74,24 @@ urlpatterns = [
         views.get_rrweb_record,
         name="get_rrweb_record",
     ),
+    path(
+        "api/judgment_status/<int:task_trial_id>/",
+        views.judgment_status,
+        name="judgment_status",
+    ),
+    path(
+        "api/get_trial_records/<int:trial_id>/",
+        views.get_trial_records,
+        name="get_trial_records",
+    ),
+    path(
+        "api/get_rrweb_index/<int:webpage_id>/",
+        views.get_rrweb_index,
+        name="get_rrweb_index",
+    ),
+    path(
+        "api/rrweb_asset/<str:asset_hash>/",
+        views.get_rrweb_asset,
+        name="get_rrweb_asset",
+    ),
 ]
@@ -8,21 +8,41 @@ import logging
 from datetime import datetime
 from django.utils import timezone
 import re
+import hashlib
+from functools import lru_cache, partial
 from dateutil.parser import parse as parse_date, ParserError
 from django.shortcuts import render
 import random
 
-from .models import Task, Webpage, TaskDataset, TaskDatasetEntry
+from .models import Task, Webpage, TaskDataset, TaskDatasetEntry, JudgeVerdict, JudgeCall
+from .judge_metrics import JudgeCallTimer, verdict_outcome
+from .storage import append_rrweb_chunk, has_rrweb_events
+from .rrweb_assets import extract_rrweb_assets
+from .rrweb_index import index_rrweb_events
+from .event_list import append_event_segment, has_events
+from .mouse_moves import append_mouse_moves, has_mouse_moves
+from .page_summary import update_webpage_summary
+from .webpage_payload import PRE_SPLIT_FIELDS, get_webpage_payload, save_webpage_payload
+from .ingest import (
+    INGEST_SEQ_COOKIE,
+    advance_ingest_watermark,
+    has_pending_packets,
+    is_packet,
+    parse_ingest_cookie,
+    wait_for_ingest_watermark,
+)
 
 import time
+import threading
 import uuid
 import json
-import zlib
-import base64
+from django.db import IntegrityError, transaction
 from django.urls import reverse
-from .models import TaskTrial
+from .models import TaskTrial, RejudgeDisagreement
 from django.core.exceptions import ObjectDoesNotExist
 from core.utils import redis_client, print_debug, print_json_debug, decompress_json_data
+from core.offload import estimate_json_size, run_cpu_bound
+from redis.exceptions import RedisError
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -89,27 +109,6 @@ def stop_annotating(request, annotation_id=None):
     return True
 
 
-def append_json_data(existing_json_str, new_json_str):
-    if not existing_json_str or existing_json_str in ("[]", "{}"):
-        return new_json_str
-    if not new_json_str or new_json_str in ("[]", "{}"):
-        return existing_json_str
-
-    try:
-        existing_data = json.loads(existing_json_str)
-        new_data = json.loads(new_json_str)
-
-        if isinstance(existing_data, list) and isinstance(new_data, list):
-            existing_data.extend(new_data)
-            return json.dumps(existing_data)
-    except json.JSONDecodeError:
-        # Handle cases where one of the strings is not valid JSON
-        return existing_json_str  # Or some other fallback
-
-    # Fallback for non-list JSON or other structures, though lists are expected
-    return existing_json_str
-
-
 def safe_int(val):
     """
     Safely convert a value to an integer within the standard 32-bit signed integer range.
@@ -129,6 +128,10 @@ def safe_int(val):
         return None
 
 
+class DataStoreBusyError(Exception):
+    """The packets could not be stored now and must be sent or delivered again."""
+
+
 def acquire_lock(lock_key, timeout=30, wait_time=0.1):
     """
     Attempts to acquire a Redis lock.
@@ -143,180 +146,288 @@ def acquire_lock(lock_key, timeout=30, wait_time=0.1):
 
 
 def store_data(request, message, user):
+    store_data_batch([message], user)
+
+
+def store_data_batch(messages, user):
+    """
+    Store a list of packets of the same user.
+
+    The lock, the annotation state and the active task are resolved once for
+    the whole batch, and all packets are written in a single transaction.
+    Messages that are not packets are dropped, but still move the ingestion
+    watermark past their sequence number.
+    """
     user_id = user.id
     lock_key = f"data_store_lock:{user_id}"
+    inflight_key = f"data_store_inflight:{user_id}"
 
-    # Attempt to acquire lock
-    if not acquire_lock(lock_key):
-        logger.warning(f"Could not acquire data store lock for user {user.username}. Dropping packet.")
-        return
+    packets = [m for m in messages if is_packet(m)]
+    if len(packets) < len(messages):
+        logger.error(f"Dropping {len(messages) - len(packets)} invalid packet(s) of user {user.username}")
+        if not packets:
+            advance_ingest_watermark(user_id, messages)
+            return
+
+    # Packets with a page key and sequence number are ordered and deduplicated
+    # by the row lock on their webpage; only legacy packets need the user lock.
+    needs_lock = any(not m.get("page_key") for m in packets)
+    if needs_lock:
+        # Attempt to acquire lock
+        if not acquire_lock(lock_key):
+            # Nothing was stored, so the watermark stays where it is; the
+            # upload is answered with 503, a queued entry stays pending
+            raise DataStoreBusyError(
+                f"Could not acquire data store lock for user {user.username} ({len(messages)} packet(s))"
+            )
+    else:
+        # Let wait_until_data_stored see the write in progress
+        pipe = redis_client.pipeline()
+        pipe.incr(inflight_key)
+        pipe.expire(inflight_key, 30)
+        pipe.execute()
 
     try:
-        state = get_annotation_state(user_id)
+        _store_batch(packets, user)
+    finally:
+        if needs_lock:
+            redis_client.delete(lock_key)  # Always release the lock
+        else:
+            redis_client.decr(inflight_key)
+
+    # Only reached once the batch is committed (or skipped); wakes up
+    # views waiting in wait_until_data_stored
+    advance_ingest_watermark(user_id, messages)
+
 
+def _store_batch(messages, user):
+    packets = []
+    for message in messages:
         print_json_debug(message)
         if message["url"].startswith(settings.IP_TO_LAUNCH):
             print_debug("Skipping storing data for local URL:", message["url"])
-            return
+            continue
+        packets.append(message)
+    if not packets:
+        return
+
+    task = Task.objects.filter(user=user, active=True).first()
+    if not task:
+        print_debug("No active task found for user", user.username)
+        return
+
+    state = get_annotation_state(user.id)
+    state_changed = False
+    with transaction.atomic():
+        for message in packets:
+            state_changed |= _store_packet(message, user, task, state)
+
+    if state_changed:
+        set_annotation_state(user.id, state)
+
+
+def _new_webpage(message, user, task, state, page_key=None):
+    """Build (without saving) the webpage of the first packet of a page."""
+    start_ts = message.get("start_timestamp")
+    webpage = Webpage()
+    webpage.user = user
+    webpage.belong_task = task
+    webpage.page_key = page_key
+    # Truncate fields to fit database constraints
+    webpage.url = message["url"][:4096]
+    webpage.title = (
+        message.get("title")[:1024] if message.get("title") else None
+    )
+    webpage.referrer = (
+        message.get("referrer")[:4096] if message.get("referrer") else None
+    )
+
+    webpage.width = safe_int(message.get("width"))
+    webpage.height = safe_int(message.get("height"))
+
+    webpage.start_timestamp = (
+        timezone.make_aware(datetime.fromtimestamp(start_ts / 1000))
+        if start_ts
+        else timezone.now()
+    )
+    webpage.end_timestamp = webpage.start_timestamp
+
+    webpage.dwell_time = 0
+    webpage.page_switch_record = "[]"
+
+    sent_when_active = message.get("sent_when_active", False)
+    webpage.during_annotation = (
+        state.get("is_annotating", False) and not sent_when_active
+    )
+    webpage.annotation_name = (
+        state.get("annotation_name", "none")
+        if webpage.during_annotation
+        else "none"
+    )
+    return webpage
 
-        task = Task.objects.filter(user=user, active=True).first()
-        if not task:
-            print_debug("No active task found for user", user.username)
-            return
 
+def _upsert_keyed_webpage(message, user, task, state, page_key):
+    """
+    Return the locked webpage of ``page_key``, inserting it if needed.
+
+    The unique index on (belong_task, page_key) resolves concurrent inserts:
+    the loser of the race falls back to the row created by the winner.
+    Returns ``(webpage, created)``.
+    """
+    pages = Webpage.objects.select_for_update().defer(*PRE_SPLIT_FIELDS)
+    webpage = pages.filter(belong_task=task, page_key=page_key).first()
+    if webpage:
+        return webpage, False
+
+    webpage = _new_webpage(message, user, task, state, page_key)
+    try:
+        with transaction.atomic():
+            webpage.save()
+        return webpage, True
+    except IntegrityError:
+        return pages.get(belong_task=task, page_key=page_key), False
+
+
+def _store_packet(message, user, task, state):
+    """Apply a single packet to its webpage. Returns whether ``state`` changed."""
+    start_ts = message.get("start_timestamp")
+    page_key = message.get("page_key")
+    seq = safe_int(message.get("seq"))
+
+    if page_key:
+        # Current extensions identify the page view themselves, so concurrent
+        # tabs never share or steal a webpage row.
+        page_key = str(page_key)[:64]
+        webpage, is_new_webpage = _upsert_keyed_webpage(
+            message, user, task, state, page_key
+        )
+        if seq is not None and seq <= webpage.last_seq:
+            print_debug(f"Skipping duplicate packet {seq} of page {page_key}")
+            return False
+    else:
+        # Legacy packets are merged into the last webpage recorded in the state
+        webpage = None
         last_webpage_id = state.get("last_webpage_id")
         last_webpage_url = state.get("last_webpage_url")
         last_start_timestamp = state.get("last_start_timestamp")
-        start_ts = message.get("start_timestamp")
-
-        webpage = None
         if (
             last_webpage_id
             and last_webpage_url == message["url"]
             and last_start_timestamp == start_ts
         ):
             try:
-                webpage = Webpage.objects.get(id=last_webpage_id, belong_task=task)
+                webpage = Webpage.objects.defer(*PRE_SPLIT_FIELDS).get(
+                    id=last_webpage_id, belong_task=task
+                )
             except Webpage.DoesNotExist:
                 pass  # Will create a new one
 
         is_new_webpage = not webpage
-
         if is_new_webpage:
-            print_debug(f"Creating new webpage entry for URL: {message['url']}")
-            webpage = Webpage()
-            webpage.user = user
-            webpage.belong_task = task
-            # Truncate fields to fit database constraints
-            webpage.url = message["url"][:4096]
-            webpage.title = (
-                message.get("title")[:1024] if message.get("title") else None
-            )
-            webpage.referrer = (
-                message.get("referrer")[:4096] if message.get("referrer") else None
-            )
-
-            webpage.width = safe_int(message.get("width"))
-            webpage.height = safe_int(message.get("height"))
+            webpage = _new_webpage(message, user, task, state)
+            # Saved right away so the packet's segments can point to it
+            webpage.save()
 
-            webpage.start_timestamp = (
-                timezone.make_aware(datetime.fromtimestamp(start_ts / 1000))
-                if start_ts
-                else timezone.now()
-            )
-            webpage.end_timestamp = webpage.start_timestamp
-
-            webpage.dwell_time = 0
-            webpage.page_switch_record = "[]"
-            webpage.mouse_moves = "[]"
-            webpage.event_list = "[]"
-            webpage.rrweb_record = "[]"
-
-            sent_when_active = message.get("sent_when_active", False)
-            webpage.during_annotation = (
-                state.get("is_annotating", False) and not sent_when_active
-            )
-            webpage.annotation_name = (
-                state.get("annotation_name", "none")
-                if webpage.during_annotation
-                else "none"
-            )
-        else:
-            print_debug(f"Merging data for URL: {message['url']}")
-
-        # Common logic for both CREATE and MERGE
-        raw_rrweb = message.get("rrweb_record", "[]")
-        new_rrweb_record = raw_rrweb.replace("</script>", "<\\/script>")
-
-        # Optimize rrweb_record storage with compression
-        existing_rrweb = []
-        try:
-            if isinstance(webpage.rrweb_record, str):
-                if webpage.rrweb_record and webpage.rrweb_record not in ("[]", "{}"):
-                    existing_rrweb = json.loads(webpage.rrweb_record)
-            elif isinstance(webpage.rrweb_record, dict) and webpage.rrweb_record.get(
-                "compressed"
-            ):
-                compressed_data = webpage.rrweb_record["data"]
-                decompressed_str = zlib.decompress(
-                    base64.b64decode(compressed_data)
-                ).decode("utf-8")
-                existing_rrweb = json.loads(decompressed_str)
-            elif isinstance(webpage.rrweb_record, list):
-                existing_rrweb = webpage.rrweb_record
-        except Exception as e:
-            logger.error(f"Error parsing existing rrweb_record: {e}")
-            existing_rrweb = []
+    if is_new_webpage:
+        print_debug(f"Creating new webpage entry for URL: {message['url']}")
+    else:
+        print_debug(f"Merging data for URL: {message['url']}")
+
+    # Common logic for both CREATE and MERGE
+    raw_rrweb = message.get("rrweb_record", "[]")
+    new_rrweb_count = 0
+    asset_refs = []
+    rrweb_index = None
+    if isinstance(raw_rrweb, list):
+        # Native array: already parsed with the message, serialized once here
+        new_rrweb_count = len(raw_rrweb)
+        asset_refs = extract_rrweb_assets(raw_rrweb)
+        size = estimate_json_size(raw_rrweb)
+        rrweb_index = run_cpu_bound(index_rrweb_events, raw_rrweb, size=size)
+        new_rrweb_record = run_cpu_bound(json.dumps, raw_rrweb, size=size).replace(
+            "</script>", "<\\/script>"
+        )
+    else:
+        # Older extensions send the array as a JSON string
+        new_rrweb_record = (raw_rrweb or "[]").replace("</script>", "<\\/script>")
 
-        new_rrweb_list = []
+        # Only the new packet is parsed; earlier chunks are never re-read
         try:
-            if new_rrweb_record and new_rrweb_record not in ("[]", "{}"):
-                new_rrweb_list = json.loads(new_rrweb_record)
+            if new_rrweb_record not in ("[]", "{}"):
+                new_rrweb_list = run_cpu_bound(
+                    json.loads, new_rrweb_record, size=len(new_rrweb_record)
+                )
+                if isinstance(new_rrweb_list, list):
+                    new_rrweb_count = len(new_rrweb_list)
+                    asset_refs = extract_rrweb_assets(new_rrweb_list)
+                    rrweb_index = run_cpu_bound(
+                        index_rrweb_events, new_rrweb_list, size=len(new_rrweb_record)
+                    )
+                    if asset_refs:
+                        new_rrweb_record = run_cpu_bound(
+                            json.dumps, new_rrweb_list, size=len(new_rrweb_record)
+                        ).replace("</script>", "<\\/script>")
         except Exception as e:
             logger.error(f"Error parsing new rrweb_record: {e}")
 
-        if new_rrweb_list:
-            existing_rrweb.extend(new_rrweb_list)
+    payload = get_webpage_payload(webpage)
+    append_event_segment(payload, message.get("event_list", "[]"))
+    append_mouse_moves(payload, message.get("mouse_moves", "[]"))
 
-        # Compress and save based on setting
-        should_compress = getattr(settings, "ENABLE_RRWEB_COMPRESSION", True)
-        
-        try:
-            if should_compress:
-                final_json_str = json.dumps(existing_rrweb)
-                compressed_str = base64.b64encode(
-                    zlib.compress(final_json_str.encode("utf-8"))
-                ).decode("utf-8")
-                webpage.rrweb_record = {"compressed": True, "data": compressed_str}
-            else:
-                webpage.rrweb_record = json.dumps(existing_rrweb)
-        except Exception as e:
-            logger.error(f"Error saving rrweb_record (compress={should_compress}): {e}")
-            # Fallback to uncompressed if compression fails
-            webpage.rrweb_record = json.dumps(existing_rrweb)
+    is_routine_update = message.get("is_routine_update", False)
+    if not is_routine_update:
+        if message.get("end_timestamp"):
+            webpage.end_timestamp = timezone.make_aware(
+                datetime.fromtimestamp(message["end_timestamp"] / 1000)
+            )
 
-        webpage.event_list = append_json_data(
-            webpage.event_list, message.get("event_list", "[]")
+        webpage.dwell_time = safe_int(
+            message.get("dwell_time", webpage.dwell_time)
         )
-        webpage.mouse_moves = append_json_data(
-            webpage.mouse_moves, message.get("mouse_moves", "[]")
+        page_switch_record = message.get(
+            "page_switch_record", webpage.page_switch_record
         )
+        # Keep the stored value a JSON string whichever way it was sent
+        if isinstance(page_switch_record, list):
+            page_switch_record = json.dumps(page_switch_record)
+        webpage.page_switch_record = page_switch_record
 
-        is_routine_update = message.get("is_routine_update", False)
-        if not is_routine_update:
-            if message.get("end_timestamp"):
-                webpage.end_timestamp = timezone.make_aware(
-                    datetime.fromtimestamp(message["end_timestamp"] / 1000)
-                )
-
-            webpage.dwell_time = safe_int(
-                message.get("dwell_time", webpage.dwell_time)
-            )
-            webpage.page_switch_record = message.get(
-                "page_switch_record", webpage.page_switch_record
-            )
-
-            if check_is_redirected_page(webpage):
-                webpage.is_redirected = True
-
-        webpage.save()
+        has_rrweb = new_rrweb_count > 0 or (
+            not is_new_webpage and has_rrweb_events(webpage)
+        )
+        if check_is_redirected_page(webpage, has_rrweb):
+            webpage.is_redirected = True
 
-        if is_new_webpage:
-            state["last_webpage_id"] = webpage.id
-            state["last_webpage_url"] = webpage.url
-            state["last_start_timestamp"] = start_ts
-            set_annotation_state(user_id, state)
+    if seq is not None:
+        webpage.last_seq = max(webpage.last_seq, seq)
 
-    finally:
-        redis_client.delete(lock_key)  # Always release the lock
+    webpage.save()
+    save_webpage_payload(payload)
+    if new_rrweb_count:
+        append_rrweb_chunk(
+            webpage, new_rrweb_record, new_rrweb_count, asset_refs, rrweb_index
+        )
+    if not is_routine_update:
+        # The final packet of a page: summarize it for analysis code once the
+        # packet is committed, so the webpage row lock is not held meanwhile
+        transaction.on_commit(partial(update_webpage_summary, webpage), robust=True)
+
+    if is_new_webpage and not page_key:
+        state["last_webpage_id"] = webpage.id
+        state["last_webpage_url"] = webpage.url
+        state["last_start_timestamp"] = start_ts
+        return True
+    return False
 
 
-def check_is_redirected_page(webpage):
+def check_is_redirected_page(webpage, has_rrweb):
     # A page is considered a redirect if the dwell time is very short (< 500ms) or if there's no user interaction.
+    payload = get_webpage_payload(webpage)
     return (
         webpage.dwell_time < 500
-        or (webpage.mouse_moves == "[]" and webpage.event_list == "[]")
-        or webpage.rrweb_record == "[]"
+        or (not has_mouse_moves(payload) and not has_events(payload))
+        or not has_rrweb
     )
 
 
@@ -331,26 +442,46 @@ def wait_until_data_stored(func):
 
         if request:
             user_id = request.user.id
-            lock_key = f"data_store_lock:{user_id}"
+            # The extension keeps the cookie at the session and sequence number
+            # of the last packet it queued; return as soon as that packet is
+            # stored, so packets still on their way are waited for as well.
+            target = parse_ingest_cookie(request.COOKIES.get(INGEST_SEQ_COOKIE))
+            if target is not None:
+                epoch, target_seq = target
+                if not wait_for_ingest_watermark(user_id, epoch, target_seq, timeout=30):
+                    logger.error(f"Data store watermark wait timeout for user {user_id}")
+            else:
+                _wait_for_data_store_lock(user_id)
 
-            # Sleep for a short duration to ensure the backend receives the data
-            time.sleep(0.3)
+        return func(*args, **kwargs)
 
-            wait_time = 0
-            max_wait_time = 30  # Max wait 30 seconds to prevent infinite loops
+    return wrapper
 
-            while redis_client.exists(lock_key):
-                if wait_time >= max_wait_time:
-                    logger.error(f"Data store lock wait timeout for user {user_id}")
-                    break
 
-                print_debug("Waiting for data to be stored...")
-                time.sleep(0.5)
-                wait_time += 0.5
+def _wait_for_data_store_lock(user_id):
+    """Fallback barrier for older extensions that do not report a sequence number."""
+    lock_key = f"data_store_lock:{user_id}"
+    inflight_key = f"data_store_inflight:{user_id}"
 
-        return func(*args, **kwargs)
+    # Sleep for a short duration to ensure the backend receives the data
+    time.sleep(0.3)
 
-    return wrapper
+    wait_time = 0
+    max_wait_time = 30  # Max wait 30 seconds to prevent infinite loops
+
+    # Queued packets (DATA_INGEST_ASYNC) count as not yet stored
+    while (
+        redis_client.exists(lock_key)
+        or int(redis_client.get(inflight_key) or 0) > 0
+        or has_pending_packets(user_id)
+    ):
+        if wait_time >= max_wait_time:
+            logger.error(f"Data store lock wait timeout for user {user_id}")
+            break
+
+        print_debug("Waiting for data to be stored...")
+        time.sleep(0.5)
+        wait_time += 0.5
 
 
 def _normalize(text):
@@ -376,47 +507,72 @@ def _normalize(text):
     return text
 
 
+@lru_cache(maxsize=4096)
+def _normalized_answer_set(answers_json):
+    """The normalized authentic answers of a JSON answer list, computed once per list."""
+    answers = json.loads(answers_json)
+    if not isinstance(answers, list):
+        return frozenset()
+    return frozenset(_normalize(answer) for answer in answers)
+
+
+def hash_normalized_answer(normalized_answer):
+    """The JudgeVerdict.answer_hash of a normalized answer."""
+    return hashlib.sha256(normalized_answer.encode("utf-8")).hexdigest()
+
+
 def check_answer_rule(question, authentic_answers, user_answer):
     if user_answer is None:
         return False
     if not authentic_answers or not isinstance(authentic_answers, (list, tuple)):
         return False
 
-    # print_debug("Question:", question)
-    # print_debug("User Answer:", user_answer)
-    # print_debug("Correct Answer List:", authentic_answers)
+    return _normalize(user_answer) in _normalized_answer_set(
+        json.dumps(list(authentic_answers))
+    )
 
-    # Fallback to original normalization logic
-    normalized_user_answer = _normalize(user_answer)
-    # print_debug(f"Normalized User Answer: '{normalized_user_answer}'")
 
-    for answer in authentic_answers:
-        normalized_correct_answer = _normalize(answer)
-        # print_debug(
-        #     f"Comparing with normalized correct answer: '{normalized_correct_answer}'"
-        # )
-        if normalized_user_answer == normalized_correct_answer:
-            return True
+# Version of the prompt of the LLM judge (build_judge_prompt), part of the key of cached JudgeVerdicts
+JUDGE_PROMPT_VERSION = 1
 
-    return False
+# Redis hash of judging counters: exact_hits, cache_hits, llm_calls, llm_time_ms
+JUDGE_STATS_KEY = "judge_stats"
+
+_judge_client = None
+_judge_client_lock = threading.Lock()
 
 
-def check_answer_llm(question, authentic_answers, user_answer, client = None, model=None, max_retries=3):
+def get_judge_client():
     """
-    Checks if the user's answer is correct using an LLM-as-a-judge.
+    The OpenAI client of the answer judge. It is created once per process so
+    every judgment reuses its pool of HTTP connections.
     """
-    if not client:
-        base_url = config("LLM_BASE_URL", default=None)
-        api_key = config("LLM_API_KEY", default=None)
-        model = config("LLM_JUDGE_MODEL", default="gpt-4o")
+    global _judge_client
+    with _judge_client_lock:
+        if _judge_client is None:
+            base_url = config("LLM_BASE_URL", default=None)
+            api_key = config("LLM_API_KEY", default=None)
+
+            if not base_url or not api_key:
+                raise ValueError(
+                    "LLM_BASE_URL and LLM_API_KEY environment variables must be set."
+                )
 
-        if not base_url or not api_key:
-            raise ValueError(
-                "LLM_BASE_URL and LLM_API_KEY environment variables must be set."
+            _judge_client = OpenAI(
+                base_url=base_url, api_key=api_key, timeout=settings.LLM_JUDGE_TIMEOUT
             )
+    return _judge_client
+
+
+def get_judge_model():
+    return config("LLM_JUDGE_MODEL", default="gpt-4o")
 
-        client = OpenAI(base_url=base_url, api_key=api_key)
 
+def build_judge_prompt(question, authentic_answers, user_answer):
+    """
+    The prompt of the LLM judge.
+    Bump JUDGE_PROMPT_VERSION when changing it, so cached verdicts are not reused.
+    """
     authentic_answers_formatted = "\n- ".join(authentic_answers)
     prompt = f"""You are a meticulous and fair evaluator. Your task is to compare a `User's Answer` to a list of `Authentic Answers` for a given `Question` and determine if it is correct.
 
@@ -438,29 +594,85 @@ def check_answer_llm(question, authentic_answers, user_answer, client = None, mo
 **User's Answer:** "{user_answer}"
 
 Is the user's answer correct?"""
+    return prompt
 
-    try_count = 0
-    while try_count < max_retries:
-        try_count += 1
-        completion = client.chat.completions.create(
-            model=model, messages=[{"role": "user", "content": prompt}], temperature=0
-        )
 
-        judgment = completion.choices[0].message.content.strip().lower()
-        print_debug(f"LLM response: {judgment}")
+def parse_judgment(completion):
+    """True/False for a `yes`/`no` judge completion, None if it is neither."""
+    judgment = completion.choices[0].message.content.strip().lower()
+    print_debug(f"LLM response: {judgment}")
 
-        # Remove markdown and punctuation for a cleaner check
-        cleaned_judgment = re.sub(r"[^a-z]", "", judgment)
+    # Remove markdown and punctuation for a cleaner check
+    cleaned_judgment = re.sub(r"[^a-z]", "", judgment)
 
-        if cleaned_judgment == "yes":
-            return True
-        if cleaned_judgment == "no":
-            return False
+    if cleaned_judgment == "yes":
+        return True
+    if cleaned_judgment == "no":
+        return False
+    return None
+
+
+def check_answer_llm(question, authentic_answers, user_answer, client = None, model=None, max_retries=3, source=JudgeCall.SOURCE_LIVE):
+    """
+    Checks if the user's answer is correct using an LLM-as-a-judge.
+    The invocation is recorded as a JudgeCall of `source`.
+    """
+    if not client:
+        client = get_judge_client()
+        model = get_judge_model()
+
+    prompt = build_judge_prompt(question, authentic_answers, user_answer)
+    timer = JudgeCallTimer(model, source)
+
+    try_count = 0
+    while try_count < max_retries:
+        try_count += 1
+        try:
+            completion = client.chat.completions.create(
+                model=model, messages=[{"role": "user", "content": prompt}], temperature=0
+            )
+        except Exception:
+            timer.add_attempt()
+            timer.finish(JudgeCall.OUTCOME_ERROR)
+            raise
+        timer.add_attempt(completion)
+
+        is_correct = parse_judgment(completion)
+        if is_correct is not None:
+            timer.finish(verdict_outcome(is_correct))
+            return is_correct
     
+    timer.finish(JudgeCall.OUTCOME_INVALID)
     raise ValueError("LLM did not return a valid judgment after multiple attempts.")
 
 
+def _count_judgment(field, elapsed_ms=None):
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hincrby(JUDGE_STATS_KEY, field, 1)
+        if elapsed_ms is not None:
+            pipe.hincrby(JUDGE_STATS_KEY, "llm_time_ms", int(elapsed_ms))
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Cannot update judge counters: {e}")
+
+
+def get_judge_stats():
+    """The judging counters of JUDGE_STATS_KEY as a dict of ints."""
+    stats = redis_client.hgetall(JUDGE_STATS_KEY)
+    return {
+        field: int(stats.get(field.encode(), 0))
+        for field in ("exact_hits", "cache_hits", "llm_calls", "llm_time_ms")
+    }
+
+
 def check_answer(entry, user_answer, llm=True):
+    """
+    Judges an answer to a dataset entry: an exact match of the normalized
+    answer with an authentic answer is correct; otherwise the LLM judge
+    decides, its verdict being stored as a JudgeVerdict and reused for the
+    same normalized answer, judge model and prompt version.
+    """
     try:
         authentic_answers = json.loads(entry.answer)
     except json.JSONDecodeError:
@@ -468,10 +680,36 @@ def check_answer(entry, user_answer, llm=True):
         return False
     question = entry.question
 
-    if llm:
-        return check_answer_llm(question, authentic_answers, user_answer)
-    else:
-        return check_answer_rule(question, authentic_answers, user_answer)
+    if check_answer_rule(question, authentic_answers, user_answer):
+        _count_judgment("exact_hits")
+        return True
+    if not llm:
+        return False
+
+    normalized_answer = _normalize(user_answer)
+    key = {
+        "entry": entry,
+        "answer_hash": hash_normalized_answer(normalized_answer),
+        "model": get_judge_model(),
+        "prompt_version": JUDGE_PROMPT_VERSION,
+    }
+    cached = (
+        JudgeVerdict.objects.filter(**key).values_list("is_correct", flat=True).first()
+    )
+    if cached is not None:
+        _count_judgment("cache_hits")
+        return cached
+
+    start_time = time.monotonic()
+    is_correct = check_answer_llm(question, authentic_answers, user_answer)
+    _count_judgment("llm_calls", (time.monotonic() - start_time) * 1000)
+
+    # Another process may have stored the same verdict meanwhile
+    JudgeVerdict.objects.get_or_create(
+        **key,
+        defaults={"normalized_answer": normalized_answer, "is_correct": is_correct},
+    )
+    return is_correct
 
 
 def reset_states(new_page=True):
@@ -589,13 +827,27 @@ def get_pending_annotation(user):
     Checks for pending annotations for a user and returns the URL to the annotation page if found.
     """
     try:
-        # Check for pending post-task annotations
+        # Answers still being judged come first, their verdict decides what follows
+        pending_judgment = TaskTrial.objects.filter(
+            belong_task__user=user,
+            belong_task__cancelled=False,
+            judge_status=TaskTrial.JUDGE_PENDING,
+        ).first()
+        if pending_judgment:
+            return reverse("task_manager:answer_judgment", args=[pending_judgment.id])
+
+        # Check for pending post-task annotations. Verdicts changed afterwards by
+        # ``manage.py rejudge_trials --apply`` never prompt for an annotation.
         pending_post_task = Task.objects.filter(
             user=user,
             cancelled=False,
             end_timestamp__isnull=False, # not null end_timestamp indicates the task ended
             posttaskannotation__isnull=True,
             cancelannotation__isnull=True,
+        ).exclude(
+            id__in=RejudgeDisagreement.objects.filter(
+                applied=True, new_is_correct=True
+            ).values("trial__belong_task_id")
         ).first()
         if pending_post_task:
             return reverse(
@@ -608,7 +860,7 @@ def get_pending_annotation(user):
             belong_task__cancelled=False,
             is_correct=False,
             reflectionannotation__isnull=True,
-        ).order_by("end_timestamp")
+        ).exclude(rejudgedisagreement__applied=True).order_by("end_timestamp")
 
         if pending_reflection_trials.exists():
             trial_to_annotate = pending_reflection_trials.first()
@@ -5,26 +5,29 @@ import logging
 import random
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Prefetch
 from django.shortcuts import render
 from django.core.files.base import ContentFile
 from django.contrib.auth.decorators import login_required, user_passes_test
 import base64
+import hashlib
 import uuid
 import json
 from types import SimpleNamespace
 import zlib
 
+from core.utils import decompress_json_bytes
 from .utils import (
     print_debug,
     stop_annotating,
     decompress_json_data,
     store_data,
+    store_data_batch,
+    DataStoreBusyError,
     reset_states,
     get_active_task_dataset,
     start_annotating,
     wait_until_data_stored,
-    check_answer,
     get_pending_annotation,
     render_status_page,
     shuffle_choices,
@@ -41,7 +44,24 @@ from .models import (
     ReflectionAnnotation,
     Justification,
     ExtensionVersion,
+    RrwebAsset,
+    WebpageRecordChunk,
 )
+from .storage import (
+    describe_rrweb_index,
+    dump_rrweb_window,
+    get_stored_rrweb_chunk,
+    list_rrweb_chunks,
+    rrweb_record_etag,
+    stream_rrweb_record,
+)
+from .blob_store import BlobCorruptError, load_payload
+from .rrweb_codecs import http_content_coding
+from .rrweb_lite import get_lite_record
+from .judging import start_judging
+from .rrweb_assets import get_asset_path, is_asset_hash
+from .ingest import advance_ingest_watermark, enqueue_packet, is_packet
+from .webpage_payload import PRE_SPLIT_FIELDS
 from .mappings import (
     FAMILIARITY_MAP,
     DIFFICULTY_MAP,
@@ -84,8 +104,18 @@ from django.views.decorators.csrf import (
 )  # Add ensure_csrf_cookie here
 from django.urls import reverse
 
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
 from django.contrib.auth import login
+from django.conf import settings
+from redis.exceptions import RedisError
 
 logger = logging.getLogger(__name__)
 
@@ -168,19 +198,56 @@ def auth_redirect(request):
         return HttpResponse("Invalid or expired authentication token.", status=401)
 
 
+def _data_store_busy_response():
+    return JsonResponse(
+        {"status": "error", "message": "Data store busy, please retry."},
+        status=503,
+        headers={"Retry-After": "1"},
+    )
+
+
 # Store data
 @csrf_exempt
 @api_view(["POST"])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def data(request):
+    if settings.DATA_INGEST_ASYNC:
+        # Only queue the raw payload; ingest_worker decompresses and stores it
+        message = request.POST.get("message")
+        if not message:
+            return JsonResponse(
+                {"status": "error", "message": "No data received."}, status=400
+            )
+        try:
+            enqueue_packet(request.user.id, message)
+        except RedisError as e:
+            logger.error(
+                f"Failed to queue incoming data for user {request.user.username}: {e}"
+            )
+            return JsonResponse(
+                {"status": "error", "message": "Failed to queue data."}, status=503
+            )
+        return JsonResponse({"status": "queued"}, status=202)
+
     try:
         message = request.POST["message"]
         # decompress the message if it is compressed
         message = decompress_json_data(message)
+        if not is_packet(message):
+            logger.error(f"Dropping a packet without url from user {request.user.username}")
+            # It will never be stored, so pages must not wait for it
+            advance_ingest_watermark(request.user.id, [message])
+            return JsonResponse(
+                {"status": "error", "message": "Invalid or corrupt data received."},
+                status=400,
+            )
         user = request.user
         store_data(request, message, user)
         return JsonResponse({"status": "success"})
+    except DataStoreBusyError as e:
+        logger.warning(str(e))
+        return _data_store_busy_response()
     except (zlib.error, json.JSONDecodeError, UnicodeDecodeError) as e:
         logger.error(
             f"Failed to process incoming data for user {request.user.username}: {e}"
@@ -191,6 +258,81 @@ def data(request):
         )
 
 
+def _handle_deflate_upload(request, is_batch=False):
+    """
+    Shared handler of the raw deflate endpoints. The body is a single packet
+    (a JSON object) or, for batches, a JSON array of packets.
+    """
+    if not request.content_type.startswith("application/octet-stream"):
+        return JsonResponse(
+            {"status": "error", "message": "Expected application/octet-stream."},
+            status=415,
+        )
+    if request.headers.get("Content-Encoding", "").lower() != "deflate":
+        return JsonResponse(
+            {"status": "error", "message": "Expected Content-Encoding: deflate."},
+            status=415,
+        )
+
+    payload = request.body
+    if not payload:
+        return JsonResponse(
+            {"status": "error", "message": "No data received."}, status=400
+        )
+
+    if settings.DATA_INGEST_ASYNC:
+        try:
+            enqueue_packet(request.user.id, payload, encoding="deflate")
+        except RedisError as e:
+            logger.error(
+                f"Failed to queue incoming data for user {request.user.username}: {e}"
+            )
+            return JsonResponse(
+                {"status": "error", "message": "Failed to queue data."}, status=503
+            )
+        return JsonResponse({"status": "queued"}, status=202)
+
+    message = decompress_json_bytes(payload)
+    if not (isinstance(message, list) if is_batch else is_packet(message)):
+        logger.error(
+            f"Failed to process incoming data for user {request.user.username}"
+        )
+        advance_ingest_watermark(request.user.id, [message])
+        return JsonResponse(
+            {"status": "error", "message": "Invalid or corrupt data received."},
+            status=400,
+        )
+
+    try:
+        if is_batch:
+            store_data_batch(message, request.user)
+            return JsonResponse({"status": "success", "stored": sum(map(is_packet, message))})
+
+        store_data(request, message, request.user)
+        return JsonResponse({"status": "success"})
+    except DataStoreBusyError as e:
+        logger.warning(str(e))
+        return _data_store_busy_response()
+
+
+# Store data (v2): raw deflate body instead of a base64 form field
+@csrf_exempt
+@api_view(["POST"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def data_v2(request):
+    return _handle_deflate_upload(request)
+
+
+# Store a batch of packets (possibly of several pages) in one request
+@csrf_exempt
+@api_view(["POST"])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def data_batch(request):
+    return _handle_deflate_upload(request, is_batch=True)
+
+
 # Pre-Task Annotation Fetcher
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
@@ -504,14 +646,22 @@ def active_task(request):
             }
         )
 
+    # Extensions that know /task/data/v2/ and /task/data/batch/ switch to them
+    upload_support = {
+        "binary_upload": settings.DATA_BINARY_UPLOAD,
+        "batch_upload": settings.DATA_BINARY_UPLOAD,
+    }
+
     task = Task.objects.filter(user=user, active=True).first()
     if task is None:
-        return JsonResponse({"task_id": -1})
+        return JsonResponse({"task_id": -1, **upload_support})
 
     task_id = task.id
     trial_num = task.num_trial + 1
     print_debug("Current Task ID: ", task_id)
-    return JsonResponse({"task_id": task_id, "trial_num": trial_num})
+    return JsonResponse(
+        {"task_id": task_id, "trial_num": trial_num, **upload_support}
+    )
 
 
 # Initialize the task
@@ -601,7 +751,6 @@ def task_home(request):
 def annotation_home(request):
 
     user = request.user
-    from django.db.models import Prefetch
 
     # Prefetch webpages for tasks to avoid N+1 problem
     # We only want webpages that match the criteria: user=user, is_redirected=False, during_annotation=False
@@ -1018,12 +1167,9 @@ def cancel_annotation(request, task_id):
 
             task.num_trial = current_trial_num
 
-            all_webpages = Webpage.objects.filter(
+            Webpage.objects.filter(
                 belong_task=task, start_timestamp__gte=start_timestamp
-            )
-            for webpage in all_webpages:
-                webpage.belong_task_trial = task_trial
-                webpage.save()
+            ).update(belong_task_trial=task_trial)
 
             task.cancelled = True
             task.active = False
@@ -1261,6 +1407,33 @@ def reflection_annotation(request, task_trial_id):
         )
 
 
+def _save_justification_ratings(post, user):
+    """
+    Saves the relevance_<id> and credibility_<id> ratings of a submitted form
+    with one query, for the justifications of `user` only.
+    """
+    ratings = {}
+    for key, value in post.items():
+        if key.startswith("relevance_") or key.startswith("credibility_"):
+            field, justification_id = key.split("_")[:2]
+            try:
+                ratings.setdefault(int(justification_id), {})[field] = int(value)
+            except ValueError:
+                pass
+    if not ratings:
+        return
+
+    justifications = list(
+        Justification.objects.filter(
+            id__in=ratings, belong_task_trial__belong_task__user=user
+        ).only("id", "relevance", "credibility")
+    )
+    for justification in justifications:
+        for field, value in ratings[justification.id].items():
+            setattr(justification, field, value)
+    Justification.objects.bulk_update(justifications, ["relevance", "credibility"])
+
+
 @permission_classes([IsAuthenticated])
 @wait_until_data_stored
 def submit_answer(request, task_id):
@@ -1327,77 +1500,25 @@ def submit_answer(request, task_id):
             task_trial.answer_formulation_method = answer_formulation_method
             task_trial.answer_formulation_method_other = answer_formulation_method_other
 
-            is_correct = check_answer(task.content, task_trial.answer)
-            task_trial.is_correct = is_correct
-
-            if is_correct:
-                task.end_timestamp = task_trial.end_timestamp
-
+            # The answer is judged once the task row is released (see judging.py)
+            task_trial.is_correct = None
+            task_trial.judge_status = TaskTrial.JUDGE_PENDING
             task_trial.save()
+            transaction.on_commit(lambda: start_judging(task_trial.id))
 
             task.num_trial = current_trial_num
             task.save()
 
-            all_webpages = Webpage.objects.filter(
-                belong_task=task, start_timestamp__gte=start_timestamp
-            )
-
-            for key, value in request.POST.items():
-                if key.startswith("relevance_"):
-                    justification_id = key.split("_")[1]
-                    try:
-                        justification = Justification.objects.get(id=justification_id)
-                        if justification.belong_task_trial.belong_task.user == user:
-                            justification.relevance = int(value)
-                            justification.save()
-                    except (Justification.DoesNotExist, ValueError):
-                        pass
-                elif key.startswith("credibility_"):
-                    justification_id = key.split("_")[1]
-                    try:
-                        justification = Justification.objects.get(id=justification_id)
-                        if justification.belong_task_trial.belong_task.user == user:
-                            justification.credibility = int(value)
-                            justification.save()
-                    except (Justification.DoesNotExist, ValueError):
-                        pass
-
-            response = None
-            if is_correct:
-                if PostTaskAnnotation.objects.filter(belong_task=task).exists():
-                    response = render_status_page(
-                        request,
-                        "Annotation Already Completed!",
-                        "You have already submitted the annotation for this task.",
-                        "success",
-                    )
-                else:
-                    response = HttpResponseRedirect(
-                        reverse("task_manager:post_task_annotation", args=[task_id])
-                    )
-            else:
-                if ReflectionAnnotation.objects.filter(
-                    belong_task_trial=task_trial
-                ).exists():
-                    response = render_status_page(
-                        request,
-                        "Annotation Already Completed!",
-                        "You have already submitted the annotation for this task.",
-                        "success",
-                    )
-                else:
-                    response = HttpResponseRedirect(
-                        reverse(
-                            "task_manager:reflection_annotation", args=[task_trial.id]
-                        )
-                    )
+            _save_justification_ratings(request.POST, user)
 
-            for webpage in all_webpages:
-                webpage.belong_task_trial = task_trial
-                webpage.save()
+            Webpage.objects.filter(
+                belong_task=task, start_timestamp__gte=start_timestamp
+            ).update(belong_task_trial=task_trial)
             stop_annotating(request)
 
-            return response
+            return HttpResponseRedirect(
+                reverse("task_manager:answer_judgment", args=[task_trial.id])
+            )
     else:
         task = Task.objects.filter(id=task_id, user=user).first()
         if task is None:
@@ -1452,6 +1573,81 @@ def submit_answer(request, task_id):
         )
 
 
+def _get_judged_trial_response(request, task_trial):
+    """Where a participant goes once the answer of ``task_trial`` is judged."""
+    task = task_trial.belong_task
+    if task_trial.is_correct:
+        if PostTaskAnnotation.objects.filter(belong_task=task).exists():
+            return render_status_page(
+                request,
+                "Annotation Already Completed!",
+                "You have already submitted the annotation for this task.",
+                "success",
+            )
+        return HttpResponseRedirect(
+            reverse("task_manager:post_task_annotation", args=[task.id])
+        )
+
+    if ReflectionAnnotation.objects.filter(belong_task_trial=task_trial).exists():
+        return render_status_page(
+            request,
+            "Annotation Already Completed!",
+            "You have already submitted the annotation for this task.",
+            "success",
+        )
+    return HttpResponseRedirect(
+        reverse("task_manager:reflection_annotation", args=[task_trial.id])
+    )
+
+
+@permission_classes([IsAuthenticated])
+def answer_judgment(request, task_trial_id):
+    """
+    Waiting page shown while a submitted answer is judged. It polls
+    judgment_status and reloads into the next annotation step once the
+    verdict is stored.
+    """
+    user = request.user
+    task_trial = (
+        TaskTrial.objects.select_related("belong_task")
+        .filter(id=task_trial_id, belong_task__user=user)
+        .first()
+    )
+    if task_trial is None:
+        return render_status_page(
+            request, "Not Found", f"No trial found with id={task_trial_id}", "danger"
+        )
+
+    if task_trial.judge_status != TaskTrial.JUDGE_PENDING:
+        return _get_judged_trial_response(request, task_trial)
+
+    # Restarts a judgment lost with the process that ran it
+    start_judging(task_trial.id)
+    return render(
+        request,
+        "answer_judgment.html",
+        {"cur_user": user, "task_trial_id": task_trial.id},
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def judgment_status(request, task_trial_id):
+    """
+    API endpoint polled by the answer_judgment page.
+    """
+    task_trial = TaskTrial.objects.filter(
+        id=task_trial_id, belong_task__user=request.user
+    ).first()
+    if task_trial is None:
+        return JsonResponse(
+            {"status": "error", "message": "Trial not found."}, status=404
+        )
+    if task_trial.judge_status == TaskTrial.JUDGE_PENDING:
+        start_judging(task_trial.id)
+    return JsonResponse({"status": task_trial.judge_status})
+
+
 @permission_classes([IsAuthenticated])
 def remove_task(request, task_id):
     user = request.user
@@ -1638,16 +1834,59 @@ def status_page(request):
     return render_status_page(request, title, message, alert_type)
 
 
+def _accepts_encoding(request, coding):
+    """Whether the request's ``Accept-Encoding`` header allows ``coding``."""
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() != coding:
+            continue
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _get_rrweb_window(request):
+    """The ``(start, end, from_keyframe)`` window of ``?from=&to=``, or None."""
+    start = request.GET.get("from")
+    end = request.GET.get("to")
+    if start is None and end is None:
+        return None
+    return int(start), int(end), request.GET.get("keyframe", "1") != "0"
+
+
+def _replay_webpages():
+    """Webpages with their owner and payload, without the event and mouse move data."""
+    return Webpage.objects.select_related("belong_task__user", "payload").defer(
+        *PRE_SPLIT_FIELDS, "payload__event_list", "payload__mouse_moves"
+    )
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_rrweb_record(request, webpage_id):
     """
     API endpoint to fetch the rrweb_record for a specific webpage.
+
+    A recording stored as a single chunk is sent as stored, with the matching
+    Content-Encoding, when the browser accepts it; otherwise the chunks are
+    decompressed and concatenated as a stream. No event is parsed or
+    re-serialized. Recordings of finished tasks no longer change, so they are
+    cached by the browser for good.
+
+    ``?from=&to=`` (ms timestamps) only returns the events of that window,
+    starting from the nearest preceding full snapshot unless ``keyframe=0``.
+    ``?variant=lite`` returns the recording without mouse move and scroll
+    events (see rrweb_lite.py).
     """
     user = request.user
     try:
         # Using select_related for efficiency
-        webpage = Webpage.objects.select_related("belong_task__user").get(id=webpage_id)
+        webpage = _replay_webpages().get(id=webpage_id)
         task_user = webpage.belong_task.user
 
         # Security check: ensure the user owns the task or is a superuser
@@ -1656,33 +1895,74 @@ def get_rrweb_record(request, webpage_id):
                 {"status": "error", "message": "Permission denied."}, status=403
             )
 
-        # The rrweb_record might be stored as a JSON string within the JSONField.
-        # We need to parse it to ensure JsonResponse sends a proper JSON array.
-        record_data = webpage.rrweb_record
+        try:
+            window = _get_rrweb_window(request)
+        except (TypeError, ValueError):
+            return JsonResponse(
+                {"status": "error", "message": "Invalid time window."}, status=400
+            )
 
-        if isinstance(record_data, dict) and record_data.get("compressed"):
-            try:
-                compressed_data = record_data["data"]
-                decompressed_str = zlib.decompress(
-                    base64.b64decode(compressed_data)
-                ).decode("utf-8")
-                record_data = json.loads(decompressed_str)
-            except Exception as e:
-                logger.error(
-                    f"Error decompressing rrweb record for webpage {webpage_id}: {e}"
-                )
-                return JsonResponse(
-                    {"status": "error", "message": "Failed to decompress data."},
-                    status=500,
-                )
-        elif isinstance(record_data, str):
-            record_data = json.loads(record_data)
+        variant = request.GET.get("variant", "")
+        if variant not in ("", "lite") or (variant and window):
+            return JsonResponse(
+                {"status": "error", "message": "Invalid replay variant."}, status=400
+            )
 
-        return JsonResponse(record_data, safe=False)
+        chunks = list_rrweb_chunks(webpage)
+        record_etag = rrweb_record_etag(webpage, chunks)
+        if variant:
+            # The lite variant is cached zlib-compressed
+            coding = "deflate"
+        else:
+            stored = window is None and get_stored_rrweb_chunk(webpage, chunks)
+            coding = stored and http_content_coding(stored.codec, stored.dictionary_id)
+        if coding and not _accepts_encoding(request, coding):
+            coding = None
+
+        etag = None
+        if not webpage.belong_task.active:
+            # Each variant and content coding is a representation of its own
+            suffix = "".join(f"-{part}" for part in (variant, coding) if part)
+            etag = f'"{record_etag}{suffix}"'
+
+        if etag and request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        elif variant:
+            data = get_lite_record(webpage, record_etag, chunks)
+            response = HttpResponse(
+                data if coding else zlib.decompress(data),
+                content_type="application/json",
+            )
+            if coding:
+                response["Content-Encoding"] = coding
+        elif window:
+            response = HttpResponse(
+                dump_rrweb_window(webpage, *window, chunks=chunks),
+                content_type="application/json",
+            )
+        elif coding:
+            response = HttpResponse(
+                load_payload(stored, "data"), content_type="application/json"
+            )
+            response["Content-Encoding"] = coding
+        else:
+            response = StreamingHttpResponse(
+                stream_rrweb_record(webpage, chunks), content_type="application/json"
+            )
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if etag:
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
     except Webpage.DoesNotExist:
         return JsonResponse(
             {"status": "error", "message": "Webpage not found."}, status=404
         )
+    except (zlib.error, BlobCorruptError) as e:
+        logger.error(f"Error decompressing rrweb record for webpage {webpage_id}: {e}")
+        return JsonResponse(
+            {"status": "error", "message": "Failed to decompress data."}, status=500
+        )
     except json.JSONDecodeError:
         return JsonResponse(
             {"status": "error", "message": "Failed to parse recording data."},
@@ -1695,6 +1975,147 @@ def get_rrweb_record(request, webpage_id):
         )
 
 
+def _stream_trial_records(pages, record_etags, variant):
+    """Yield the NDJSON lines of ``get_trial_records``, one page per line."""
+    for page in pages:
+        yield f'{{"webpage_id": {page.id}, "events": '
+        if variant:
+            yield zlib.decompress(
+                get_lite_record(page, record_etags[page.id], page.chunks)
+            ).decode("utf-8")
+        else:
+            for piece in stream_rrweb_record(page, page.chunks):
+                # Raw newlines can only be whitespace between JSON tokens
+                yield piece.replace("\n", " ").replace("\r", " ")
+        yield "}\n"
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_trial_records(request, trial_id):
+    """
+    API endpoint to fetch the rrweb records of all webpages of a trial at once.
+
+    The trial is authorized once, and the records are streamed as NDJSON in
+    start time order, one ``{"webpage_id": ..., "events": [...]}`` line per
+    page, so the replay player can show pages as they arrive. Accepts
+    ``?variant=lite`` like ``get_rrweb_record``.
+    """
+    user = request.user
+    try:
+        trial = TaskTrial.objects.select_related("belong_task__user").get(id=trial_id)
+    except TaskTrial.DoesNotExist:
+        return JsonResponse(
+            {"status": "error", "message": "Trial not found."}, status=404
+        )
+    task = trial.belong_task
+    if task.user != user and not user.is_superuser:
+        return JsonResponse(
+            {"status": "error", "message": "Permission denied."}, status=403
+        )
+
+    variant = request.GET.get("variant", "")
+    if variant not in ("", "lite"):
+        return JsonResponse(
+            {"status": "error", "message": "Invalid replay variant."}, status=400
+        )
+
+    # Same pages as the replays of show_task
+    pages = list(
+        Webpage.objects.filter(
+            belong_task_trial=trial, is_redirected=False, during_annotation=False
+        )
+        .select_related("payload")
+        .only("id", "start_timestamp", "payload__webpage", "payload__rrweb_record")
+        .prefetch_related(
+            Prefetch(
+                "record_chunks",
+                queryset=WebpageRecordChunk.objects.defer("data"),
+                to_attr="chunks",
+            )
+        )
+        .order_by("start_timestamp", "id")
+    )
+    record_etags = {page.id: rrweb_record_etag(page, page.chunks) for page in pages}
+
+    etag = None
+    if not task.active:
+        digest = hashlib.sha256(
+            json.dumps(sorted(record_etags.items())).encode("utf-8")
+        ).hexdigest()[:32]
+        suffix = f"-{variant}" if variant else ""
+        etag = f'"{digest}{suffix}"'
+
+    if etag and request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(
+            _stream_trial_records(pages, record_etags, variant),
+            content_type="application/x-ndjson",
+        )
+    if etag:
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_rrweb_index(request, webpage_id):
+    """
+    API endpoint to fetch the keyframe index of a webpage's recording, which
+    the replay player uses to load long recordings window by window.
+    """
+    user = request.user
+    try:
+        webpage = _replay_webpages().get(id=webpage_id)
+    except Webpage.DoesNotExist:
+        return JsonResponse(
+            {"status": "error", "message": "Webpage not found."}, status=404
+        )
+    if webpage.belong_task.user != user and not user.is_superuser:
+        return JsonResponse(
+            {"status": "error", "message": "Permission denied."}, status=403
+        )
+    return JsonResponse(describe_rrweb_index(webpage))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_rrweb_asset(request, asset_hash):
+    """
+    API endpoint to fetch an asset referenced by rrweb records.
+    Assets are content-addressed, so they are cached by the browser for good.
+    Users only get the assets referenced by their own recordings.
+    """
+    if not is_asset_hash(asset_hash):
+        return JsonResponse(
+            {"status": "error", "message": "Asset not found."}, status=404
+        )
+    user = request.user
+    if not user.is_superuser and not RrwebAsset.objects.filter(
+        hash=asset_hash, chunks__webpage__belong_task__user=user
+    ).exists():
+        return JsonResponse(
+            {"status": "error", "message": "Asset not found."}, status=404
+        )
+
+    etag = f'"{asset_hash}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            asset_file = open(get_asset_path(asset_hash), "rb")
+        except FileNotFoundError:
+            return JsonResponse(
+                {"status": "error", "message": "Asset not found."}, status=404
+            )
+        response = FileResponse(asset_file, content_type="text/plain; charset=utf-8")
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
 @consent_exempt
 @api_view(["GET"])
 @authentication_classes([JWTAuthentication])
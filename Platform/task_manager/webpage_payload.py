@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Access to the recorded data of a webpage.
+
+``Webpage`` only holds page metadata; the rrweb, event and mouse move
+payloads live in the one-to-one ``WebpagePayload`` row, which is only loaded
+by the replay, export and analysis code paths (``select_related("payload")``
+when many pages are read). The recording helpers of ``storage``,
+``event_list`` and ``mouse_moves`` take the payload object; the latter two
+append each packet as a ``WebpageSegment`` row of the page
+(``get_webpage_segments``).
+
+Pages recorded before the split still carry the payload in their own
+``PRE_SPLIT_FIELDS`` until ``manage.py split_webpage_payloads`` copies it;
+``get_webpage_payload`` reads it from there meanwhile, and the first packet
+stored for such a page moves it over.
+"""
+
+from .models import Webpage, WebpagePayload, WebpageSegment
+
+PRE_SPLIT_FIELDS = ("rrweb_record", "event_list", "mouse_moves")
+
+_UNLOADED = object()
+
+
+def build_webpage_payload(webpage_id, values):
+    """An unsaved payload holding the pre-split column ``values`` of a page."""
+    return WebpagePayload(
+        webpage_id=webpage_id,
+        **{field: value for field, value in values.items() if value is not None},
+    )
+
+
+def get_webpage_payload(webpage):
+    """
+    The payload of ``webpage``. For a page not split yet it is built (unsaved)
+    from the pre-split columns; ``save_webpage_payload`` then moves it over.
+    """
+    try:
+        return webpage.payload
+    except WebpagePayload.DoesNotExist:
+        pass
+
+    values = {}
+    if webpage.pk is not None:
+        values = (
+            Webpage.objects.filter(pk=webpage.pk).values(*PRE_SPLIT_FIELDS).first()
+            or {}
+        )
+    payload = build_webpage_payload(webpage.pk, values)
+    # Also caches the payload as ``webpage.payload``
+    payload.webpage = webpage
+    payload.copied_pre_split = any(value is not None for value in values.values())
+    return payload
+
+
+def save_webpage_payload(payload):
+    """
+    Save ``payload`` after its webpage was saved, within the same transaction.
+    A stored payload is only written when one of its fields changed.
+    """
+    if not payload._state.adding:
+        loaded = getattr(payload, "_loaded_values", {})
+        deferred = payload.get_deferred_fields()
+        changed = [
+            field
+            for field in PRE_SPLIT_FIELDS
+            if field not in deferred and getattr(payload, field) != loaded.get(field, _UNLOADED)
+        ]
+        if changed:
+            payload.save(update_fields=changed)
+        return
+    payload.save(force_insert=True)
+    if getattr(payload, "copied_pre_split", False):
+        Webpage.objects.filter(pk=payload.webpage_id).update(
+            **{field: None for field in PRE_SPLIT_FIELDS}
+        )
+
+
+def get_webpage_segments(payload, kind, with_data=True):
+    """
+    The ``WebpageSegment`` rows of ``kind`` of the payload's page in ``seq``
+    order. Reuses the page's ``segments`` when the caller prefetched them;
+    otherwise ``with_data=False`` leaves their ``data`` unloaded.
+    """
+    if WebpagePayload.webpage.is_cached(payload):
+        webpage = payload.webpage
+        if "segments" in getattr(webpage, "_prefetched_objects_cache", {}):
+            return [segment for segment in webpage.segments.all() if segment.kind == kind]
+    segments = WebpageSegment.objects.filter(webpage_id=payload.webpage_id, kind=kind)
+    return list(segments if with_data else segments.defer("data"))